@@ -1,12 +1,27 @@
 import json
+import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from itertools import islice, repeat
 from pathlib import Path
 from typing import Any, Dict, List, Tuple
 
 import yaml
 from jsonschema import Draft202012Validator
+from referencing import Registry, Resource
+from referencing.exceptions import CannotDetermineSpecification, NoSuchResource, Unresolvable, Unretrievable
+from referencing.jsonschema import DRAFT202012
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "gates"))
+from g2_checklist_completion import (  # noqa: E402
+    CheckFlowExportError,
+    ChecklistFormatError,
+    checkflow_items,
+    is_checkflow_export,
+    iter_checklist_items,
+)
 
 
 def _substitute(obj: Any, ctx: Dict[str, Any]) -> Any:
@@ -44,19 +59,402 @@ def write_json(path: Path, data: Any) -> None:
     path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
 
 
-def gate_schema(step_id: str, target: Path, schema_file: Path) -> StepResult:
-    schema = json.loads(schema_file.read_text(encoding="utf-8"))
+# --- Schema registry / validator cache --------------------------------------
+#
+# Every pack schema (packs/*/schemas/*.json) is loaded once per process into a
+# referencing.Registry, keyed by its $id and by its file URI, and crawled so
+# that cross-file $ref targets and anchors are pre-resolved. The registry never
+# retrieves: an unknown $ref fails instead of touching the disk or network.
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+PACK_SCHEMA_GLOB = "packs/*/schemas/*.json"
+
+_SCHEMA_REGISTRY: Any = None
+# Raised lazily while validating when a $ref cannot be resolved (reported as a per-file FAIL).
+REFERENCING_ERRORS = (Unresolvable, NoSuchResource, Unretrievable, CannotDetermineSpecification)
+# Per-process cache: resolved schema path -> compiled validator.
+_VALIDATORS: Dict[str, Any] = {}
+
+
+def load_schema(path: Path) -> Any:
+    text = path.read_text(encoding="utf-8")
+    return json.loads(text) if path.suffix.lower() == ".json" else yaml.safe_load(text)
+
+
+def _no_retrieve(uri: str):
+    raise NoSuchResource(ref=uri)
+
+
+def _schema_resources(path: Path) -> List[Tuple[str, Any]]:
+    contents = load_schema(path)
+    resource = Resource.from_contents(contents, default_specification=DRAFT202012)
+    keys = [path.resolve().as_uri()]
+    if isinstance(contents, dict) and isinstance(contents.get("$id"), str):
+        keys.append(contents["$id"])
+    return [(k, resource) for k in keys]
+
+
+def build_schema_registry(root: Path = REPO_ROOT) -> Any:
+    resources = []
+    for fp in sorted(root.glob(PACK_SCHEMA_GLOB)):
+        resources.extend(_schema_resources(fp))
+    return Registry(retrieve=_no_retrieve).with_resources(resources).crawl()
+
+
+def get_validator(schema_file: Path) -> Any:
+    """Compiled validator for schema_file, sharing the process-wide registry."""
+    global _SCHEMA_REGISTRY
+    key = str(schema_file.resolve())
+    v = _VALIDATORS.get(key)
+    if v is not None:
+        return v
+    if _SCHEMA_REGISTRY is None:
+        _SCHEMA_REGISTRY = build_schema_registry()
+    uri = schema_file.resolve().as_uri()
+    try:
+        _SCHEMA_REGISTRY[uri]
+    except LookupError:
+        # Schema outside packs/*/schemas: add it (and its $id) once, with its sibling
+        # *.json schemas so relative $refs between them resolve like inside a pack.
+        resources = _schema_resources(schema_file)
+        for fp in sorted(schema_file.resolve().parent.glob("*.json")):
+            if fp == schema_file.resolve():
+                continue
+            try:
+                resources.extend(_schema_resources(fp))
+            except (OSError, ValueError, CannotDetermineSpecification):
+                continue
+        _SCHEMA_REGISTRY = _SCHEMA_REGISTRY.with_resources(resources).crawl()
+    # Enter through the file URI so relative $refs resolve against the schema file even without $id.
+    v = Draft202012Validator({"$ref": uri}, registry=_SCHEMA_REGISTRY)
+    _VALIDATORS[key] = v
+    return v
+
+
+def collect_schema_errors(validator: Any, doc: Any, max_errors: int = 0, fail_fast: bool = False, count_errors: bool = False) -> Dict[str, Any]:
+    """
+    Pull errors lazily from iter_errors.
+    - max_errors > 0: stop after N errors (fail_fast is max_errors=1).
+    - count_errors: drain the rest of the iterator to report the total as
+      error_count. This is a full validation pass (every error is still built);
+      it only skips sorting and serialising the errors beyond the limit. For a
+      cheap count on huge arrays use split_items, which reports invalid_items.
+    Only the collected errors are sorted for display.
+    """
+    limit = 1 if fail_fast else max(0, int(max_errors))
+    it = validator.iter_errors(doc)
+    errs = list(islice(it, limit)) if limit else list(it)
+    out: Dict[str, Any] = {}
+    if limit and len(errs) == limit:
+        rest = sum(1 for _ in it) if count_errors else (0 if next(it, None) is None else None)
+        out["truncated"] = rest != 0
+        if count_errors:
+            out["error_count"] = len(errs) + rest
+    elif count_errors:
+        out["error_count"] = len(errs)
+    errs.sort(key=lambda e: list(e.path))
+    out["errors"] = [{"path": list(e.path), "message": e.message} for e in errs]
+    return out
+
+
+# --- Item-level parallel validation ----------------------------------------
+#
+# For documents with huge arrays (e.g. requirements.functional[]), the schema is
+# split into an "envelope" (array `items` replaced by {}) validated once, and the
+# array items, validated in chunks on a process pool against the item
+# subschema via {"$ref": "<schema uri>#<pointer>/items"}. Item error paths are
+# prefixed with the array path + index so the merged report matches a
+# whole-document validation.
+
+ITEM_CHUNK_SIZE = 500
+
+# Per-process cache: resolved schema path -> (envelope validator, [(data path, schema pointer)])
+_SPLIT_PLANS: Dict[str, Any] = {}
+
+
+def _array_item_pointers(schema: Any) -> List[Tuple[Tuple[str, ...], str]]:
+    """Arrays reachable from the root through `properties` only: [(data path, pointer to the array schema)]."""
+    found = []
+
+    def walk(node: Any, data_path: Tuple[str, ...], pointer: str) -> None:
+        if not isinstance(node, dict):
+            return
+        if node.get("type") == "array" and isinstance(node.get("items"), dict):
+            found.append((data_path, pointer))
+            return
+        for name, sub in (node.get("properties") or {}).items():
+            esc = str(name).replace("~", "~0").replace("/", "~1")
+            walk(sub, data_path + (name,), f"{pointer}/properties/{esc}")
+
+    walk(schema, (), "")
+    return found
+
+
+def _split_plan(schema_file: Path) -> Any:
+    key = str(schema_file.resolve())
+    plan = _SPLIT_PLANS.get(key)
+    if plan is None:
+        get_validator(schema_file)  # ensure the schema is in the registry
+        uri = schema_file.resolve().as_uri()
+        schema = _SCHEMA_REGISTRY.contents(uri)
+        arrays = _array_item_pointers(schema)
+        envelope = json.loads(json.dumps(schema))
+        if isinstance(envelope, dict):
+            # keep the base URI so relative $refs in the envelope resolve like in the full schema
+            envelope.setdefault("$id", uri)
+        for _, pointer in arrays:
+            node = envelope
+            for part in pointer.split("/")[1:]:
+                node = node[part.replace("~1", "/").replace("~0", "~")]
+            node["items"] = {}
+        plan = (Draft202012Validator(envelope, registry=_SCHEMA_REGISTRY), arrays)
+        _SPLIT_PLANS[key] = plan
+    return plan
+
+
+def _item_validator(schema_file: Path, pointer: str) -> Any:
+    key = f"{schema_file.resolve()}#{pointer}/items"
+    v = _VALIDATORS.get(key)
+    if v is None:
+        get_validator(schema_file)  # ensure the schema is in the registry
+        v = Draft202012Validator({"$ref": f"{schema_file.resolve().as_uri()}#{pointer}/items"}, registry=_SCHEMA_REGISTRY)
+        _VALIDATORS[key] = v
+    return v
+
+
+def _validate_items_chunk(schema_file: str, pointer: str, prefix: List[Any], start: int, items: List[Any], max_errors: int, count_errors: bool) -> Dict[str, Any]:
+    """
+    Worker entry point: validate items[start:start+len(items)] of one array.
+    Once max_errors errors are collected, the remaining items are only checked
+    with is_valid (stops at the first error of each item): once to set
+    "truncated", or for every item when count_errors asks for invalid_items.
+    """
+    validator = _item_validator(Path(schema_file), pointer)
+    merged: Dict[str, Any] = {"errors": [], "truncated": False, "invalid_items": 0}
+    for i, item in enumerate(items, start=start):
+        try:
+            if max_errors and len(merged["errors"]) >= max_errors:
+                if not validator.is_valid(item):
+                    merged["truncated"] = True
+                    merged["invalid_items"] += 1
+                    if not count_errors:
+                        break
+                continue
+            found = collect_schema_errors(validator, item, max_errors)
+        except REFERENCING_ERRORS as exc:
+            # report it like any other error of this item instead of failing the whole pool
+            found = {"errors": [{"path": [], "message": f"schema $ref error: {exc}"}]}
+        for e in found["errors"]:
+            e["path"] = prefix + [i] + e["path"]
+        merged["errors"].extend(found["errors"])
+        merged["truncated"] = merged["truncated"] or bool(found.get("truncated"))
+        merged["invalid_items"] += 1 if found["errors"] else 0
+    return merged
+
+
+def collect_schema_errors_split(schema_file: Path, doc: Any, jobs: int = 0, max_errors: int = 0, fail_fast: bool = False, count_errors: bool = False) -> Dict[str, Any]:
+    limit = 1 if fail_fast else max(0, int(max_errors))
+    envelope, arrays = _split_plan(schema_file)
+    found = collect_schema_errors(envelope, doc, limit)
+    errors = found["errors"]
+    truncated = bool(found.get("truncated"))
+    invalid_items = 0
+
+    tasks = []
+    for data_path, pointer in arrays:
+        node = doc
+        for part in data_path:
+            node = node.get(part) if isinstance(node, dict) else None
+        if not isinstance(node, list):
+            continue  # type/required errors are already reported by the envelope
+        for i in range(0, len(node), ITEM_CHUNK_SIZE):
+            tasks.append((str(schema_file), pointer, list(data_path), i, node[i:i + ITEM_CHUNK_SIZE], limit, count_errors))
+
+    if not (limit and len(errors) >= limit and not count_errors) and tasks:
+        jobs = jobs or os.cpu_count() or 1
+        if jobs <= 1 or len(tasks) <= 1:
+            chunks = [_validate_items_chunk(*t) for t in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as ex:
+                chunks = list(ex.map(_validate_items_chunk, *zip(*tasks)))
+        for c in chunks:
+            errors.extend(c["errors"])
+            truncated = truncated or bool(c["truncated"])
+            invalid_items += c["invalid_items"]
+
+    errors.sort(key=lambda e: [(0, p) if isinstance(p, int) else (1, str(p)) for p in e["path"]])
+    if limit and len(errors) > limit:
+        errors = errors[:limit]
+        truncated = True
+    out: Dict[str, Any] = {"errors": errors}
+    if limit:
+        out["truncated"] = truncated
+    if count_errors:
+        out["invalid_items"] = invalid_items
+    return out
+
+
+def gate_schema(step_id: str, target: Path, schema_file: Path, max_errors: int = 0, fail_fast: bool = False, count_errors: bool = False, split_items: bool = False, jobs: int = 0) -> StepResult:
     doc = load_yaml(target)
-    errs = sorted(Draft202012Validator(schema).iter_errors(doc), key=lambda e: list(e.path))
-    if errs:
-        return StepResult(step_id, "FAIL", {
-            "target": str(target),
-            "schema": str(schema_file),
-            "errors": [{"path": list(e.path), "message": e.message} for e in errs],
-        })
+    try:
+        if split_items:
+            found = collect_schema_errors_split(schema_file, doc, jobs, max_errors, fail_fast, count_errors)
+        else:
+            found = collect_schema_errors(get_validator(schema_file), doc, max_errors, fail_fast, count_errors)
+    except REFERENCING_ERRORS as exc:
+        return StepResult(step_id, "FAIL", {"target": str(target), "schema": str(schema_file), "error": f"schema $ref error: {exc}"})
+    if found["errors"]:
+        return StepResult(step_id, "FAIL", {"target": str(target), "schema": str(schema_file), **found})
     return StepResult(step_id, "PASS", {"target": str(target), "schema": str(schema_file)})
 
 
+# --- schema_registry.yaml bulk validation ---------------------------------
+
+REGISTRY_SKIP_DIRS = {".git", "node_modules", "output", "allure-results", "__pycache__", ".venv"}
+REGISTRY_CHUNK_SIZE = 32
+
+
+def load_schema_registry(registry_file: Path) -> List[Tuple[str, str]]:
+    data = load_yaml(registry_file) or {}
+    entries = data.get("schema_registry") or []
+    if not isinstance(entries, list):
+        raise ValueError(f"schema_registry must be a list: {registry_file}")
+    out = []
+    for i, e in enumerate(entries):
+        if not isinstance(e, dict) or not e.get("match") or not e.get("schema"):
+            raise ValueError(f"schema_registry[{i}] needs match and schema")
+        check_registry_pattern(str(e["match"]), i)
+        out.append((str(e["match"]), str(e["schema"])))
+    return out
+
+
+# Constructs that change meaning once the pattern is embedded in the combined router regex:
+# numbered backrefs / conditionals (group numbers shift) and global inline flags (only legal at the start).
+_NUMBERED_GROUP_REF = re.compile(r"\\[1-9]|\(\?\(\d")
+_GLOBAL_INLINE_FLAGS = re.compile(r"\(\?[aiLmsux]+\)")
+
+
+def check_registry_pattern(pattern: str, index: int) -> None:
+    """Reject match patterns that would change meaning inside compile_registry_router's combined regex."""
+    re.compile(pattern)
+    # drop escaped backslashes first so r"\\1" (a literal backslash, then "1") is not taken as a backref
+    bare = pattern.replace("\\\\", "")
+    if _NUMBERED_GROUP_REF.search(bare):
+        raise ValueError(f"schema_registry[{index}].match uses a numbered group reference (use (?P=name)): {pattern}")
+    if _GLOBAL_INLINE_FLAGS.search(bare):
+        raise ValueError(f"schema_registry[{index}].match uses global inline flags (use scoped (?i:...)): {pattern}")
+
+
+def compile_registry_router(entries: List[Tuple[str, str]]):
+    """
+    Compile every `match` into one regex: ^(?:(?P<s0>.*?(?:p0))|(?P<s1>.*?(?:p1))|...).
+    Alternatives are tried in order, so the first registry entry that matches
+    anywhere in the path wins (same result as trying re.search per entry).
+    Raises ValueError for patterns that would change meaning inside the
+    combined regex (see check_registry_pattern).
+    Returns route(relpath) -> entry index or None.
+    """
+    for i, (pat, _) in enumerate(entries):
+        check_registry_pattern(pat, i)
+    if not entries:
+        return lambda relpath: None
+    combined = re.compile(
+        "^(?:" + "|".join(f"(?P<s{i}>.*?(?:{pat}))" for i, (pat, _) in enumerate(entries)) + ")",
+        re.DOTALL,
+    )
+
+    def route(relpath: str):
+        m = combined.match(relpath)
+        if m is None:
+            return None
+        return int(m.lastgroup[1:])
+
+    return route
+
+
+def iter_yaml_files(root: Path):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in REGISTRY_SKIP_DIRS)
+        for fn in sorted(filenames):
+            if fn.lower().endswith((".yaml", ".yml")):
+                yield Path(dirpath) / fn
+
+
+def _validate_chunk(schema_file: str, targets: List[str], max_errors: int = 0) -> List[Dict[str, Any]]:
+    """Worker entry point: validate a slice of one schema group."""
+    validator = get_validator(Path(schema_file))
+    out = []
+    for t in targets:
+        try:
+            doc = load_yaml(Path(t))
+        except (OSError, yaml.YAMLError) as exc:
+            out.append({"target": t, "errors": [{"path": [], "message": f"YAML load error: {exc}"}]})
+            continue
+        try:
+            out.append({"target": t, **collect_schema_errors(validator, doc, max_errors)})
+        except REFERENCING_ERRORS as exc:
+            out.append({"target": t, "errors": [{"path": [], "message": f"schema $ref error: {exc}"}]})
+    return out
+
+
+def gate_schema_registry(step_id: str, registry_file: Path, root: Path, jobs: int = 0, max_errors: int = 0) -> StepResult:
+    try:
+        entries = load_schema_registry(registry_file)
+        route = compile_registry_router(entries)
+    except (OSError, ValueError, re.error, yaml.YAMLError) as exc:
+        return StepResult(step_id, "FAIL", {"registry": str(registry_file), "error": str(exc)})
+
+    groups: Dict[str, List[str]] = {}
+    unmatched = 0
+    entry_hits = [0] * len(entries)
+    for fp in iter_yaml_files(root):
+        idx = route(fp.relative_to(root).as_posix())
+        if idx is None:
+            unmatched += 1
+            continue
+        entry_hits[idx] += 1
+        groups.setdefault(entries[idx][1], []).append(str(fp))
+
+    results: List[Dict[str, Any]] = []
+    tasks: List[Tuple[str, List[str]]] = []
+    for schema, targets in groups.items():
+        if not Path(schema).is_file():
+            results.extend({"target": t, "schema": schema, "errors": [{"path": [], "message": f"schema not found: {schema}"}]} for t in targets)
+            continue
+        for i in range(0, len(targets), REGISTRY_CHUNK_SIZE):
+            tasks.append((schema, targets[i:i + REGISTRY_CHUNK_SIZE]))
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs <= 1 or len(tasks) <= 1:
+        chunk_results = [_validate_chunk(schema, targets, max_errors) for schema, targets in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as ex:
+            chunk_results = list(ex.map(_validate_chunk, *zip(*tasks), repeat(max_errors, len(tasks))))
+    for (schema, _), chunk in zip(tasks, chunk_results):
+        for r in chunk:
+            r["schema"] = schema
+            results.append(r)
+
+    failed = [r for r in results if r["errors"]]
+    details = {
+        "registry": str(registry_file),
+        "root": str(root),
+        "files_validated": len(results),
+        "files_failed": len(failed),
+        "files_unmatched": unmatched,
+        "schemas": {schema: len(targets) for schema, targets in groups.items()},
+        "entries_unmatched": [pat for (pat, _), n in zip(entries, entry_hits) if n == 0],
+        "failures": sorted(failed, key=lambda r: r["target"]),
+    }
+    if not results:
+        # Nothing validated (stale match paths or wrong --root): never report that as a PASS.
+        details["error"] = "no YAML under root matched any schema_registry entry"
+        return StepResult(step_id, "FAIL", details)
+    if failed:
+        return StepResult(step_id, "FAIL", details)
+    return StepResult(step_id, "WARN" if details["entries_unmatched"] else "PASS", details)
+
+
 def gate_ambiguity(step_id: str, targets: List[Path], dictionary_file: Path, severity_on_hit: str) -> StepResult:
     terms = []
     for line in dictionary_file.read_text(encoding="utf-8").splitlines():
@@ -76,29 +474,44 @@ def gate_ambiguity(step_id: str, targets: List[Path], dictionary_file: Path, sev
     return StepResult(step_id, "PASS", {"dictionary": str(dictionary_file), "findings": []})
 
 
-def gate_checklist(step_id: str, checklist: Path, fail_if_todo: bool, fail_if_abort_without_reason: bool, warn_if_abort_rate_over: float) -> StepResult:
+def gate_checklist(step_id: str, checklist: Path, fail_if_todo: bool, fail_if_abort_without_reason: bool, warn_if_abort_rate_over: float, stream: bool = False) -> StepResult:
     if not checklist.exists():
         return StepResult(step_id, "FAIL", {"error": f"checklist not found: {checklist}"})
 
-    data = json.loads(checklist.read_text(encoding="utf-8"))
-    items = data.get("items", [])
-    if not isinstance(items, list):
-        return StepResult(step_id, "FAIL", {"error": "checklist.items must be a list"})
-
-    total = len(items)
-    todo = 0
-    abort = 0
-    abort_no_reason = 0
-
-    for it in items:
-        status = (it.get("status") or "").lower()
-        if status == "todo":
-            todo += 1
-        if status == "abort":
-            abort += 1
-            reason = (it.get("reason") or "").strip()
-            if not reason:
-                abort_no_reason += 1
+    def count(items: Any) -> Tuple[int, int, int, int]:
+        total = todo = abort = abort_no_reason = 0
+        for it in items:
+            total += 1
+            status = (it.get("status") or "").lower()
+            if status == "todo":
+                todo += 1
+            if status == "abort":
+                abort += 1
+                reason = (it.get("reason") or "").strip()
+                if not reason:
+                    abort_no_reason += 1
+        return total, todo, abort, abort_no_reason
+
+    try:
+        if stream:
+            # Constant memory: items are decoded one by one (runner/gates/g2_checklist_completion.py).
+            try:
+                total, todo, abort, abort_no_reason = count(iter_checklist_items(checklist))
+            except CheckFlowExportError:
+                # CheckFlow coach export: map its nodes the same way G2 does (one export = one session)
+                data = json.loads(checklist.read_text(encoding="utf-8"))
+                total, todo, abort, abort_no_reason = count(checkflow_items(data))
+        else:
+            data = json.loads(checklist.read_text(encoding="utf-8"))
+            if is_checkflow_export(data):
+                items = list(checkflow_items(data))
+            else:
+                items = data.get("items", [])
+            if not isinstance(items, list):
+                return StepResult(step_id, "FAIL", {"error": "checklist.items must be a list"})
+            total, todo, abort, abort_no_reason = count(items)
+    except ChecklistFormatError as exc:
+        return StepResult(step_id, "FAIL", {"error": str(exc)})
 
     abort_rate = (abort / total) if total else 0.0
 
@@ -132,6 +545,19 @@ def run_pack(pack_file: Path) -> Tuple[int, List[StepResult]]:
                 sid,
                 Path(s["target"]),
                 Path(s["schema"]),
+                int(s.get("max_errors", 0)),
+                bool(s.get("fail_fast", False)),
+                bool(s.get("count_errors", False)),
+                bool(s.get("split_items", False)),
+                int(s.get("jobs", 0)),
+            )
+        elif kind == "schema_registry":
+            res = gate_schema_registry(
+                sid,
+                Path(s["registry"]),
+                Path(s.get("root", ".")),
+                int(s.get("jobs", 0)),
+                int(s.get("max_errors", 0)),
             )
         elif kind == "ambiguity":
             res = gate_ambiguity(
@@ -147,6 +573,7 @@ def run_pack(pack_file: Path) -> Tuple[int, List[StepResult]]:
                 bool(s.get("fail_if_todo", True)),
                 bool(s.get("fail_if_abort_without_reason", True)),
                 float(s.get("warn_if_abort_rate_over", 0.3)),
+                bool(s.get("stream", False)),
             )
         elif kind == "md_yaml_paste_guard":
             # Strictly block YAML-like rows inside Markdown.
@@ -183,20 +610,37 @@ def run_pack(pack_file: Path) -> Tuple[int, List[StepResult]]:
 def main():
     import argparse
     ap = argparse.ArgumentParser()
-    ap.add_argument("--pack", required=True, help="pack yaml path, e.g., packs/pln_pack/pln.pack.yaml")
+    ap.add_argument("--pack", help="pack yaml path, e.g., packs/pln_pack/pln.pack.yaml")
+    ap.add_argument("--registry", help="bulk-validate every YAML under --root against schema_registry.yaml, e.g., packs/pln_pack/schema_registry.yaml")
+    ap.add_argument("--root", default=".", help="scan root for --registry (match patterns are relative to it)")
+    ap.add_argument("--jobs", type=int, default=0, help="worker processes for --registry (0 = cpu count)")
+    ap.add_argument("--max_errors", type=int, default=0, help="--registry: stop after N schema errors per file (0 = all)")
     ap.add_argument("--outdir", default="output", help="output dir")
     args = ap.parse_args()
+    if bool(args.pack) == bool(args.registry):
+        ap.error("specify exactly one of --pack or --registry")
 
     outdir = Path(args.outdir)
     outdir.mkdir(parents=True, exist_ok=True)
 
-    exit_code, results = run_pack(Path(args.pack))
-    report = {
-        "pack": args.pack,
-        "exit_code": exit_code,
-        "results": [{"step_id": r.step_id, "status": r.status, "details": r.details} for r in results],
-    }
-    write_json(outdir / "pln_gate_report.json", report)
+    if args.registry:
+        res = gate_schema_registry("G3-REGISTRY", Path(args.registry), Path(args.root), args.jobs, args.max_errors)
+        exit_code = 2 if res.status == "FAIL" else 0
+        results = [res]
+        report = {
+            "registry": args.registry,
+            "exit_code": exit_code,
+            "results": [{"step_id": res.step_id, "status": res.status, "details": res.details}],
+        }
+        write_json(outdir / "schema_registry_report.json", report)
+    else:
+        exit_code, results = run_pack(Path(args.pack))
+        report = {
+            "pack": args.pack,
+            "exit_code": exit_code,
+            "results": [{"step_id": r.step_id, "status": r.status, "details": r.details} for r in results],
+        }
+        write_json(outdir / "pln_gate_report.json", report)
 
     # Print human-readable summary
     for r in results:
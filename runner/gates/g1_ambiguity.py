@@ -18,15 +18,36 @@ G1: 曖昧語チェック（Ambiguity Gate） - 汎用（企画〜運用で使
 - ただしCIを止めるのは「手順/要求（PROC_REQ）」カテゴリのみ
 - 除外できるのも PROC_REQ のみ（ズルいPASS防止）
 
+辞書:
+- 既定の曖昧語（build_default_rules）に、外部辞書（--dict、複数可）をマージする
+- 外部辞書の形式: 1行1語、term<TAB>severity<TAB>note（severity/note は省略可）
+- マージ後の語彙は Aho-Corasick オートマトンに変換し、辞書ハッシュ単位でプロセス内に保持
+  （語彙数に関係なく、1行あたりの照合コストは行長に比例）
+
 出力:
-- output/target/<sanitized_target>/<mmdd_hhss>.json（上書き回避）
+- 実行履歴: output/G1/g1_history.sqlite3（追記のみ。1実行=runs 1行、1検出=findings 1行、
+  1走査ファイル=scanned_files 1行。検出0件のファイルも残るので「クリーン」と「未走査」を区別できる）
+- 全文レポート（--report。ファイル名は履歴の run_id。履歴無効時は日時+乱数）:
+    - gz  : output/G1/reports/<run_id>.json.gz（既定）
+    - json: output/G1/reports/<run_id>.json（非圧縮）
+    - none: 出力しない（履歴のみ）
+- 履歴照会: --history_file <file> [--history_target <target>] [--history_category PROC_REQ] [--history_last 50]
+  （直近 N 回は「そのファイルを走査した実行」で数える）
+
+ライブラリ利用:
+- G1Session: エディタ連携用。編集範囲の行だけを再スキャンする（コードブロック状態の変化は伝播）
 """
 
 from __future__ import annotations
 
 import argparse
+import gzip
+import hashlib
 import json
 import re
+import sqlite3
+import uuid
+from collections import deque
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
@@ -49,45 +70,200 @@ def find_repo_root(start: Path) -> Path:
 
 ROOT = find_repo_root(Path(__file__))
 DEFAULT_OUT_ROOT = ROOT / "output" / "G1"
+DEFAULT_HISTORY_DB = DEFAULT_OUT_ROOT / "g1_history.sqlite3"
 
 
 # ----------------------------
-# 出力（G3互換）
+# 出力
 # ----------------------------
 
-def sanitize_path_as_dirname(root: Path, p: Path) -> str:
-    try:
-        rel = p.resolve().relative_to(root.resolve())
-        parts = list(rel.parts)
-    except Exception:
-        parts = list(p.parts)
-
-    parts = [x for x in parts if x and not re.match(r"^[A-Za-z]:\\?$", x)]
-    name = "_".join(parts)
-    name = re.sub(r"[^A-Za-z0-9._-]", "_", name)
-    name = re.sub(r"_+", "_", name).strip("_")
-    return name or "unknown_target"
-
-
-def unique_output_path(out_dir: Path, base_name: str, ext: str = ".json") -> Path:
-    p = out_dir / f"{base_name}{ext}"
-    if not p.exists():
-        return p
-    i = 1
-    while True:
-        cand = out_dir / f"{base_name}_{i:02d}{ext}"
-        if not cand.exists():
-            return cand
-        i += 1
-
-
-def build_g3_style_output_path(repo_root: Path, output_root: Path, target_path: Path) -> Path:
-    output_root.mkdir(parents=True, exist_ok=True)
-    tgt = sanitize_path_as_dirname(repo_root, target_path)
-    out_dir = output_root / tgt
+def build_report_path(output_root: Path, run_id: Optional[int], ext: str = ".json.gz") -> Path:
+    """履歴の run_id で一意に決まる（exists() による探索はしない）"""
+    out_dir = output_root / "reports"
     out_dir.mkdir(parents=True, exist_ok=True)
-    ts = datetime.now().strftime("%m%d_%H%S")
-    return unique_output_path(out_dir, ts, ".json")
+    if run_id is not None:
+        return out_dir / f"{run_id:08d}{ext}"
+    return out_dir / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}{ext}"
+
+
+def write_report(path: Path, report: Dict) -> None:
+    data = json.dumps(report, ensure_ascii=False, indent=2)
+    if path.suffix == ".gz":
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(data)
+    else:
+        path.write_text(data, encoding="utf-8")
+
+
+# ----------------------------
+# 実行履歴（SQLite / 追記のみ）
+# ----------------------------
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp     TEXT NOT NULL,
+    target        TEXT NOT NULL,
+    exit_code     INTEGER NOT NULL,
+    files         INTEGER NOT NULL,
+    hits          INTEGER NOT NULL,
+    high          INTEGER NOT NULL,
+    med           INTEGER NOT NULL,
+    low           INTEGER NOT NULL,
+    quote_hits    INTEGER NOT NULL,
+    desc_hits     INTEGER NOT NULL,
+    proc_req_hits INTEGER NOT NULL,
+    proc_req_fail INTEGER NOT NULL,
+    config_json   TEXT NOT NULL,
+    report_path   TEXT
+);
+CREATE TABLE IF NOT EXISTS findings (
+    run_id    INTEGER NOT NULL REFERENCES runs(run_id),
+    file      TEXT,
+    line      INTEGER,
+    severity  TEXT NOT NULL,
+    term      TEXT NOT NULL,
+    category  TEXT NOT NULL,
+    excluded  INTEGER NOT NULL,
+    context   TEXT,
+    note      TEXT
+);
+CREATE TABLE IF NOT EXISTS scanned_files (
+    run_id        INTEGER NOT NULL REFERENCES runs(run_id),
+    file          TEXT NOT NULL,
+    hits          INTEGER NOT NULL,
+    proc_req_fail INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_target ON runs(target, run_id);
+CREATE INDEX IF NOT EXISTS idx_findings_file ON findings(file, category, run_id);
+CREATE INDEX IF NOT EXISTS idx_scanned_file ON scanned_files(file, run_id);
+"""
+
+
+def open_history(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(HISTORY_SCHEMA)
+    return conn
+
+
+def record_run(
+    conn: sqlite3.Connection,
+    report: Dict,
+    findings: List[Dict],
+    files: Optional[List[str]] = None,
+) -> int:
+    """
+    1実行分を追記する（commit は呼び出し側）
+    - findings は max_findings で打ち切る前の全件を入れる
+    - files は走査した全ファイル。検出0件のファイルも scanned_files に残す
+    """
+    s = report["summary"]
+    cur = conn.execute(
+        "INSERT INTO runs (timestamp, target, exit_code, files, hits, high, med, low,"
+        " quote_hits, desc_hits, proc_req_hits, proc_req_fail, config_json)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            report["timestamp"], report["target"], report["exit_code"],
+            s["files"], s["hits"], s["high"], s["med"], s["low"],
+            s["quote"], s["desc"], s["proc_req"], s["proc_req_fail"],
+            json.dumps(report["config"], ensure_ascii=False),
+        ),
+    )
+    run_id = int(cur.lastrowid)
+    conn.executemany(
+        "INSERT INTO findings (run_id, file, line, severity, term, category, excluded, context, note)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (run_id, f.get("file"), f.get("line"), f.get("severity"), f.get("term"),
+             f.get("category"), 1 if f.get("excluded") else 0, f.get("context"), f.get("note"))
+            for f in findings
+        ],
+    )
+
+    per_file: Dict[str, List[int]] = {}
+    for f in files or []:
+        per_file.setdefault(f, [0, 0])
+    for f in findings:
+        fp = f.get("file")
+        if fp is None:
+            continue
+        c = per_file.setdefault(fp, [0, 0])
+        c[0] += 1
+        if f.get("category") == "PROC_REQ" and not f.get("excluded"):
+            c[1] += 1
+    conn.executemany(
+        "INSERT INTO scanned_files (run_id, file, hits, proc_req_fail) VALUES (?, ?, ?, ?)",
+        [(run_id, fp, c[0], c[1]) for fp, c in per_file.items()],
+    )
+    return run_id
+
+
+def _file_runs_sql(file: str, target: Optional[str], last_runs: int, columns: str) -> Tuple[str, List]:
+    """
+    file を走査した実行を新しい順に last_runs 件選ぶ SQL（scanned_files の (file, run_id) 索引だけで引ける）
+    - target 指定時だけ runs を結合して絞り込む（上限は絞り込み後に適用）
+    """
+    sql = f"SELECT {columns} FROM scanned_files s"
+    params: List = []
+    if target:
+        sql += " JOIN runs r ON r.run_id = s.run_id AND r.target = ?"
+        params.append(target)
+    sql += " WHERE s.file = ? ORDER BY s.run_id DESC LIMIT ?"
+    params += [file, max(0, last_runs)]
+    return sql, params
+
+
+def query_file_runs(
+    conn: sqlite3.Connection,
+    file: str,
+    target: Optional[str] = None,
+    last_runs: int = 50,
+) -> List[Dict]:
+    """
+    file を走査した直近 last_runs 回の実行を新しい順に返す
+    - hits=0 の行は「走査したが検出なし（クリーン）」。行が無ければ未走査
+    """
+    runs_sql, params = _file_runs_sql(file, target, last_runs, "s.run_id, s.hits, s.proc_req_fail")
+    sql = (
+        "SELECT r.run_id, r.timestamp, r.target, s.hits, s.proc_req_fail"
+        f" FROM ({runs_sql}) s JOIN runs r ON r.run_id = s.run_id ORDER BY r.run_id DESC"
+    )
+    cols = ["run_id", "timestamp", "target", "hits", "proc_req_fail"]
+    return [dict(zip(cols, r)) for r in conn.execute(sql, params)]
+
+
+def query_history(
+    conn: sqlite3.Connection,
+    file: str,
+    category: Optional[str] = "PROC_REQ",
+    last_runs: int = 50,
+    include_excluded: bool = False,
+    target: Optional[str] = None,
+) -> List[Dict]:
+    """file を走査した直近 last_runs 回の実行のうち、file の検出を新しい順に返す"""
+    runs_sql, runs_params = _file_runs_sql(file, target, last_runs, "s.run_id")
+    sql = (
+        "SELECT r.run_id, r.timestamp, r.target, f.line, f.severity, f.term, f.category, f.excluded, f.context"
+        " FROM findings f JOIN runs r ON r.run_id = f.run_id"
+        f" WHERE f.file = ? AND f.run_id IN ({runs_sql})"
+    )
+    params: List = [file, *runs_params]
+    if category:
+        sql += " AND f.category = ?"
+        params.append(category)
+    if not include_excluded:
+        sql += " AND f.excluded = 0"
+    sql += " ORDER BY f.run_id DESC, f.line"
+
+    cols = ["run_id", "timestamp", "target", "line", "severity", "term", "category", "excluded", "context"]
+    out = []
+    for r in conn.execute(sql, params):
+        d = dict(zip(cols, r))
+        d["excluded"] = bool(d["excluded"])
+        out.append(d)
+    return out
 
 
 # ----------------------------
@@ -96,30 +272,164 @@ def build_g3_style_output_path(repo_root: Path, output_root: Path, target_path:
 
 @dataclass
 class AmbiguityRule:
-    term: str
+    term: str      # 表示名（"十分(に)?" のように表記ゆれを含めて書いてよい）
     severity: str  # HIGH/MED/LOW
-    pattern: re.Pattern
     note: str = ""
+    literal: str = ""  # マッチャ（オートマトン）に登録する固定文字列。照合はこれだけで行う（空なら term）
+
+
+SEVERITIES = ("HIGH", "MED", "LOW")
+DEFAULT_DICT_SEVERITY = "MED"
 
 
 def build_default_rules() -> List[AmbiguityRule]:
+    # (term, severity, literal, note)
+    # literal は term の表記が1行内でヒットするための必要十分な固定文字列（"十分(に)?" → "十分"）
     defs = [
-        ("適切に", "HIGH", r"適切に", "基準が不明。定義/条件/閾値を要求"),
-        ("柔軟に", "HIGH", r"柔軟に", "例外条件や優先順位が不明になりやすい"),
-        ("なるべく", "MED", r"なるべく", "上限/下限/努力義務の範囲が不明"),
-        ("可能な限り", "MED", r"可能な限り", "達成条件の欠落"),
-        ("基本的に", "MED", r"基本的に", "例外条件が未定義になりやすい"),
-        ("適宜", "MED", r"適宜", "判断者・判断基準が曖昧"),
-        ("十分(に)?", "LOW", r"十分(に)?", "“十分”の定義が必要"),
-        ("できるだけ", "LOW", r"できるだけ", "同上"),
-        ("必要に応じて", "LOW", r"必要に応じて", "条件の明記が必要"),
+        ("適切に", "HIGH", "適切に", "基準が不明。定義/条件/閾値を要求"),
+        ("柔軟に", "HIGH", "柔軟に", "例外条件や優先順位が不明になりやすい"),
+        ("なるべく", "MED", "なるべく", "上限/下限/努力義務の範囲が不明"),
+        ("可能な限り", "MED", "可能な限り", "達成条件の欠落"),
+        ("基本的に", "MED", "基本的に", "例外条件が未定義になりやすい"),
+        ("適宜", "MED", "適宜", "判断者・判断基準が曖昧"),
+        ("十分(に)?", "LOW", "十分", "“十分”の定義が必要"),
+        ("できるだけ", "LOW", "できるだけ", "同上"),
+        ("必要に応じて", "LOW", "必要に応じて", "条件の明記が必要"),
     ]
     rules: List[AmbiguityRule] = []
-    for term, sev, pat, note in defs:
-        rules.append(AmbiguityRule(term=term, severity=sev, pattern=re.compile(pat), note=note))
+    for term, sev, lit, note in defs:
+        rules.append(AmbiguityRule(term=term, severity=sev, note=note, literal=lit))
     return rules
 
 
+def load_dictionary(path: Path) -> List[Tuple[str, str, str]]:
+    """
+    外部辞書を読む。(term, severity, note) のリストを返す
+    - 形式: term<TAB>severity<TAB>note（severity/note は省略可。severity 省略時は MED）
+    - 空行と # 始まりの行は無視
+    """
+    if not path.exists():
+        raise SystemExit(f"dictionary が見つかりません: {path}")
+
+    entries: List[Tuple[str, str, str]] = []
+    for i, raw in enumerate(path.read_text(encoding="utf-8").splitlines(), start=1):
+        if not raw.strip() or raw.lstrip().startswith("#"):
+            continue
+        cols = [c.strip() for c in raw.split("\t")]
+        term = cols[0]
+        sev = (cols[1] if len(cols) > 1 and cols[1] else DEFAULT_DICT_SEVERITY).upper()
+        note = cols[2] if len(cols) > 2 else ""
+        if not term:
+            continue
+        if sev not in SEVERITIES:
+            raise SystemExit(f"dictionary の severity が不正です（HIGH/MED/LOW）: {path}:{i}: {raw}")
+        entries.append((term, sev, note))
+    return entries
+
+
+def merge_rules(rules: List[AmbiguityRule], entries: List[Tuple[str, str, str]]) -> List[AmbiguityRule]:
+    """
+    既定ルールに外部辞書をマージする
+    - 同じ固定文字列の語は後勝ちで severity/note を上書き（term は既存を維持）
+    - 新しい語は固定文字列ルールとして末尾に追加
+    """
+    merged = list(rules)
+    by_literal = {r.literal or r.term: i for i, r in enumerate(merged)}
+    for term, sev, note in entries:
+        idx = by_literal.get(term)
+        if idx is not None:
+            cur = merged[idx]
+            merged[idx] = AmbiguityRule(term=cur.term, severity=sev, note=note or cur.note, literal=cur.literal)
+            continue
+        by_literal[term] = len(merged)
+        merged.append(AmbiguityRule(term=term, severity=sev, note=note, literal=term))
+    return merged
+
+
+# ----------------------------
+# マッチャ（Aho-Corasick）
+# ----------------------------
+
+@dataclass
+class TermMatcher:
+    """
+    rules の固定文字列をまとめた Aho-Corasick オートマトン
+    - goto: 状態ごとの遷移表
+    - fail: 失敗遷移
+    - out : 状態に到達したときにヒットする rule index（失敗遷移先の分もマージ済み）
+    """
+    goto: List[Dict[str, int]]
+    fail: List[int]
+    out: List[Tuple[int, ...]]
+
+    def match_rule_ids(self, line: str) -> List[int]:
+        """行内でヒットした rule index を rules の並び順で返す（1ルール1回）"""
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        hit = set()
+        for ch in line:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                hit.update(out[state])
+        return sorted(hit)
+
+
+def build_matcher(rules: List[AmbiguityRule]) -> TermMatcher:
+    goto: List[Dict[str, int]] = [{}]
+    out_sets: List[set] = [set()]
+    for idx, r in enumerate(rules):
+        lit = r.literal or r.term
+        if not lit:
+            continue
+        state = 0
+        for ch in lit:
+            nxt = goto[state].get(ch)
+            if nxt is None:
+                nxt = len(goto)
+                goto[state][ch] = nxt
+                goto.append({})
+                out_sets.append(set())
+            state = nxt
+        out_sets[state].add(idx)
+
+    fail = [0] * len(goto)
+    queue = deque(goto[0].values())
+    while queue:
+        u = queue.popleft()
+        for ch, v in goto[u].items():
+            queue.append(v)
+            f = fail[u]
+            while f and ch not in goto[f]:
+                f = fail[f]
+            fail[v] = goto[f].get(ch, 0) if u else 0
+            out_sets[v] |= out_sets[fail[v]]
+
+    return TermMatcher(goto=goto, fail=fail, out=[tuple(sorted(o)) for o in out_sets])
+
+
+def rules_hash(rules: List[AmbiguityRule]) -> str:
+    """オートマトンは固定文字列の並びだけで決まるので、それをハッシュする"""
+    payload = json.dumps([r.literal or r.term for r in rules], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# 辞書ハッシュ → マッチャ（プロセス内のメモ）。
+# ディスクへのキャッシュは置かない: JSON から読み戻して検証する費用が build_matcher とほぼ同じで
+# （2万語で 170ms 対 280ms）、書き込み可能なディレクトリを信頼する入力を増やすだけだったため
+_MATCHER_MEMO: Dict[str, TermMatcher] = {}
+
+
+def get_matcher(rules: List[AmbiguityRule]) -> TermMatcher:
+    """同じ辞書（固定文字列の並び）なら同じプロセス内で1回だけ組み立てる"""
+    key = rules_hash(rules)
+    matcher = _MATCHER_MEMO.get(key)
+    if matcher is None:
+        matcher = _MATCHER_MEMO[key] = build_matcher(rules)
+    return matcher
+
+
 # ----------------------------
 # 入力収集
 # ----------------------------
@@ -174,6 +484,16 @@ def categorize_line(line: str, in_code_block: bool) -> str:
     return "DESC"
 
 
+def fence_state(line: str, in_code: bool) -> Tuple[bool, bool]:
+    """
+    (この行の in_code_block, 次の行へ渡す in_code) を返す
+    - fence行自体もQUOTE扱いにして、状態をトグルする
+    """
+    if line.strip().startswith("```"):
+        return True, not in_code
+    return in_code, in_code
+
+
 def split_lines_with_code_state(text: str) -> List[Tuple[int, str, bool]]:
     """
     (lineno, line, in_code_block) を返す
@@ -182,12 +502,8 @@ def split_lines_with_code_state(text: str) -> List[Tuple[int, str, bool]]:
     out: List[Tuple[int, str, bool]] = []
     in_code = False
     for i, line in enumerate(text.splitlines(), start=1):
-        if line.strip().startswith("```"):
-            # fence行自体もQUOTE扱いだが、ここではトグルのみ
-            out.append((i, line, True))
-            in_code = not in_code
-            continue
-        out.append((i, line, in_code))
+        line_in_code, in_code = fence_state(line, in_code)
+        out.append((i, line, line_in_code))
     return out
 
 
@@ -228,44 +544,160 @@ def load_excludes(exclude_file: Optional[Path]) -> Dict[Tuple[str, int, str, str
 # 検出
 # ----------------------------
 
+def scan_line(line: str, in_code: bool, matcher: TermMatcher) -> Tuple[Tuple[int, str], ...]:
+    """1行分の (rule index, category) を返す。ヒットが無ければカテゴリ判定もしない"""
+    rule_ids = matcher.match_rule_ids(line)
+    if not rule_ids:
+        return ()
+    category = categorize_line(line, in_code_block=in_code)
+    return tuple((ri, category) for ri in rule_ids)
+
+
+def make_finding(
+    file_path: Path,
+    lineno: int,
+    line: str,
+    rule: AmbiguityRule,
+    category: str,
+    excludes: Dict[Tuple[str, int, str, str], Dict],
+    context_window: int = 40,
+) -> Dict:
+    ctx = line.strip()
+    if len(ctx) > 2 * context_window:
+        ctx = ctx[:context_window] + " … " + ctx[-context_window:]
+
+    key = (str(file_path), lineno, rule.term, category)
+    excluded = key in excludes
+
+    return {
+        "file": str(file_path),
+        "line": lineno,
+        "severity": rule.severity,
+        "term": rule.term,
+        "category": category,           # QUOTE / DESC / PROC_REQ
+        "excluded": bool(excluded),     # PROC_REQ のみ true になり得る
+        "context": ctx,
+        "note": rule.note,
+        "exclude_reason": excludes.get(key, {}).get("reason") if excluded else None,
+        "approved_by": excludes.get(key, {}).get("approved_by") if excluded else None,
+        "approved_at": excludes.get(key, {}).get("approved_at") if excluded else None,
+    }
+
+
 def scan_text(
     file_path: Path,
     text: str,
     rules: List[AmbiguityRule],
     excludes: Dict[Tuple[str, int, str, str], Dict],
     context_window: int = 40,
+    matcher: Optional[TermMatcher] = None,
 ) -> List[Dict]:
     findings: List[Dict] = []
+    if matcher is None:
+        matcher = get_matcher(rules)
 
     for lineno, line, in_code in split_lines_with_code_state(text):
-        category = categorize_line(line, in_code_block=in_code)
-
-        for r in rules:
-            if r.pattern.search(line):
-                ctx = line.strip()
-                if len(ctx) > 2 * context_window:
-                    ctx = ctx[:context_window] + " … " + ctx[-context_window:]
-
-                key = (str(file_path), lineno, r.term, category)
-                excluded = key in excludes
-
-                findings.append({
-                    "file": str(file_path),
-                    "line": lineno,
-                    "severity": r.severity,
-                    "term": r.term,
-                    "category": category,           # QUOTE / DESC / PROC_REQ
-                    "excluded": bool(excluded),     # PROC_REQ のみ true になり得る
-                    "context": ctx,
-                    "note": r.note,
-                    "exclude_reason": excludes.get(key, {}).get("reason") if excluded else None,
-                    "approved_by": excludes.get(key, {}).get("approved_by") if excluded else None,
-                    "approved_at": excludes.get(key, {}).get("approved_at") if excluded else None,
-                })
+        for ri, category in scan_line(line, in_code, matcher):
+            findings.append(make_finding(file_path, lineno, line, rules[ri], category, excludes, context_window))
 
     return findings
 
 
+# ----------------------------
+# インクリメンタル再スキャン（エディタ連携）
+# ----------------------------
+
+class G1Session:
+    """
+    エディタ連携用のインプロセス G1
+    - バッファを行単位で保持し、編集された行だけを再スキャンする
+    - ``` の増減でコードブロック状態が変わった場合は、状態が編集前と一致する行まで伝播させる
+    - findings の行番号・除外判定は取り出し時に計算する（編集で行がずれても再スキャン不要）
+
+    使い方:
+        s = G1Session(Path("doc.md"), text)
+        s.apply_edit(10, 11, "新しい10行目")   # lines[10:11] を置き換え（0始まり・半開区間）
+        s.findings()
+    """
+
+    def __init__(
+        self,
+        file_path: Path,
+        text: str = "",
+        rules: Optional[List[AmbiguityRule]] = None,
+        excludes: Optional[Dict[Tuple[str, int, str, str], Dict]] = None,
+        matcher: Optional[TermMatcher] = None,
+        context_window: int = 40,
+    ):
+        self.file_path = file_path
+        self.rules = rules if rules is not None else build_default_rules()
+        self.excludes = excludes or {}
+        self.matcher = matcher if matcher is not None else get_matcher(self.rules)
+        self.context_window = context_window
+        self.set_text(text)
+
+    def set_text(self, text: str) -> None:
+        """バッファ全体を差し替えて全行スキャンする"""
+        self.lines: List[str] = []
+        self._in_code: List[bool] = []   # 行自体の in_code_block
+        self._after: List[bool] = []     # 次の行へ渡す in_code
+        self._hits: List[Tuple[Tuple[int, str], ...]] = []
+        self.apply_edit(0, 0, text)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+    def apply_edit(self, start: int, end: int, new_text: str) -> Tuple[int, int]:
+        """
+        lines[start:end] を new_text の行で置き換え、影響のある行だけ再スキャンする
+        - 挿入は start == end、削除は new_text == ""
+        - 戻り値: 再スキャンした行の範囲 [first, last)（0始まり・編集後の行番号）
+        """
+        n = len(self.lines)
+        if not (0 <= start <= end <= n):
+            raise ValueError(f"edit range out of bounds: [{start}, {end}) for {n} lines")
+
+        new_lines = new_text.splitlines()
+        k = len(new_lines)
+        self.lines[start:end] = new_lines
+        self._in_code[start:end] = [False] * k
+        self._after[start:end] = [False] * k
+        self._hits[start:end] = [()] * k
+
+        state = self._after[start - 1] if start > 0 else False
+        edited_end = start + k
+        i = start
+        total = len(self.lines)
+        while i < total:
+            line_in_code, nxt = fence_state(self.lines[i], state)
+            if i >= edited_end and line_in_code == self._in_code[i] and nxt == self._after[i]:
+                # 編集範囲より後ろで状態が編集前と一致 → 以降の行は変化なし
+                break
+            self._in_code[i] = line_in_code
+            self._after[i] = nxt
+            self._hits[i] = scan_line(self.lines[i], line_in_code, self.matcher)
+            state = nxt
+            i += 1
+        return start, i
+
+    def findings(self, start: int = 0, end: Optional[int] = None) -> List[Dict]:
+        """lines[start:end] の findings を返す（line は1始まり）"""
+        stop = len(self.lines) if end is None else min(end, len(self.lines))
+        out: List[Dict] = []
+        for i in range(max(0, start), stop):
+            hits = self._hits[i]
+            if not hits:
+                continue
+            line = self.lines[i]
+            for ri, category in hits:
+                out.append(make_finding(self.file_path, i + 1, line, self.rules[ri], category, self.excludes, self.context_window))
+        return out
+
+    def summary(self) -> Dict:
+        return summarize(self.findings(), total_files=1)
+
+
 def summarize(findings: List[Dict], total_files: int) -> Dict:
     sev_count = {"HIGH": 0, "MED": 0, "LOW": 0}
     cat_count = {"QUOTE": 0, "DESC": 0, "PROC_REQ": 0}
@@ -307,22 +739,57 @@ def exit_code_from_summary(summary: Dict) -> int:
 
 def build_argparser() -> argparse.ArgumentParser:
     ap = argparse.ArgumentParser(description="G1 Ambiguity Gate (reusable)")
-    ap.add_argument("--target", required=True, help="対象ファイル or ディレクトリ")
-    ap.add_argument("--out_root", default=str(DEFAULT_OUT_ROOT), help="出力ルート（G3互換）")
+    ap.add_argument("--target", default=None, help="対象ファイル or ディレクトリ（履歴照会時は不要）")
+    ap.add_argument("--out_root", default=str(DEFAULT_OUT_ROOT), help="出力ルート（reports/ 配下にレポートを書く）")
     ap.add_argument("--exclude_file", default=None, help="除外リスト YAML（PROC_REQのみ許可）")
     ap.add_argument("--max_findings", type=int, default=300, help="出力に載せる最大件数（多すぎ防止）")
+    ap.add_argument("--dict", action="append", default=[], help="外部辞書（term<TAB>severity<TAB>note）。複数指定可")
+    ap.add_argument("--history_db", default=str(DEFAULT_HISTORY_DB), help="実行履歴 SQLite（空文字で無効）")
+    ap.add_argument("--report", choices=("gz", "json", "none"), default="gz", help="全文レポートの出力形式（reports/<run_id>.json.gz / .json / 出力しない）")
+    ap.add_argument("--history_file", default=None, help="履歴照会: 対象ファイル（走査時のパスと完全一致）")
+    ap.add_argument("--history_target", default=None, help="履歴照会: 実行時の --target で絞り込む（直近N回の前に適用）")
+    ap.add_argument("--history_category", default="PROC_REQ", help="履歴照会: カテゴリ（空文字で全カテゴリ）")
+    ap.add_argument("--history_last", type=int, default=50, help="履歴照会: 直近何回の実行を見るか")
     return ap
 
 
+def run_history_query(args: argparse.Namespace) -> int:
+    if not args.history_db:
+        raise SystemExit("--history_file には --history_db が必要です")
+    db_path = Path(args.history_db)
+    if not db_path.exists():
+        raise SystemExit(f"history_db が見つかりません: {db_path}")
+    conn = open_history(db_path)
+    try:
+        runs = query_file_runs(conn, args.history_file, args.history_target, args.history_last)
+        rows = query_history(
+            conn, args.history_file, args.history_category or None, args.history_last, target=args.history_target
+        )
+    finally:
+        conn.close()
+    print(json.dumps({"file": args.history_file, "runs": runs, "findings": rows}, ensure_ascii=False, indent=2))
+    return 0
+
+
 def main() -> int:
     ap = build_argparser()
     args = ap.parse_args()
 
+    if args.history_file:
+        return run_history_query(args)
+    if not args.target:
+        ap.error("--target は必須です")
+
     target = Path(args.target)
     out_root = Path(args.out_root)
     exclude_file = Path(args.exclude_file) if args.exclude_file else None
 
+    dict_files = [Path(d) for d in args.dict]
+
     rules = build_default_rules()
+    for d in dict_files:
+        rules = merge_rules(rules, load_dictionary(d))
+    matcher = get_matcher(rules)
     excludes = load_excludes(exclude_file)
 
     files = collect_targets(target)
@@ -348,8 +815,9 @@ def main() -> int:
             })
             continue
 
-        all_findings.extend(scan_text(f, text, rules, excludes))
+        all_findings.extend(scan_text(f, text, rules, excludes, matcher=matcher))
 
+    indexed_findings = all_findings
     if len(all_findings) > args.max_findings:
         all_findings = all_findings[:args.max_findings] + [{
             "file": None,
@@ -368,8 +836,6 @@ def main() -> int:
     summary = summarize(all_findings, total_files=len(files))
     code = exit_code_from_summary(summary)
 
-    out_path = build_g3_style_output_path(ROOT, out_root, target)
-
     report = {
         "gate": "G1_AMBIGUITY",
         "target": str(target),
@@ -378,15 +844,34 @@ def main() -> int:
             "exclude_file": str(exclude_file) if exclude_file else None,
             "max_findings": args.max_findings,
             "rules_count": len(rules),
+            "dictionaries": [str(d) for d in dict_files],
+            "rules_hash": rules_hash(rules),
             "fail_policy": "FAIL if any PROC_REQ not excluded",
         },
         "summary": summary,
         "findings": all_findings,
         "exit_code": code,
-        "output_file": str(out_path),
+        "output_file": None,
     }
 
-    out_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    conn = open_history(Path(args.history_db)) if args.history_db else None
+    try:
+        run_id = record_run(conn, report, indexed_findings, [str(f) for f in files]) if conn else None
+
+        out_path: Optional[Path] = None
+        if args.report != "none":
+            out_path = build_report_path(out_root, run_id, ".json.gz" if args.report == "gz" else ".json")
+
+        if out_path is not None:
+            report["output_file"] = str(out_path)
+            write_report(out_path, report)
+            if conn:
+                conn.execute("UPDATE runs SET report_path = ? WHERE run_id = ?", (str(out_path), run_id))
+        if conn:
+            conn.commit()
+    finally:
+        if conn:
+            conn.close()
 
     # コンソール（CIログ用）
     print("=== G1 Ambiguity Gate ===")
@@ -394,9 +879,11 @@ def main() -> int:
     print(f"files          : {summary['files']}")
     print(f"hits           : {summary['hits']} (HIGH={summary['high']}, MED={summary['med']}, LOW={summary['low']})")
     print(f"categories     : PROC_REQ={summary['proc_req']} (FAIL={summary['proc_req_fail']}), DESC={summary['desc']}, QUOTE={summary['quote']}")
+    print(f"rules          : {len(rules)} (dict={len(dict_files)})")
     print(f"exclude_file   : {exclude_file if exclude_file else '(none)'}")
     print(f"exit_code      : {code}")
-    print(f"report_file    : {out_path}")
+    print(f"history_db     : {args.history_db if args.history_db else '(none)'} (run_id={run_id})")
+    print(f"report_file    : {out_path if out_path else '(none)'}")
 
     return code
 
@@ -25,14 +25,41 @@ Input JSON shape (minimum)
       ...
     ]
   }
+
+CheckFlow exports (--checkflow)
+  CheckFlow coach exports (coach-ui-export-*.json: "nodes" map with
+  status / pendingReason / riskLevel / actorName / checkedItems) are read
+  natively. Status mapping: ToDo, InProgress -> todo; Done -> done;
+  Pending -> abort (pendingReason is the reason). Many exports are
+  aggregated in one run (per-file map in a process pool, then reduce) and
+  the summary is broken down by phase, risk level and actor. Nodes without
+  an actorName are counted under "(unassigned)", never under the user who
+  exported the file.
+
+Streaming (--stream)
+  The top-level "items" array is decoded one element at a time, so memory
+  use does not grow with the number of items. Other top-level values are
+  decoded and discarded. A CheckFlow export passed to --checklist --stream
+  is detected by its "nodes" map and read as a whole (one export is one
+  session, so it stays small).
 """
 
 from __future__ import annotations
 
 import argparse
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+
+class ChecklistFormatError(ValueError):
+    """Raised when a streamed checklist file is not the expected JSON shape."""
+
+
+class CheckFlowExportError(ChecklistFormatError):
+    """Raised by iter_checklist_items when the file is a CheckFlow export (top-level "nodes" map)."""
 
 
 def _as_str(x: Any) -> str:
@@ -43,39 +70,274 @@ def load_json(path: Path) -> Dict[str, Any]:
     return json.loads(path.read_text(encoding="utf-8"))
 
 
-def summarize_items(items: List[dict]) -> Dict[str, Any]:
-    total = len(items)
-    todo = 0
-    done = 0
-    abort = 0
-    abort_no_reason = 0
+class _JsonStream:
+    """Minimal pull reader over a text file, decoding one JSON value at a time."""
+
+    _WS = " \t\r\n"
+    _DELIMS = _WS + ",:]}"
+
+    def __init__(self, f, chunk_size: int):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._dec = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        if self._pos:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        # grow reads with the pending value so large elements are not re-decoded too often
+        data = self._f.read(max(self._chunk_size, len(self._buf)))
+        if not data:
+            self._eof = True
+            return False
+        self._buf += data
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in self._WS:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def take(self, expected: str) -> None:
+        c = self.peek()
+        if c not in expected:
+            raise ChecklistFormatError(f"expected one of {expected!r} but got {c or 'EOF'!r}")
+        self._pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                obj, end = self._dec.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError as exc:
+                if self._fill():
+                    continue
+                raise ChecklistFormatError(f"invalid JSON: {exc}") from exc
+            if (end == len(self._buf) or self._buf[end] not in self._DELIMS) and self._fill():
+                # a value cut at the chunk boundary ("1." / "12e") decodes short; retry with more input
+                continue
+            self._pos = end
+            return obj
+
 
+def iter_checklist_items(path: Path, chunk_size: int = 1 << 16) -> Iterator[dict]:
+    """Yield checklist.items one by one without loading the whole file."""
+    with path.open(encoding="utf-8") as f:
+        js = _JsonStream(f, chunk_size)
+        if js.peek() != "{":
+            raise ChecklistFormatError("checklist root must be an object")
+        js.take("{")
+        if js.peek() == "}":
+            return
+        while True:
+            key = js.value()
+            if not isinstance(key, str):
+                raise ChecklistFormatError("object key must be a string")
+            js.take(":")
+            if key == "nodes" and js.peek() == "{":
+                # same precedence as the non-streaming path: a nodes map means a CheckFlow export
+                raise CheckFlowExportError("CheckFlow export (nodes map) is not a checklist.items file")
+            if key == "items":
+                if js.peek() != "[":
+                    raise ChecklistFormatError("checklist.items must be a list")
+                js.take("[")
+                if js.peek() == "]":
+                    js.take("]")
+                else:
+                    while True:
+                        yield js.value()
+                        if js.peek() == "]":
+                            js.take("]")
+                            break
+                        js.take(",")
+            else:
+                js.value()
+            if js.peek() == "}":
+                return
+            js.take(",")
+
+
+def _empty_counts() -> Dict[str, int]:
+    return {"total": 0, "todo": 0, "done": 0, "abort": 0, "abort_no_reason": 0}
+
+
+def count_item(counts: Dict[str, int], it: dict) -> None:
+    counts["total"] += 1
+    status = _as_str(it.get("status")).strip().lower()
+    if status == "todo":
+        counts["todo"] += 1
+    elif status == "done":
+        counts["done"] += 1
+    elif status == "abort":
+        counts["abort"] += 1
+        reason = _as_str(it.get("reason")).strip()
+        if not reason:
+            counts["abort_no_reason"] += 1
+    else:
+        # Unknown status is treated as todo-like for safety
+        counts["todo"] += 1
+
+
+def _with_rate(counts: Dict[str, int]) -> Dict[str, Any]:
+    total = counts["total"]
+    out: Dict[str, Any] = dict(counts)
+    out["abort_rate"] = (counts["abort"] / total) if total else 0.0
+    return out
+
+
+def summarize_items(items: Iterable[dict]) -> Dict[str, Any]:
+    counts = _empty_counts()
     for it in items:
-        status = _as_str(it.get("status")).strip().lower()
-        if status == "todo":
-            todo += 1
-        elif status == "done":
-            done += 1
-        elif status == "abort":
-            abort += 1
-            reason = _as_str(it.get("reason")).strip()
-            if not reason:
-                abort_no_reason += 1
-        else:
-            # Unknown status is treated as todo-like for safety
-            todo += 1
+        count_item(counts, it)
+    return _with_rate(counts)
+
+
+# CheckFlow coach exports (tools/checklist/CheckFlow)
+
+CHECKFLOW_STATUS = {
+    "todo": "todo",
+    "inprogress": "todo",
+    "pending": "abort",  # Pending = skipped with a reason
+    "done": "done",
+}
+UNASSIGNED_ACTOR = "(unassigned)"
+
 
-    abort_rate = (abort / total) if total else 0.0
+def is_checkflow_export(data: Any) -> bool:
+    return isinstance(data, dict) and isinstance(data.get("nodes"), dict)
+
+
+def checkflow_items(export: Dict[str, Any]) -> Iterator[dict]:
+    """Map CheckFlow nodes onto the checklist item shape used by G2.
+
+    The export-level "actor" is whoever exported the file, not the owner of
+    the nodes, so nodes without an actorName go to UNASSIGNED_ACTOR.
+    """
+    for node_id, node in export["nodes"].items():
+        node = node or {}
+        status = _as_str(node.get("status")).strip()
+        checked = node.get("checkedItems") or {}
+        yield {
+            "id": node_id,
+            "status": CHECKFLOW_STATUS.get(status.lower(), status),
+            "reason": node.get("pendingReason"),
+            "risk_level": _as_str(node.get("riskLevel")).strip() or "(none)",
+            "actor": _as_str(node.get("actorName")).strip() or UNASSIGNED_ACTOR,
+            "checked": sum(1 for v in checked.values() if v),
+            "checks": len(checked),
+        }
+
+
+def _empty_rollup() -> Dict[str, Any]:
     return {
-        "total": total,
-        "todo": todo,
-        "done": done,
-        "abort": abort,
-        "abort_no_reason": abort_no_reason,
-        "abort_rate": abort_rate,
+        "exports": 0,
+        "counts": _empty_counts(),
+        "checked_items": 0,
+        "checked_items_total": 0,
+        "phase": {},
+        "risk_level": {},
+        "actor": {},
+        "errors": [],
     }
 
 
+def reduce_checkflow_export(path: str) -> Dict[str, Any]:
+    """Per-file partial rollup (runs in a worker process)."""
+    part = _empty_rollup()
+    try:
+        data = load_json(Path(path))
+    except Exception as exc:
+        part["errors"].append({"file": path, "error": f"{type(exc).__name__}: {exc}"})
+        return part
+    if not is_checkflow_export(data):
+        part["errors"].append({"file": path, "error": "not a CheckFlow export (nodes map missing)"})
+        return part
+
+    part["exports"] = 1
+    phase = _as_str(data.get("phaseId")).strip() or "(unknown)"
+    phase_counts = part["phase"].setdefault(phase, _empty_counts())
+    for it in checkflow_items(data):
+        count_item(part["counts"], it)
+        count_item(phase_counts, it)
+        count_item(part["risk_level"].setdefault(it["risk_level"], _empty_counts()), it)
+        count_item(part["actor"].setdefault(it["actor"], _empty_counts()), it)
+        part["checked_items"] += it["checked"]
+        part["checked_items_total"] += it["checks"]
+    return part
+
+
+def _merge_counts(dst: Dict[str, int], src: Dict[str, int]) -> None:
+    for k, v in src.items():
+        dst[k] += v
+
+
+def merge_rollups(dst: Dict[str, Any], src: Dict[str, Any]) -> Dict[str, Any]:
+    dst["exports"] += src["exports"]
+    _merge_counts(dst["counts"], src["counts"])
+    dst["checked_items"] += src["checked_items"]
+    dst["checked_items_total"] += src["checked_items_total"]
+    for dim in ("phase", "risk_level", "actor"):
+        for key, counts in src[dim].items():
+            _merge_counts(dst[dim].setdefault(key, _empty_counts()), counts)
+    dst["errors"].extend(src["errors"])
+    return dst
+
+
+def expand_export_paths(inputs: List[str]) -> List[str]:
+    out: List[str] = []
+    for raw in inputs:
+        p = Path(raw)
+        if p.is_dir():
+            out.extend(str(x) for x in sorted(p.glob("coach-ui-export-*.json")))
+        elif p.is_file():
+            out.append(str(p))
+        else:
+            out.extend(str(x) for x in sorted(Path(".").glob(raw)) if x.is_file())
+    return list(dict.fromkeys(out))
+
+
+def rollup_checkflow_exports(paths: List[str], jobs: int = 0) -> Dict[str, Any]:
+    """
+    Aggregate many CheckFlow exports with a parallel map (per file) + reduce.
+    jobs <= 0 uses os.cpu_count(); jobs == 1 runs in-process.
+    """
+    total = _empty_rollup()
+    workers = jobs if jobs > 0 else (os.cpu_count() or 1)
+    if workers <= 1 or len(paths) <= 1:
+        parts = map(reduce_checkflow_export, paths)
+        for part in parts:
+            merge_rollups(total, part)
+        return total
+
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        for part in ex.map(reduce_checkflow_export, paths, chunksize=chunksize):
+            merge_rollups(total, part)
+    return total
+
+
+def summarize_rollup(rollup: Dict[str, Any]) -> Dict[str, Any]:
+    summary = _with_rate(rollup["counts"])
+    summary["exports"] = rollup["exports"]
+    summary["checked_items"] = rollup["checked_items"]
+    summary["checked_items_total"] = rollup["checked_items_total"]
+    summary["breakdown"] = {
+        dim: {k: _with_rate(v) for k, v in sorted(rollup[dim].items())}
+        for dim in ("phase", "risk_level", "actor")
+    }
+    summary["errors"] = rollup["errors"]
+    return summary
+
+
 def decide_exit_code(
     summary: Dict[str, Any],
     fail_if_todo: bool,
@@ -97,24 +359,56 @@ def decide_exit_code(
 
 def main() -> None:
     ap = argparse.ArgumentParser()
-    ap.add_argument("--checklist", required=True, help="path to checklist results json")
+    ap.add_argument("--checklist", default=None, help="path to checklist results json")
+    ap.add_argument("--checkflow", nargs="+", default=None, help="CheckFlow export files/dirs/globs (coach-ui-export-*.json)")
+    ap.add_argument("--jobs", type=int, default=0, help="worker processes for --checkflow (0 = cpu count)")
+    ap.add_argument("--out", default="", help="optional json report output path")
     ap.add_argument("--fail-if-todo", action="store_true", default=False)
     ap.add_argument("--fail-if-abort-without-reason", action="store_true", default=False)
     ap.add_argument("--warn-if-abort-rate-over", type=float, default=0.30)
+    ap.add_argument("--stream", action="store_true", default=False, help="stream checklist.items instead of loading the whole file")
     args = ap.parse_args()
 
-    path = Path(args.checklist)
-    if not path.exists():
-        print(f"[G2] FAIL checklist not found: {path}")
-        raise SystemExit(2)
+    if not args.checklist and not args.checkflow:
+        ap.error("one of --checklist or --checkflow is required")
+
+    if args.checkflow:
+        paths = expand_export_paths(args.checkflow)
+        if not paths:
+            print(f"[G2] FAIL no CheckFlow exports found: {args.checkflow}")
+            raise SystemExit(2)
+        summary = summarize_rollup(rollup_checkflow_exports(paths, jobs=args.jobs))
+        if summary["errors"]:
+            print(f"[G2] FAIL unreadable exports={len(summary['errors'])}")
+            for e in summary["errors"][:10]:
+                print(f"  {e['file']}: {e['error']}")
+            raise SystemExit(2)
+    else:
+        path = Path(args.checklist)
+        if not path.exists():
+            print(f"[G2] FAIL checklist not found: {path}")
+            raise SystemExit(2)
 
-    data = load_json(path)
-    items = data.get("items", [])
-    if not isinstance(items, list):
-        print("[G2] FAIL checklist.items must be a list")
-        raise SystemExit(2)
+        if args.stream:
+            try:
+                summary = summarize_items(iter_checklist_items(path))
+            except CheckFlowExportError:
+                summary = summarize_items(checkflow_items(load_json(path)))
+            except ChecklistFormatError as exc:
+                print(f"[G2] FAIL {exc}")
+                raise SystemExit(2)
+        else:
+            data = load_json(path)
+            if is_checkflow_export(data):
+                items = list(checkflow_items(data))
+            else:
+                items = data.get("items", [])
+            if not isinstance(items, list):
+                print("[G2] FAIL checklist.items must be a list")
+                raise SystemExit(2)
+
+            summary = summarize_items(items)
 
-    summary = summarize_items(items)
     code, label = decide_exit_code(
         summary,
         fail_if_todo=bool(args.fail_if_todo),
@@ -122,6 +416,11 @@ def main() -> None:
         warn_if_abort_rate_over=float(args.warn_if_abort_rate_over),
     )
 
+    if args.out:
+        outp = Path(args.out)
+        outp.parent.mkdir(parents=True, exist_ok=True)
+        outp.write_text(json.dumps({"status": label, "exit_code": code, "summary": summary}, ensure_ascii=False, indent=2), encoding="utf-8")
+
     print(
         "[G2] "
         + label
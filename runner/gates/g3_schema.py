@@ -17,6 +17,24 @@ G4 DeepEval Gate — PLN Transform Quality Check
     - FaithfulnessのReasonは非表示（タイムアウト回避）
 
 評価2 (Checklist): 構造化YAMLがチェックリストのルールを満たすか（プログラムで検証）
+    - 全ルールを YAML の1回の走査で評価（run_checklist_rules）
+    - ルールに check: があれば宣言的チェックとして評価（コード追加なしで REQ/BAS 等のルールを定義可能）
+
+        - rule_id: REQ-CONS-100
+          title: "GOAL YAMLの必須キー"
+          severity: fail
+          check:
+            files: "GOAL"                  # 対象: ファイル名（大文字）にこの文字列を含む（省略時は全YAML）
+            file_regex: "^REQ-.*\\.yaml$"   # 対象: ファイル名の正規表現（files と併用可）
+            require_files: true            # 対象が0件ならFAIL（files/file_regex 指定時の既定 true）
+            required: [meta.artifact_id]   # キーパスが存在する
+            non_empty: [goal.primary_goal] # キーパスが存在し空でない（null/空文字/空配列/空dictはNG）
+            forbid_regex:                  # 文字列値に出現してはならないパターン
+              - pattern: "\\b(TODO|TBD)\\b"
+                ignore_case: true
+                exclude_top_keys: [meta]
+            equals_filename: [meta.file]   # 値がファイル名と一致する
+            in_stem: [meta.artifact_id]    # 値（空でなければ）がファイル名ステムに含まれる
 
 出力: JSON + Allure互換結果ファイル
 
@@ -45,16 +63,23 @@ G4 DeepEval Gate — PLN Transform Quality Check
 import os
 import sys
 import glob
+import itertools
 import json
 import uuid
 import re
 import time
 import yaml
 from pathlib import Path
+from typing import Any
 from datetime import datetime
 
-from deepeval.metrics import FaithfulnessMetric
-from deepeval.test_case import LLMTestCase
+# deepeval は Faithfulness 評価でのみ使う（Checklist 評価・全スキップ時は不要）
+DEEPEVAL_AVAILABLE = True
+try:
+    from deepeval.metrics import FaithfulnessMetric
+    from deepeval.test_case import LLMTestCase
+except Exception:
+    DEEPEVAL_AVAILABLE = False
 
 # ─── Config ───────────────────────────────────────────────────────────────────
 
@@ -260,6 +285,8 @@ def eval_faithfulness(ref_content: str, yaml_files: dict, main_ref_path: str) ->
 
         print(f"  [EVAL] Faithfulness: {fname} ...", end=" ", flush=True)
         try:
+            if not DEEPEVAL_AVAILABLE:
+                raise RuntimeError("deepeval をインポートできません（Faithfulness 評価不可）")
             metric = FaithfulnessMetric(
                 threshold=WARN_THRESHOLD,
                 model=EVAL_MODEL,
@@ -316,130 +343,457 @@ _META_REQUIRED_KEYS = {"artifact_id", "file", "author", "source_type", "timestam
 _TODO_PATTERN = re.compile(r"\b(TODO|TBD|PENDING)\b", re.IGNORECASE)
 
 
-def _non_meta_yaml_str(yaml_data: dict) -> str:
-    without_meta = {k: v for k, v in yaml_data.items() if k != "meta"}
-    try:
-        return yaml.dump(without_meta, allow_unicode=True, default_flow_style=False)
-    except Exception:
-        return ""
+# PLN-CONS-060 で1ファイルあたり報告するヒット箇所の上限（上限+1件で走査を打ち切る）
+_TODO_MAX_HITS = 5
+
+
+def _iter_string_scalars(data: Any, prefix: str = "", skip_top_keys: frozenset = frozenset()):
+    """
+    (キーパス, 文字列) を文書順に返すジェネレータ。
+    yaml.dump で再シリアライズせず、文字列のキー・値を直接たどる。
+    skip_top_keys はトップレベルでのみ除外する（例: meta）。
+    """
+    if isinstance(data, dict):
+        for k, v in data.items():
+            if not prefix and k in skip_top_keys:
+                continue
+            p = f"{prefix}.{k}" if prefix else str(k)
+            if isinstance(k, str):
+                yield p, k
+            yield from _iter_string_scalars(v, p)
+    elif isinstance(data, list):
+        for i, v in enumerate(data):
+            yield from _iter_string_scalars(v, f"{prefix}[{i}]")
+    elif isinstance(data, str):
+        yield prefix, data
+
+
+def _iter_todo_hits(yaml_data: Any):
+    """meta 以外の文字列に現れる TODO/TBD/PENDING を (キーパス, 語) で順に返す。"""
+    for path, text in _iter_string_scalars(yaml_data, skip_top_keys=frozenset({"meta"})):
+        for m in _TODO_PATTERN.finditer(text):
+            yield path, m.group(1)
+
+
+# ─── Checklist rule engine (single traversal) ───────────────────────────────
+#
+# 各ルールは visit()（YAML 1ファイル分）と result()（最終判定）を持つ。
+# エンジンは YAML を1回だけ走査し、走査中に有効な全ルールの visit() を呼ぶ。
+# → コストは O(ファイル数 × 1走査)。ルールが増えても YAML の再走査は発生しない。
+
+
+class RuleCheck:
+    """ルール1件分の状態。per_file=False のルールは visit() されない。"""
 
+    per_file = True
 
-def _find_yaml_by_purpose(yaml_files: dict, purpose: str) -> dict:
-    return {fp: info for fp, info in yaml_files.items() if purpose in Path(fp).name.upper()}
+    def __init__(self, rule_id: str):
+        self.rule_id = rule_id
+        self.failures: list = []
+
+    def visit(self, fp: str, name: str, data: dict) -> None:
+        pass
+
+    def result(self, yaml_files: dict) -> dict:
+        return {"passed": True, "detail": f"ルール {self.rule_id} は自動チェック対象外（スキップ）"}
+
+
+class _MdExists(RuleCheck):  # PLN-CONS-001
+    per_file = False
+
+    def __init__(self, rule_id: str, md_glob_pattern: str):
+        super().__init__(rule_id)
+        self.md_glob_pattern = md_glob_pattern
+
+    def result(self, yaml_files: dict) -> dict:
+        md_files = glob.glob(self.md_glob_pattern)
+        if md_files:
+            names = [Path(f).name for f in md_files]
+            return {"passed": True, "detail": f"{len(md_files)}件存在: {names}"}
+        return {"passed": False, "detail": "PLN-PLN-*.md が見つかりません"}
+
+
+class _YamlExists(RuleCheck):  # PLN-CONS-002
+    per_file = False
+
+    def result(self, yaml_files: dict) -> dict:
+        if yaml_files:
+            return {"passed": True, "detail": f"{len(yaml_files)}件のYAMLが存在します"}
+        return {"passed": False, "detail": "PLN-PLN-*.yaml が見つかりません"}
+
+
+class _MdFrontmatterSkip(RuleCheck):  # PLN-CONS-010
+    per_file = False
+
+    def result(self, yaml_files: dict) -> dict:
+        return {"passed": True, "detail": "企画書本文MDはプレーンMarkdown形式（YAML frontmatterなし）のためスキップ"}
+
+
+class _MetaRequiredKeys(RuleCheck):  # PLN-CONS-011
+    def visit(self, fp: str, name: str, data: dict) -> None:
+        meta = data.get("meta") or {}
+        if not meta:
+            self.failures.append(f"{name}: metaセクションなし")
+            return
+        missing = _META_REQUIRED_KEYS - set(meta.keys())
+        if missing:
+            self.failures.append(f"{name}: 欠如キー={sorted(missing)}")
+
+    def result(self, yaml_files: dict) -> dict:
+        if self.failures:
+            return {"passed": False, "detail": " / ".join(self.failures)}
+        return {"passed": True, "detail": f"全{len(yaml_files)}件でmeta必須キー確認済み"}
+
+
+class _MetaFileMatches(RuleCheck):  # PLN-CONS-020
+    def visit(self, fp: str, name: str, data: dict) -> None:
+        declared = data.get("meta", {}).get("file", "")
+        if declared != name:
+            self.failures.append(f"{name}: meta.file='{declared}'")
+
+    def result(self, yaml_files: dict) -> dict:
+        if self.failures:
+            return {"passed": False, "detail": "不一致: " + " / ".join(self.failures)}
+        return {"passed": True, "detail": "全YAMLでmeta.fileと実ファイル名が一致"}
+
+
+class _ContentHashSet(RuleCheck):  # PLN-CONS-030
+    def visit(self, fp: str, name: str, data: dict) -> None:
+        h = str(data.get("meta", {}).get("content_hash", "") or "")
+        if h.upper() in ("PENDING", "TODO", ""):
+            self.failures.append(f"{name}: content_hash='{h}'")
+
+    def result(self, yaml_files: dict) -> dict:
+        if self.failures:
+            return {"passed": False, "detail": "未設定: " + " / ".join(self.failures)}
+        return {"passed": True, "detail": "全YAMLのcontent_hashが設定済み"}
+
+
+class _ArtifactIdInStem(RuleCheck):  # PLN-CONS-040
+    def visit(self, fp: str, name: str, data: dict) -> None:
+        stem = Path(fp).stem
+        artifact_id = data.get("meta", {}).get("artifact_id", "") or ""
+        if artifact_id and artifact_id not in stem:
+            self.failures.append(f"{name}: artifact_id='{artifact_id}'がステムに含まれない")
+
+    def result(self, yaml_files: dict) -> dict:
+        if self.failures:
+            return {"passed": False, "detail": "不一致: " + " / ".join(self.failures)}
+        return {"passed": True, "detail": "全YAMLのファイル名にartifact_idが含まれる"}
+
+
+class _NoTodoOutsideMeta(RuleCheck):  # PLN-CONS-060
+    def visit(self, fp: str, name: str, data: dict) -> None:
+        hits = list(itertools.islice(_iter_todo_hits(data), _TODO_MAX_HITS + 1))
+        if not hits:
+            return
+        shown = ", ".join(f"{path}={word}" for path, word in hits[:_TODO_MAX_HITS])
+        more = " ..." if len(hits) > _TODO_MAX_HITS else ""
+        self.failures.append(f"{name}: {shown}{more}")
+
+    def result(self, yaml_files: dict) -> dict:
+        if self.failures:
+            return {"passed": False, "detail": "TODO/TBD/PENDING残存: " + " / ".join(self.failures)}
+        return {"passed": True, "detail": "meta以外にTODO/TBD/PENDINGなし"}
+
+
+class _GoalRequiredKeys(RuleCheck):  # PLN-CONS-100
+    required = ["primary_goal", "success_criteria", "scope_in", "scope_out", "abort_conditions"]
+
+    def __init__(self, rule_id: str):
+        super().__init__(rule_id)
+        self.matched: list = []
+
+    def visit(self, fp: str, name: str, data: dict) -> None:
+        if "GOAL" not in name.upper():
+            return
+        self.matched.append(name)
+        goal = data.get("goal") or {}
+        missing = [k for k in self.required if not goal.get(k)]
+        if missing:
+            self.failures.append(f"{name}: goal.{missing}が欠如または空")
+
+    def result(self, yaml_files: dict) -> dict:
+        if not self.matched:
+            return {"passed": False, "detail": "PLN-PLN-GOAL-*.yaml が見つかりません"}
+        if self.failures:
+            return {"passed": False, "detail": " / ".join(self.failures)}
+        return {"passed": True, "detail": f"GOAL YAML必須キー確認済み: {self.matched}"}
+
+
+class _ScopeRequiredKeys(RuleCheck):  # PLN-CONS-110
+    def __init__(self, rule_id: str):
+        super().__init__(rule_id)
+        self.matched: list = []
+
+    def visit(self, fp: str, name: str, data: dict) -> None:
+        if "SCOPE" not in name.upper():
+            return
+        self.matched.append(name)
+        scope = data.get("scope") or {}
+        if not scope.get("scope_in"):
+            self.failures.append(f"{name}: scope.scope_in が欠如")
+        if not scope.get("scope_out"):
+            self.failures.append(f"{name}: scope.scope_out が欠如")
+        terminology = scope.get("terminology") or {}
+        glossary = terminology.get("glossary") or []
+        if not glossary:
+            self.failures.append(f"{name}: scope.terminology.glossary が空または欠如")
+
+    def result(self, yaml_files: dict) -> dict:
+        if not self.matched:
+            return {"passed": False, "detail": "PLN-PLN-SCOPE-*.yaml が見つかりません"}
+        if self.failures:
+            return {"passed": False, "detail": " / ".join(self.failures)}
+        return {"passed": True, "detail": f"SCOPE YAML必須キー確認済み: {self.matched}"}
+
+
+# ─── Declarative checks (checklist YAML の check:) ─────────────────────────────
+#
+# check: をルール読み込み時に一度だけ述語関数のリストへコンパイルする。
+# 述語は (name, stem, data) -> [失敗メッセージ] で、単一走査エンジンの visit() から呼ばれる。
+
+_MISSING = object()
+
+
+def _split_key_path(path: str) -> tuple:
+    parts = []
+    for seg in str(path).split("."):
+        if not seg:
+            raise ValueError(f"不正なキーパス: '{path}'")
+        parts.append(int(seg) if seg.isdigit() else seg)
+    return tuple(parts)
+
+
+def _get_path(data: Any, parts: tuple) -> Any:
+    cur = data
+    for seg in parts:
+        if isinstance(seg, int) and isinstance(cur, list):
+            if seg >= len(cur):
+                return _MISSING
+            cur = cur[seg]
+        elif isinstance(cur, dict) and seg in cur:
+            cur = cur[seg]
+        else:
+            return _MISSING
+    return cur
+
+
+def _is_empty_value(v: Any) -> bool:
+    if v is None or v is _MISSING:
+        return True
+    if isinstance(v, str):
+        return v.strip() == ""
+    if isinstance(v, (list, dict)):
+        return len(v) == 0
+    return False
+
+
+def _as_list(v: Any, key: str, item_types: tuple = (str, int)) -> list:
+    """
+    単体値 or リストをリストへ揃える。要素の型は item_types に限定する
+    - 既定はキーパス用（str/int）。dict などはキーパスとして受け付けない
+    """
+    if v is None:
+        return []
+    items = v if isinstance(v, list) else [v]
+    for x in items:
+        if isinstance(x, bool) or not isinstance(x, item_types):
+            raise ValueError(f"{key} の要素の型が不正です: {x!r}")
+    return items
+
+
+def _spec_str(v: Any, key: str) -> Any:
+    if v is not None and not isinstance(v, str):
+        raise ValueError(f"{key} は文字列で指定してください: {v!r}")
+    return v
+
+
+def compile_check_spec(spec: dict) -> tuple:
+    """
+    check: をコンパイルする。
+    戻り値: (file_filter(name) -> bool, require_files, [predicate(name, stem, data) -> list[str]])
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("check は mapping で指定してください")
+    known = {"files", "file_regex", "require_files", "required", "non_empty", "forbid_regex", "equals_filename", "in_stem"}
+    unknown = set(spec) - known
+    if unknown:
+        raise ValueError(f"未知のキー: {sorted(unknown)}")
+
+    files_sub = str(spec["files"]).upper() if spec.get("files") else None
+    file_regex = _spec_str(spec.get("file_regex"), "file_regex")
+    file_re = re.compile(file_regex) if file_regex else None
+
+    def file_filter(name: str) -> bool:
+        if files_sub is not None and files_sub not in name.upper():
+            return False
+        if file_re is not None and not file_re.search(name):
+            return False
+        return True
+
+    require_files = bool(spec.get("require_files", files_sub is not None or file_re is not None))
+    preds = []
+
+    for path in _as_list(spec.get("required"), "required"):
+        parts = _split_key_path(path)
+
+        def pred(name, stem, data, parts=parts, path=path):
+            return [f"{name}: {path} が欠如"] if _get_path(data, parts) is _MISSING else []
+        preds.append(pred)
+
+    for path in _as_list(spec.get("non_empty"), "non_empty"):
+        parts = _split_key_path(path)
+
+        def pred(name, stem, data, parts=parts, path=path):
+            return [f"{name}: {path} が欠如または空"] if _is_empty_value(_get_path(data, parts)) else []
+        preds.append(pred)
+
+    for item in _as_list(spec.get("forbid_regex"), "forbid_regex", (str, dict)):
+        if isinstance(item, str):
+            item = {"pattern": item}
+        pattern = _spec_str(item.get("pattern"), "forbid_regex.pattern")
+        if not pattern:
+            raise ValueError("forbid_regex.pattern がありません")
+        flags = re.IGNORECASE if item.get("ignore_case") else 0
+        rx = re.compile(pattern, flags)
+        skip = frozenset(_as_list(item.get("exclude_top_keys", ["meta"]), "exclude_top_keys", (str,)))
+
+        def pred(name, stem, data, rx=rx, skip=skip):
+            hits = [p for p, v in _iter_string_scalars(data, skip_top_keys=skip) if rx.search(v)]
+            return [f"{name}: /{rx.pattern}/ が {hits} に残存"] if hits else []
+        preds.append(pred)
+
+    for path in _as_list(spec.get("equals_filename"), "equals_filename"):
+        parts = _split_key_path(path)
+
+        def pred(name, stem, data, parts=parts, path=path):
+            v = _get_path(data, parts)
+            declared = "" if v is _MISSING else v
+            return [f"{name}: {path}='{declared}' がファイル名と不一致"] if declared != name else []
+        preds.append(pred)
+
+    for path in _as_list(spec.get("in_stem"), "in_stem"):
+        parts = _split_key_path(path)
+
+        def pred(name, stem, data, parts=parts, path=path):
+            v = _get_path(data, parts)
+            if _is_empty_value(v):
+                return []
+            return [f"{name}: {path}='{v}' がステムに含まれない"] if str(v) not in stem else []
+        preds.append(pred)
+
+    return file_filter, require_files, preds
+
+
+class DeclarativeCheck(RuleCheck):
+    """check: から生成したルール。対象ファイルごとにコンパイル済み述語を適用する。"""
+
+    def __init__(self, rule_id: str, spec: dict):
+        super().__init__(rule_id)
+        self.file_filter, self.require_files, self.preds = compile_check_spec(spec)
+        self.matched: list = []
+
+    def visit(self, fp: str, name: str, data: dict) -> None:
+        if not self.file_filter(name):
+            return
+        self.matched.append(name)
+        stem = Path(fp).stem
+        for pred in self.preds:
+            self.failures.extend(pred(name, stem, data))
+
+    def result(self, yaml_files: dict) -> dict:
+        if self.require_files and not self.matched:
+            return {"passed": False, "detail": "対象YAMLが見つかりません"}
+        if self.failures:
+            return {"passed": False, "detail": " / ".join(self.failures)}
+        return {"passed": True, "detail": f"宣言的チェックOK: 対象{len(self.matched)}件"}
+
+
+class _InvalidCheck(RuleCheck):
+    per_file = False
+
+    def __init__(self, rule_id: str, error: Exception):
+        super().__init__(rule_id)
+        self.error = error
+
+    def result(self, yaml_files: dict) -> dict:
+        return {"passed": False, "detail": f"チェック定義エラー: {self.error}"}
+
+
+def make_rule_check(rule: dict, md_glob_pattern: str) -> RuleCheck:
+    rule_id = rule["rule_id"]
+    if rule.get("check") is not None:
+        try:
+            return DeclarativeCheck(rule_id, rule["check"])
+        except (ValueError, KeyError, re.error) as exc:
+            return _InvalidCheck(rule_id, exc)
+    if rule_id == "PLN-CONS-001":
+        return _MdExists(rule_id, md_glob_pattern)
+    builtin = {
+        "PLN-CONS-002": _YamlExists,
+        "PLN-CONS-010": _MdFrontmatterSkip,
+        "PLN-CONS-011": _MetaRequiredKeys,
+        "PLN-CONS-020": _MetaFileMatches,
+        "PLN-CONS-030": _ContentHashSet,
+        "PLN-CONS-040": _ArtifactIdInStem,
+        "PLN-CONS-060": _NoTodoOutsideMeta,
+        "PLN-CONS-100": _GoalRequiredKeys,
+        "PLN-CONS-110": _ScopeRequiredKeys,
+    }.get(rule_id)
+    if builtin is not None:
+        return builtin(rule_id)
+    check = RuleCheck(rule_id)
+    check.per_file = False
+    return check
+
+
+def run_checklist_rules(rules: list, yaml_files: dict, md_glob_pattern: str) -> list:
+    """
+    全ルールを YAML の1回の走査で評価する。
+    戻り値は rules と同じ順の [{"passed", "detail", "duration_ms"}]。
+    ルール内で例外が出た場合、そのルールだけ以降の visit を止めてエラー扱いにする。
+    """
+    checks = [make_rule_check(r, md_glob_pattern) for r in rules]
+    elapsed = [0.0] * len(checks)
+    errors: dict = {}
+    walkers = [i for i, c in enumerate(checks) if c.per_file]
+
+    for fp, info in yaml_files.items():
+        if not walkers:
+            break
+        name = Path(fp).name
+        data = info["data"]
+        for i in walkers:
+            if i in errors:
+                continue
+            t0 = time.perf_counter()
+            try:
+                checks[i].visit(fp, name, data)
+            except Exception as exc:
+                errors[i] = exc
+            elapsed[i] += time.perf_counter() - t0
+
+    results = []
+    for i, c in enumerate(checks):
+        t0 = time.perf_counter()
+        if i in errors:
+            res = {"passed": False, "detail": f"チェック実行エラー: {errors[i]}"}
+        else:
+            try:
+                res = c.result(yaml_files)
+            except Exception as exc:
+                res = {"passed": False, "detail": f"チェック実行エラー: {exc}"}
+        elapsed[i] += time.perf_counter() - t0
+        res["duration_ms"] = int(elapsed[i] * 1000)
+        results.append(res)
+    return results
 
 
 def check_rule(rule_id: str, yaml_files: dict, md_glob_pattern: str) -> dict:
-    try:
-        if rule_id == "PLN-CONS-001":
-            md_files = glob.glob(md_glob_pattern)
-            if md_files:
-                names = [Path(f).name for f in md_files]
-                return {"passed": True, "detail": f"{len(md_files)}件存在: {names}"}
-            return {"passed": False, "detail": "PLN-PLN-*.md が見つかりません"}
-
-        if rule_id == "PLN-CONS-002":
-            if yaml_files:
-                return {"passed": True, "detail": f"{len(yaml_files)}件のYAMLが存在します"}
-            return {"passed": False, "detail": "PLN-PLN-*.yaml が見つかりません"}
-
-        if rule_id == "PLN-CONS-010":
-            return {"passed": True, "detail": "企画書本文MDはプレーンMarkdown形式（YAML frontmatterなし）のためスキップ"}
-
-        if rule_id == "PLN-CONS-011":
-            failures = []
-            for fp, info in yaml_files.items():
-                meta = info["data"].get("meta") or {}
-                if not meta:
-                    failures.append(f"{Path(fp).name}: metaセクションなし")
-                    continue
-                missing = _META_REQUIRED_KEYS - set(meta.keys())
-                if missing:
-                    failures.append(f"{Path(fp).name}: 欠如キー={sorted(missing)}")
-            if failures:
-                return {"passed": False, "detail": " / ".join(failures)}
-            return {"passed": True, "detail": f"全{len(yaml_files)}件でmeta必須キー確認済み"}
-
-        if rule_id == "PLN-CONS-020":
-            failures = []
-            for fp, info in yaml_files.items():
-                actual = Path(fp).name
-                declared = info["data"].get("meta", {}).get("file", "")
-                if declared != actual:
-                    failures.append(f"{actual}: meta.file='{declared}'")
-            if failures:
-                return {"passed": False, "detail": "不一致: " + " / ".join(failures)}
-            return {"passed": True, "detail": "全YAMLでmeta.fileと実ファイル名が一致"}
-
-        if rule_id == "PLN-CONS-030":
-            bad = []
-            for fp, info in yaml_files.items():
-                h = str(info["data"].get("meta", {}).get("content_hash", "") or "")
-                if h.upper() in ("PENDING", "TODO", ""):
-                    bad.append(f"{Path(fp).name}: content_hash='{h}'")
-            if bad:
-                return {"passed": False, "detail": "未設定: " + " / ".join(bad)}
-            return {"passed": True, "detail": "全YAMLのcontent_hashが設定済み"}
-
-        if rule_id == "PLN-CONS-040":
-            failures = []
-            for fp, info in yaml_files.items():
-                stem = Path(fp).stem
-                artifact_id = info["data"].get("meta", {}).get("artifact_id", "") or ""
-                if artifact_id and artifact_id not in stem:
-                    failures.append(f"{Path(fp).name}: artifact_id='{artifact_id}'がステムに含まれない")
-            if failures:
-                return {"passed": False, "detail": "不一致: " + " / ".join(failures)}
-            return {"passed": True, "detail": "全YAMLのファイル名にartifact_idが含まれる"}
-
-        if rule_id == "PLN-CONS-060":
-            violations = []
-            for fp, info in yaml_files.items():
-                non_meta = _non_meta_yaml_str(info["data"])
-                found = set(_TODO_PATTERN.findall(non_meta))
-                if found:
-                    violations.append(f"{Path(fp).name}: {found}")
-            if violations:
-                return {"passed": False, "detail": "TODO/TBD/PENDING残存: " + " / ".join(violations)}
-            return {"passed": True, "detail": "meta以外にTODO/TBD/PENDINGなし"}
-
-        if rule_id == "PLN-CONS-100":
-            required = ["primary_goal", "success_criteria", "scope_in", "scope_out", "abort_conditions"]
-            goal_files = _find_yaml_by_purpose(yaml_files, "GOAL")
-            if not goal_files:
-                return {"passed": False, "detail": "PLN-PLN-GOAL-*.yaml が見つかりません"}
-            failures = []
-            for fp, info in goal_files.items():
-                goal = info["data"].get("goal") or {}
-                missing = [k for k in required if not goal.get(k)]
-                if missing:
-                    failures.append(f"{Path(fp).name}: goal.{missing}が欠如または空")
-            if failures:
-                return {"passed": False, "detail": " / ".join(failures)}
-            return {"passed": True, "detail": f"GOAL YAML必須キー確認済み: {[Path(fp).name for fp in goal_files]}"}
-
-        if rule_id == "PLN-CONS-110":
-            scope_files = _find_yaml_by_purpose(yaml_files, "SCOPE")
-            if not scope_files:
-                return {"passed": False, "detail": "PLN-PLN-SCOPE-*.yaml が見つかりません"}
-            failures = []
-            for fp, info in scope_files.items():
-                scope = info["data"].get("scope") or {}
-                if not scope.get("scope_in"):
-                    failures.append(f"{Path(fp).name}: scope.scope_in が欠如")
-                if not scope.get("scope_out"):
-                    failures.append(f"{Path(fp).name}: scope.scope_out が欠如")
-                terminology = scope.get("terminology") or {}
-                glossary = terminology.get("glossary") or []
-                if not glossary:
-                    failures.append(f"{Path(fp).name}: scope.terminology.glossary が空または欠如")
-            if failures:
-                return {"passed": False, "detail": " / ".join(failures)}
-            return {"passed": True, "detail": f"SCOPE YAML必須キー確認済み: {[Path(fp).name for fp in scope_files]}"}
-
-        return {"passed": True, "detail": f"ルール {rule_id} は自動チェック対象外（スキップ）"}
-
-    except Exception as exc:
-        return {"passed": False, "detail": f"チェック実行エラー: {exc}"}
+    """単一ルール評価（互換用）。複数ルールは run_checklist_rules で一括評価する。"""
+    res = run_checklist_rules([{"rule_id": rule_id}], yaml_files, md_glob_pattern)[0]
+    return {"passed": res["passed"], "detail": res["detail"]}
 
 
 def eval_checklist(yaml_files: dict, checklist_data: dict) -> list:
@@ -448,17 +802,17 @@ def eval_checklist(yaml_files: dict, checklist_data: dict) -> list:
     scope = checklist.get("scope", {})
     md_glob_base = scope.get("planning_md_glob", "artifacts/planning/PLN-PLN-*.md")
 
+    checked = run_checklist_rules(rules, yaml_files, md_glob_base)
+
     results = []
-    for rule in rules:
+    for rule, chk in zip(rules, checked):
         rule_id = rule["rule_id"]
         rule_title = rule["title"]
         severity = rule.get("severity", "warn")
 
         label = rule_title[:55] + ("..." if len(rule_title) > 55 else "")
         print(f"  [CHECK] {rule_id}: {label}", end=" ", flush=True)
-        start = time.time()
 
-        chk = check_rule(rule_id, yaml_files, md_glob_base)
         passed = chk["passed"]
         detail = chk["detail"]
         score = 1.0 if passed else 0.0
@@ -475,7 +829,7 @@ def eval_checklist(yaml_files: dict, checklist_data: dict) -> list:
             "passed": passed,
             "status": status,
             "reason": detail,
-            "duration_ms": int((time.time() - start) * 1000),
+            "duration_ms": chk["duration_ms"],
         })
 
     return results
@@ -21,12 +21,31 @@ Faithfulness + Coverage(derived_from 1:1) + Completeness + Global Consistency
 - Completeness（derived_from 1:1 / ルールベース）: nullのまま放置されている“埋まっているべき可能性”を検知（追加APIなし）
 - Global Consistency（横断/ルールベース）: 分割YAML間や参照との矛盾を検出
 
+ライブラリとして使う場合（同一プロセスで複数ディレクトリ/工程を評価）:
+    caches = G4Caches()
+    base = G4Config.from_env()
+    for d in dirs:
+        out = run_g4(dataclasses.replace(base, yaml_dir=d), caches)  # 参照索引/LLMキャッシュ/評価バックエンドを使い回す
+
+    設定は実行ごとのコンテキスト（contextvars）で渡すので、別スレッドで異なる設定の run_g4 を同時に動かせる。
+    run_g4 を経由せずに関数を直接呼ぶ場合は with use_config(cfg): で設定を与える（無ければ import 時の環境変数）。
+
 環境変数（主なもの）:
     AIDD_STAGE                 : 対象工程 (例: PLN, REQ)
     AIDD_YAML_DIR              : 評価対象YAMLディレクトリ
     AIDD_OUT_ROOT              : 出力ルートディレクトリ
     AIDD_EVAL_MODEL            : 使用モデル (例: gpt-5.2)
 
+    # 評価バックエンド
+    AIDD_G4_EVAL_BACKEND       : deepeval|openai|local（既定 deepeval。local はモデル不要の決定的スタブ）
+    AIDD_G4_OPENAI_BASE_URL    : openai 用 /chat/completions 互換エンドポイント（既定 OPENAI_BASE_URL or https://api.openai.com/v1）
+    AIDD_G4_OPENAI_API_KEY     : openai 用APIキー（既定 OPENAI_API_KEY）
+    AIDD_G4_OPENAI_TIMEOUT_SEC : openai のHTTPタイムアウト秒（既定 120）
+    AIDD_G4_LOCAL_LATENCY_MS   : local の1リクエストあたり待ち時間（既定 0）
+    AIDD_G4_LOCAL_FAIL_RATE    : local の失敗注入率 0.0〜1.0（入力ハッシュで決定的。既定 0）
+    AIDD_G4_LOCAL_FAIL_KIND    : timeout|error（既定 timeout。timeout はリトライ経路に乗る）
+    AIDD_G4_LOCAL_SEED         : local の失敗注入シード（既定 "0"）
+
     # 参照入力
     AIDD_REF_PATHS             : 参照ファイル/ディレクトリ（md/yaml/dir/glob混在OK）
     AIDD_REF_MODE              : AUTO|MD|YAML
@@ -34,15 +53,33 @@ Faithfulness + Coverage(derived_from 1:1) + Completeness + Global Consistency
     # Faithfulness
     AIDD_FAITHFULNESS_USE_DERIVED_FROM_CONTEXT : 1で有効（既定 1）
     AIDD_FAITHFULNESS_TOPK_REF_CHUNKS          : 参照チャンク数（既定 4）
+    AIDD_FAITHFULNESS_RETRIEVAL                : 参照チャンク検索 bm25|jaccard（既定 bm25）
+    AIDD_FAITHFULNESS_BM25_K1 / _BM25_B        : BM25 パラメータ（既定 1.5 / 0.75）
     AIDD_FAITHFULNESS_REF_CHUNK_MAX_CHARS      : 参照チャンク1個の最大文字数（既定 900）
+    AIDD_G4_REF_CACHE_ENABLE                   : 参照チャンク/トークン/tf をファイル単位で永続化（既定 1）
+    AIDD_G4_REF_CACHE_DIR                      : その保存先（既定 output/G4/ref_index。キーは参照の sha256 + チャンク/トークン化パラメータ）
+    AIDD_G4_REF_CACHE_MAX_FILES                : 保存先に残すキャッシュファイル数の上限（既定 256。古いものから削除。0=無制限）
+    AIDD_G4_REF_CACHE_MAX_AGE_DAYS             : 最終使用からこの日数を過ぎたキャッシュファイルを削除（既定 30。0=無制限）
     AIDD_FAITHFULNESS_ACTUAL_MAX_CHARS         : actual_output 最大（既定 1800）
     AIDD_FAITHFULNESS_CONTEXT_MAX_CHARS        : retrieval_context 最大（既定 2200）
     AIDD_FAITHFULNESS_TRUTHS_LIMIT             : truths抽出上限（既定 10）
+    AIDD_FAITHFULNESS_TOKEN_BUDGET             : 1リクエストの概算トークン予算（既定 0=無効。有効時は文字数上限の代わりに使用。
+                                                 入力文+FaithView 128+参照 48 を下回る値は WARN を出して引き上げる）
+    AIDD_FAITHFULNESS_TOKEN_ACTUAL_RATIO       : 予算のうち FaithView に割り当てる上限比率（既定 0.45。余りは参照へ）
+    AIDD_FAITHFULNESS_CONCURRENCY              : ファイル単位の同時評価数（既定 1=逐次。結果の順序は常にファイル順）
+    AIDD_FAITHFULNESS_BATCH_SIZE               : 1リクエストにまとめる最大ファイル数（既定 1=無効）
+    AIDD_FAITHFULNESS_BATCH_MAX_TOKENS         : まとめたリクエスト1回の概算トークン上限（指示文+各ファイルの FaithView・参照。既定 6000）
     AIDD_FAITHFULNESS_RETRY_ON_TIMEOUT         : 1で有効（既定 1）
     AIDD_FAITHFULNESS_ACTUAL_MAX_CHARS_RETRY   : リトライ actual 最大（既定 1200）
     AIDD_FAITHFULNESS_CONTEXT_MAX_CHARS_RETRY  : リトライ ctx 最大（既定 1600）
     AIDD_FAITHFULNESS_TRUTHS_LIMIT_RETRY       : リトライ truths 上限（既定 6）
 
+    # LLM評価キャッシュ（キー: model / truths_limit / include_reason / 入力文 / FaithViewハッシュ / 参照コンテキストハッシュ）
+    AIDD_G4_CACHE_ENABLE                       : 1で有効（既定 1）
+    AIDD_G4_CACHE_PATH                         : SQLiteファイル（既定 output/G4/llm_cache.sqlite3）
+    AIDD_G4_CACHE_MAX_ENTRIES                  : 保持件数上限。超過分は最終利用が古い順に削除（既定 5000）
+    AIDD_G4_CACHE_TTL_SEC                      : 有効期限秒。0で無期限（既定 2592000=30日）
+
     # Faithfulness reason のモード
     AIDD_FAITHFULNESS_REASON_MODE              : local|llm（既定 local）
 
@@ -72,6 +109,15 @@ Faithfulness + Coverage(derived_from 1:1) + Completeness + Global Consistency
     AIDD_COVERAGE_SIM_THRESHOLD : 簡易類似度閾値（既定 0.25）
     AIDD_COVERAGE_SKIP_HEADINGS : 見出し(#...)を論点抽出に含めるか（1で含めない、既定 1）
 
+    # 類似度エンジン（トークン化は Coverage / Completeness / local reason / 参照チャンク検索で共通。
+    #   行列エンジンは Completeness / local reason / Jaccard 検索で使う。Coverage は転置インデックスで候補行だけを比較）
+    AIDD_G4_TOKENIZER           : word|ngram（既定 word。ngram は日本語の言い換えにも類似度が付くので閾値の見直し推奨）
+    AIDD_G4_NGRAM_SIZES         : ngram の文字数（既定 "2,3"）
+    AIDD_G4_NGRAM_HASH_DIM      : ngram のハッシュ空間サイズ（既定 1048576）
+    AIDD_G4_SIM_BACKEND         : auto|python|numpy（既定 auto。numpy 未導入なら python。scipy があれば疎行列。
+                                  numpy/scipy は任意依存: pip install -r requirements-optional.txt）
+    AIDD_G4_SIM_MATRIX_MIN_PAIRS: 比較回数がこれ未満なら純Pythonで計算（既定 2000）
+
     # Consistency
     AIDD_CONSISTENCY_ENABLE     : 1で有効（既定 1）
     AIDD_CONSISTENCY_MAX_FACTS_PER_FILE : 1ファイルから抽出するscalar fact上限（既定 1200）
@@ -80,14 +126,29 @@ Faithfulness + Coverage(derived_from 1:1) + Completeness + Global Consistency
 
 import os
 import sys
+import asyncio
 import glob
+import hashlib
+import heapq
+import math
+import sqlite3
+import threading
 import json
 import uuid
 import re
 import time
+import unicodedata
+import urllib.request
+import zlib
+from abc import ABC, abstractmethod
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import Any, Dict, List, Tuple, Set, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, Iterator, List, Mapping, Tuple, Set, Optional
 
 import yaml
 
@@ -98,96 +159,353 @@ try:
 except Exception:
     DEEPEVAL_AVAILABLE = False
 
+NUMPY_AVAILABLE = True
+try:
+    import numpy as np
+except Exception:
+    NUMPY_AVAILABLE = False
+
+SCIPY_AVAILABLE = True
+try:
+    from scipy import sparse
+except Exception:
+    SCIPY_AVAILABLE = False
+
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Config
 # ──────────────────────────────────────────────────────────────────────────────
 
-STAGE = os.environ.get("AIDD_STAGE", "PLN")
-YAML_DIR = os.environ.get("AIDD_YAML_DIR", "artifacts/planning/yaml/v3")
-OUT_ROOT = os.environ.get("AIDD_OUT_ROOT", "output/G4/transform")
-EVAL_MODEL = os.environ.get("AIDD_EVAL_MODEL", "gpt-5.2")
-
-REF_MODE = os.environ.get("AIDD_REF_MODE", "AUTO").upper().strip()
-
-REF_PATHS_RAW = os.environ.get("AIDD_REF_PATHS", "").strip()
-FILE_PATH = os.environ.get("AIDD_FILE_PATH", "").strip()
-if not FILE_PATH:
-    FILE_PATH = os.environ.get("AIDD_MD_PATH", "artifacts/planning/PLN-PLN-FLW-002.md").strip()
-
-if REF_PATHS_RAW:
-    REF_INPUTS = [p.strip() for p in REF_PATHS_RAW.split(",") if p.strip()]
-else:
-    REF_INPUTS = [FILE_PATH] if FILE_PATH else []
-
-_skip_raw = os.environ.get("AIDD_FAITHFULNESS_SKIP", "")
-FAITHFULNESS_SKIP_ALL = _skip_raw.strip() == "*"
-FAITHFULNESS_SKIP_FILES = {s.strip() for s in _skip_raw.split(",") if s.strip() and s.strip() != "*"}
-
-SKIP_DERIVED_SCOPE = os.environ.get("AIDD_FAITHFULNESS_SKIP_DERIVED_FROM_SCOPE", "1").lower() in ("1", "true", "yes")
-USE_DERIVED_FROM_CONTEXT = os.environ.get("AIDD_FAITHFULNESS_USE_DERIVED_FROM_CONTEXT", "1").lower() in ("1", "true", "yes")
-
-TOPK_REF_CHUNKS = int(os.environ.get("AIDD_FAITHFULNESS_TOPK_REF_CHUNKS", "4") or "4")
-REF_CHUNK_MAX_CHARS = int(os.environ.get("AIDD_FAITHFULNESS_REF_CHUNK_MAX_CHARS", "900") or "900")
-
-FAITH_ACTUAL_MAX = int(os.environ.get("AIDD_FAITHFULNESS_ACTUAL_MAX_CHARS", "1800") or "1800")
-FAITH_CTX_MAX = int(os.environ.get("AIDD_FAITHFULNESS_CONTEXT_MAX_CHARS", "2200") or "2200")
-FAITH_TRUTHS_LIM = int(os.environ.get("AIDD_FAITHFULNESS_TRUTHS_LIMIT", "10") or "10")
-
-RETRY_ON_TIMEOUT = os.environ.get("AIDD_FAITHFULNESS_RETRY_ON_TIMEOUT", "1").lower() in ("1", "true", "yes")
-RETRY_ACTUAL_MAX = int(os.environ.get("AIDD_FAITHFULNESS_ACTUAL_MAX_CHARS_RETRY", "1200") or "1200")
-RETRY_CTX_MAX = int(os.environ.get("AIDD_FAITHFULNESS_CONTEXT_MAX_CHARS_RETRY", "1600") or "1600")
-RETRY_TRUTHS_LIM = int(os.environ.get("AIDD_FAITHFULNESS_TRUTHS_LIMIT_RETRY", "6") or "6")
-
-WARN_THRESHOLD = 0.70
+@dataclass
+class G4Config:
+    """
+    G4 の設定一式（CFG.<フィールド名> で読む。旧モジュール設定値の大文字名 g4.YAML_DIR なども読み取り専用で残す）。
+    既定は環境変数から作る（G4Config.from_env()）。ディレクトリ/工程ごとの差分は dataclasses.replace で上書きする。
+    """
 
-# reason mode
-REASON_MODE_RAW = os.environ.get("AIDD_FAITHFULNESS_REASON_MODE", "local").strip().lower()
-FAITH_REASON_MODE = REASON_MODE_RAW if REASON_MODE_RAW in ("local", "llm") else "local"
+    stage: str
+    yaml_dir: str
+    out_root: str
+    eval_model: str
+    ref_mode: str
+    ref_inputs: List[str]
+    faithfulness_skip_all: bool
+    faithfulness_skip_files: Set[str]
+    skip_derived_scope: bool
+    use_derived_from_context: bool
+    faith_retrieval: str
+    bm25_k1: float
+    bm25_b: float
+    topk_ref_chunks: int
+    ref_chunk_max_chars: int
+    ref_cache_enable: bool
+    ref_cache_dir: str
+    ref_cache_max_files: int
+    ref_cache_max_age_days: float
+    faith_actual_max: int
+    faith_ctx_max: int
+    faith_truths_lim: int
+    faith_token_budget: int
+    faith_token_actual_ratio: float
+    faith_concurrency: int
+    faith_batch_size: int
+    faith_batch_max_tokens: int
+    eval_backend: str
+    openai_base_url: str
+    openai_api_key: str
+    openai_timeout_sec: float
+    local_eval_latency_ms: int
+    local_eval_fail_rate: float
+    local_eval_fail_kind: str
+    local_eval_seed: str
+    retry_on_timeout: bool
+    retry_actual_max: int
+    retry_ctx_max: int
+    retry_truths_lim: int
+    faith_reason_mode: str
+    faith_strip_top_keys: List[str]
+    faith_strip_anylevel_keys: Set[str]
+    faith_prune_nulls: bool
+    faith_prune_max_depth: int
+    noisy_ascii_scalar_maxlen: int
+    local_reason_topn: int
+    local_reason_sim_th: float
+    local_reason_min_len: int
+    completeness_enable: bool
+    comp_topn: int
+    comp_evidence_th: float
+    comp_warn_count: int
+    comp_fail_count: int
+    coverage_enable: bool
+    cov_max_items: int
+    cov_min_item_len: int
+    cov_sim_threshold: float
+    cov_skip_headings: bool
+    consistency_enable: bool
+    cons_max_facts_per_file: int
+    cons_ignore_keys: List[str]
+    llm_cache_enable: bool
+    llm_cache_path: str
+    llm_cache_max_entries: int
+    llm_cache_ttl_sec: int
+    g4_tokenizer: str
+    ngram_sizes: List[int]
+    ngram_hash_dim: int
+    sim_backend: str
+    sim_matrix_min_pairs: int
+    duration_warn_ms: int
+
+    @classmethod
+    def from_env(cls, env: Optional[Mapping[str, str]] = None) -> "G4Config":
+        env = os.environ if env is None else env
+
+        stage = env.get("AIDD_STAGE", "PLN")
+        yaml_dir = env.get("AIDD_YAML_DIR", "artifacts/planning/yaml/v3")
+        out_root = env.get("AIDD_OUT_ROOT", "output/G4/transform")
+        eval_model = env.get("AIDD_EVAL_MODEL", "gpt-5.2")
+
+        ref_mode = env.get("AIDD_REF_MODE", "AUTO").upper().strip()
+
+        ref_paths_raw = env.get("AIDD_REF_PATHS", "").strip()
+        file_path = env.get("AIDD_FILE_PATH", "").strip()
+        if not file_path:
+            file_path = env.get("AIDD_MD_PATH", "artifacts/planning/PLN-PLN-FLW-002.md").strip()
+
+        if ref_paths_raw:
+            ref_inputs = [p.strip() for p in ref_paths_raw.split(",") if p.strip()]
+        else:
+            ref_inputs = [file_path] if file_path else []
+
+        _skip_raw = env.get("AIDD_FAITHFULNESS_SKIP", "")
+        faithfulness_skip_all = _skip_raw.strip() == "*"
+        faithfulness_skip_files = {s.strip() for s in _skip_raw.split(",") if s.strip() and s.strip() != "*"}
+
+        skip_derived_scope = env.get("AIDD_FAITHFULNESS_SKIP_DERIVED_FROM_SCOPE", "1").lower() in ("1", "true", "yes")
+        use_derived_from_context = env.get("AIDD_FAITHFULNESS_USE_DERIVED_FROM_CONTEXT", "1").lower() in ("1", "true", "yes")
+
+        # 参照チャンク検索方式（bm25: 転置インデックス / jaccard: 全チャンク総当たり）
+        _retrieval_raw = env.get("AIDD_FAITHFULNESS_RETRIEVAL", "bm25").strip().lower()
+        faith_retrieval = _retrieval_raw if _retrieval_raw in ("bm25", "jaccard") else "bm25"
+        bm25_k1 = float(env.get("AIDD_FAITHFULNESS_BM25_K1", "1.5") or "1.5")
+        bm25_b = float(env.get("AIDD_FAITHFULNESS_BM25_B", "0.75") or "0.75")
+
+        topk_ref_chunks = int(env.get("AIDD_FAITHFULNESS_TOPK_REF_CHUNKS", "4") or "4")
+        ref_chunk_max_chars = int(env.get("AIDD_FAITHFULNESS_REF_CHUNK_MAX_CHARS", "900") or "900")
+
+        # 参照チャンク/トークン/tf の永続キャッシュ（キー: 参照ファイルの sha256 + チャンク/トークン化パラメータ）
+        ref_cache_enable = env.get("AIDD_G4_REF_CACHE_ENABLE", "1").lower() in ("1", "true", "yes")
+        ref_cache_dir = env.get("AIDD_G4_REF_CACHE_DIR", "output/G4/ref_index").strip()
+        ref_cache_max_files = max(0, int(env.get("AIDD_G4_REF_CACHE_MAX_FILES", "256") or "256"))
+        ref_cache_max_age_days = max(0.0, float(env.get("AIDD_G4_REF_CACHE_MAX_AGE_DAYS", "30") or "30"))
+
+        faith_actual_max = int(env.get("AIDD_FAITHFULNESS_ACTUAL_MAX_CHARS", "1800") or "1800")
+        faith_ctx_max = int(env.get("AIDD_FAITHFULNESS_CONTEXT_MAX_CHARS", "2200") or "2200")
+        faith_truths_lim = int(env.get("AIDD_FAITHFULNESS_TRUTHS_LIMIT", "10") or "10")
+
+        # 1リクエストあたりのトークン予算（0で無効=従来の文字数上限）。有効時は ACTUAL/CONTEXT_MAX_CHARS の代わりに使う
+        faith_token_budget = int(env.get("AIDD_FAITHFULNESS_TOKEN_BUDGET", "0") or "0")
+        # 予算のうち actual_output（FaithView）に割り当てる上限比率。余りは参照コンテキストへ回す
+        faith_token_actual_ratio = min(0.9, max(0.1, float(env.get("AIDD_FAITHFULNESS_TOKEN_ACTUAL_RATIO", "0.45") or "0.45")))
+
+        # Faithfulness の同時評価数（LLM呼び出しの並列度。1で逐次）
+        faith_concurrency = max(1, int(env.get("AIDD_FAITHFULNESS_CONCURRENCY", "1") or "1"))
+
+        # 複数ファイルを1リクエストで評価（1で無効）。FaithView+参照の合計文字数が上限内のものだけをまとめる
+        faith_batch_size = max(1, int(env.get("AIDD_FAITHFULNESS_BATCH_SIZE", "1") or "1"))
+        faith_batch_max_tokens = int(env.get("AIDD_FAITHFULNESS_BATCH_MAX_TOKENS", "6000") or "6000")
+
+        # 評価バックエンド（deepeval: FaithfulnessMetric / openai: /chat/completions 互換HTTP / local: モデル不要の決定的スタブ）
+        _eval_backend_raw = env.get("AIDD_G4_EVAL_BACKEND", "deepeval").strip().lower()
+        eval_backend = _eval_backend_raw if _eval_backend_raw in ("deepeval", "openai", "local") else "deepeval"
+        openai_base_url = env.get("AIDD_G4_OPENAI_BASE_URL", env.get("OPENAI_BASE_URL", "https://api.openai.com/v1")).strip()
+        openai_api_key = env.get("AIDD_G4_OPENAI_API_KEY", env.get("OPENAI_API_KEY", "")).strip()
+        openai_timeout_sec = float(env.get("AIDD_G4_OPENAI_TIMEOUT_SEC", "120") or "120")
+        local_eval_latency_ms = int(env.get("AIDD_G4_LOCAL_LATENCY_MS", "0") or "0")
+        local_eval_fail_rate = float(env.get("AIDD_G4_LOCAL_FAIL_RATE", "0") or "0")
+        local_eval_fail_kind = "error" if env.get("AIDD_G4_LOCAL_FAIL_KIND", "timeout").strip().lower() == "error" else "timeout"
+        local_eval_seed = env.get("AIDD_G4_LOCAL_SEED", "0")
+
+        retry_on_timeout = env.get("AIDD_FAITHFULNESS_RETRY_ON_TIMEOUT", "1").lower() in ("1", "true", "yes")
+        retry_actual_max = int(env.get("AIDD_FAITHFULNESS_ACTUAL_MAX_CHARS_RETRY", "1200") or "1200")
+        retry_ctx_max = int(env.get("AIDD_FAITHFULNESS_CONTEXT_MAX_CHARS_RETRY", "1600") or "1600")
+        retry_truths_lim = int(env.get("AIDD_FAITHFULNESS_TRUTHS_LIMIT_RETRY", "6") or "6")
+
+        # reason mode
+        reason_mode_raw = env.get("AIDD_FAITHFULNESS_REASON_MODE", "local").strip().lower()
+        faith_reason_mode = reason_mode_raw if reason_mode_raw in ("local", "llm") else "local"
+
+        # FaithView normalization
+        _strip_top_keys_raw = env.get("AIDD_FAITHFULNESS_STRIP_TOP_KEYS", "meta").strip()
+        faith_strip_top_keys = [k.strip() for k in _strip_top_keys_raw.split(",") if k.strip()]
+
+        # 任意階層で除外したいキー（変換理由/章ラベルなど）
+        _strip_any_keys_raw = env.get("AIDD_FAITHFULNESS_STRIP_ANYLEVEL_KEYS", "rationale,primary_section,ssot_note").strip()
+        faith_strip_anylevel_keys = {k.strip() for k in _strip_any_keys_raw.split(",") if k.strip()}
+
+        faith_prune_nulls = env.get("AIDD_FAITHFULNESS_PRUNE_NULLS", "1").lower() in ("1", "true", "yes")
+        faith_prune_max_depth = int(env.get("AIDD_FAITHFULNESS_PRUNE_MAX_DEPTH", "12") or "12")
+
+        noisy_ascii_scalar_maxlen = int(env.get("AIDD_FAITHFULNESS_NOISY_ASCII_SCALAR_MAXLEN", "24") or "24")
+
+        # local reason config
+        local_reason_topn = int(env.get("AIDD_FAITHFULNESS_LOCAL_REASON_TOPN", "12") or "12")
+        local_reason_sim_th = float(env.get("AIDD_FAITHFULNESS_LOCAL_REASON_SIM_TH", "0.12") or "0.12")
+        local_reason_min_len = int(env.get("AIDD_FAITHFULNESS_LOCAL_REASON_MIN_LEN", "10") or "10")
+
+        # Completeness
+        completeness_enable = env.get("AIDD_COMPLETENESS_ENABLE", "1").lower() in ("1", "true", "yes")
+        comp_topn = int(env.get("AIDD_COMPLETENESS_TOPN", "12") or "12")
+        comp_evidence_th = float(env.get("AIDD_COMPLETENESS_EVIDENCE_TH", "0.12") or "0.12")
+        comp_warn_count = int(env.get("AIDD_COMPLETENESS_WARN_COUNT", "1") or "1")
+        comp_fail_count = int(env.get("AIDD_COMPLETENESS_FAIL_COUNT", "3") or "3")
+
+        # Coverage
+        coverage_enable = env.get("AIDD_COVERAGE_ENABLE", "1").lower() in ("1", "true", "yes")
+        cov_max_items = int(env.get("AIDD_COVERAGE_MAX_ITEMS", "80") or "80")
+        cov_min_item_len = int(env.get("AIDD_COVERAGE_MIN_ITEM_LEN", "6") or "6")
+        cov_sim_threshold = float(env.get("AIDD_COVERAGE_SIM_THRESHOLD", "0.25") or "0.25")
+        cov_skip_headings = env.get("AIDD_COVERAGE_SKIP_HEADINGS", "1").lower() in ("1", "true", "yes")
+
+        # Consistency
+        consistency_enable = env.get("AIDD_CONSISTENCY_ENABLE", "1").lower() in ("1", "true", "yes")
+        cons_max_facts_per_file = int(env.get("AIDD_CONSISTENCY_MAX_FACTS_PER_FILE", "1200") or "1200")
+
+        cons_ignore_keys_raw = env.get(
+            "AIDD_CONSISTENCY_IGNORE_KEYS",
+            "meta.,timestamp,updated_at,created_at,hash,checksum,rationale,ssot_note,primary_section,traceability.,referenced_internal_ids"
+        ).strip()
+        cons_ignore_keys = [k.strip().lower() for k in cons_ignore_keys_raw.split(",") if k.strip()]
+
+        # LLM評価キャッシュ（Faithfulness の score/pass/reason を永続化）
+        llm_cache_enable = env.get("AIDD_G4_CACHE_ENABLE", "1").lower() in ("1", "true", "yes")
+        llm_cache_path = env.get("AIDD_G4_CACHE_PATH", "output/G4/llm_cache.sqlite3").strip()
+        llm_cache_max_entries = int(env.get("AIDD_G4_CACHE_MAX_ENTRIES", "5000") or "5000")
+        llm_cache_ttl_sec = int(env.get("AIDD_G4_CACHE_TTL_SEC", str(30 * 24 * 3600)) or "0")
+
+        # 類似度用トークナイザ（word: 空白/記号区切り / ngram: NFKC + 文字 n-gram のハッシュ）
+        _tokenizer_raw = env.get("AIDD_G4_TOKENIZER", "word").strip().lower()
+        g4_tokenizer = _tokenizer_raw if _tokenizer_raw in ("word", "ngram") else "word"
+        ngram_sizes = sorted({int(x) for x in env.get("AIDD_G4_NGRAM_SIZES", "2,3").split(",") if x.strip().isdigit() and int(x) > 0}) or [2, 3]
+        ngram_hash_dim = int(env.get("AIDD_G4_NGRAM_HASH_DIM", str(1 << 20)) or str(1 << 20))
+
+        # 類似度計算バックエンド（auto: numpy があれば行列演算 / python: 純Python / numpy: 行列演算）
+        _sim_backend_raw = env.get("AIDD_G4_SIM_BACKEND", "auto").strip().lower()
+        sim_backend = "python" if (_sim_backend_raw == "python" or not NUMPY_AVAILABLE) else "numpy"
+        # 比較回数（行×列）がこれ未満なら行列化のオーバーヘッドの方が大きいので純Pythonで計算
+        sim_matrix_min_pairs = int(env.get("AIDD_G4_SIM_MATRIX_MIN_PAIRS", "2000") or "2000")
+
+        duration_warn_ms = int(env.get("AIDD_DURATION_WARN_MS", "300000") or "300000")  # 5min default
+
+        return cls(
+            stage=stage,
+            yaml_dir=yaml_dir,
+            out_root=out_root,
+            eval_model=eval_model,
+            ref_mode=ref_mode,
+            ref_inputs=ref_inputs,
+            faithfulness_skip_all=faithfulness_skip_all,
+            faithfulness_skip_files=faithfulness_skip_files,
+            skip_derived_scope=skip_derived_scope,
+            use_derived_from_context=use_derived_from_context,
+            faith_retrieval=faith_retrieval,
+            bm25_k1=bm25_k1,
+            bm25_b=bm25_b,
+            topk_ref_chunks=topk_ref_chunks,
+            ref_chunk_max_chars=ref_chunk_max_chars,
+            ref_cache_enable=ref_cache_enable,
+            ref_cache_dir=ref_cache_dir,
+            ref_cache_max_files=ref_cache_max_files,
+            ref_cache_max_age_days=ref_cache_max_age_days,
+            faith_actual_max=faith_actual_max,
+            faith_ctx_max=faith_ctx_max,
+            faith_truths_lim=faith_truths_lim,
+            faith_token_budget=faith_token_budget,
+            faith_token_actual_ratio=faith_token_actual_ratio,
+            faith_concurrency=faith_concurrency,
+            faith_batch_size=faith_batch_size,
+            faith_batch_max_tokens=faith_batch_max_tokens,
+            eval_backend=eval_backend,
+            openai_base_url=openai_base_url,
+            openai_api_key=openai_api_key,
+            openai_timeout_sec=openai_timeout_sec,
+            local_eval_latency_ms=local_eval_latency_ms,
+            local_eval_fail_rate=local_eval_fail_rate,
+            local_eval_fail_kind=local_eval_fail_kind,
+            local_eval_seed=local_eval_seed,
+            retry_on_timeout=retry_on_timeout,
+            retry_actual_max=retry_actual_max,
+            retry_ctx_max=retry_ctx_max,
+            retry_truths_lim=retry_truths_lim,
+            faith_reason_mode=faith_reason_mode,
+            faith_strip_top_keys=faith_strip_top_keys,
+            faith_strip_anylevel_keys=faith_strip_anylevel_keys,
+            faith_prune_nulls=faith_prune_nulls,
+            faith_prune_max_depth=faith_prune_max_depth,
+            noisy_ascii_scalar_maxlen=noisy_ascii_scalar_maxlen,
+            local_reason_topn=local_reason_topn,
+            local_reason_sim_th=local_reason_sim_th,
+            local_reason_min_len=local_reason_min_len,
+            completeness_enable=completeness_enable,
+            comp_topn=comp_topn,
+            comp_evidence_th=comp_evidence_th,
+            comp_warn_count=comp_warn_count,
+            comp_fail_count=comp_fail_count,
+            coverage_enable=coverage_enable,
+            cov_max_items=cov_max_items,
+            cov_min_item_len=cov_min_item_len,
+            cov_sim_threshold=cov_sim_threshold,
+            cov_skip_headings=cov_skip_headings,
+            consistency_enable=consistency_enable,
+            cons_max_facts_per_file=cons_max_facts_per_file,
+            cons_ignore_keys=cons_ignore_keys,
+            llm_cache_enable=llm_cache_enable,
+            llm_cache_path=llm_cache_path,
+            llm_cache_max_entries=llm_cache_max_entries,
+            llm_cache_ttl_sec=llm_cache_ttl_sec,
+            g4_tokenizer=g4_tokenizer,
+            ngram_sizes=ngram_sizes,
+            ngram_hash_dim=ngram_hash_dim,
+            sim_backend=sim_backend,
+            sim_matrix_min_pairs=sim_matrix_min_pairs,
+            duration_warn_ms=duration_warn_ms,
+        )
 
-# FaithView normalization
-_STRIP_TOP_KEYS_RAW = os.environ.get("AIDD_FAITHFULNESS_STRIP_TOP_KEYS", "meta").strip()
-FAITH_STRIP_TOP_KEYS = [k.strip() for k in _STRIP_TOP_KEYS_RAW.split(",") if k.strip()]
+# 実行中の設定。run_g4 / use_config がコンテキスト単位で差し替える（モジュールのグローバル変数は書き換えない）。
+# 既定は import 時点の環境変数（CLI / 従来どおりの関数呼び出し用）
+_CONFIG: ContextVar[G4Config] = ContextVar("g4_config", default=G4Config.from_env())
 
-# 任意階層で除外したいキー（変換理由/章ラベルなど）
-_STRIP_ANY_KEYS_RAW = os.environ.get("AIDD_FAITHFULNESS_STRIP_ANYLEVEL_KEYS", "rationale,primary_section,ssot_note").strip()
-FAITH_STRIP_ANYLEVEL_KEYS = {k.strip() for k in _STRIP_ANY_KEYS_RAW.split(",") if k.strip()}
+class _ConfigView:
+    """CFG.faith_retrieval のように、現在のコンテキストの G4Config のフィールドを読む"""
 
-FAITH_PRUNE_NULLS = os.environ.get("AIDD_FAITHFULNESS_PRUNE_NULLS", "1").lower() in ("1", "true", "yes")
-FAITH_PRUNE_MAX_DEPTH = int(os.environ.get("AIDD_FAITHFULNESS_PRUNE_MAX_DEPTH", "12") or "12")
+    __slots__ = ()
 
-NOISY_ASCII_SCALAR_MAXLEN = int(os.environ.get("AIDD_FAITHFULNESS_NOISY_ASCII_SCALAR_MAXLEN", "24") or "24")
+    def __getattr__(self, name: str) -> Any:
+        return getattr(_CONFIG.get(), name)
 
-# local reason config
-LOCAL_REASON_TOPN = int(os.environ.get("AIDD_FAITHFULNESS_LOCAL_REASON_TOPN", "12") or "12")
-LOCAL_REASON_SIM_TH = float(os.environ.get("AIDD_FAITHFULNESS_LOCAL_REASON_SIM_TH", "0.12") or "0.12")
-LOCAL_REASON_MIN_LEN = int(os.environ.get("AIDD_FAITHFULNESS_LOCAL_REASON_MIN_LEN", "10") or "10")
+CFG = _ConfigView()
 
-# Completeness
-COMPLETENESS_ENABLE = os.environ.get("AIDD_COMPLETENESS_ENABLE", "1").lower() in ("1", "true", "yes")
-COMP_TOPN = int(os.environ.get("AIDD_COMPLETENESS_TOPN", "12") or "12")
-COMP_EVIDENCE_TH = float(os.environ.get("AIDD_COMPLETENESS_EVIDENCE_TH", "0.12") or "0.12")
-COMP_WARN_COUNT = int(os.environ.get("AIDD_COMPLETENESS_WARN_COUNT", "1") or "1")
-COMP_FAIL_COUNT = int(os.environ.get("AIDD_COMPLETENESS_FAIL_COUNT", "3") or "3")
+def current_config() -> G4Config:
+    return _CONFIG.get()
 
-# Coverage
-COVERAGE_ENABLE = os.environ.get("AIDD_COVERAGE_ENABLE", "1").lower() in ("1", "true", "yes")
-COV_MAX_ITEMS = int(os.environ.get("AIDD_COVERAGE_MAX_ITEMS", "80") or "80")
-COV_MIN_ITEM_LEN = int(os.environ.get("AIDD_COVERAGE_MIN_ITEM_LEN", "6") or "6")
-COV_SIM_THRESHOLD = float(os.environ.get("AIDD_COVERAGE_SIM_THRESHOLD", "0.25") or "0.25")
-COV_SKIP_HEADINGS = os.environ.get("AIDD_COVERAGE_SKIP_HEADINGS", "1").lower() in ("1", "true", "yes")
+@contextmanager
+def use_config(cfg: G4Config) -> Iterator[G4Config]:
+    """with の間だけ、このコンテキスト（スレッド/タスク）の設定を cfg にする"""
+    token = _CONFIG.set(cfg)
+    try:
+        yield cfg
+    finally:
+        _CONFIG.reset(token)
 
-# Consistency
-CONSISTENCY_ENABLE = os.environ.get("AIDD_CONSISTENCY_ENABLE", "1").lower() in ("1", "true", "yes")
-CONS_MAX_FACTS_PER_FILE = int(os.environ.get("AIDD_CONSISTENCY_MAX_FACTS_PER_FILE", "1200") or "1200")
+_CONFIG_FIELDS = {f.name.upper(): f.name for f in fields(G4Config)}
 
-CONS_IGNORE_KEYS_RAW = os.environ.get(
-    "AIDD_CONSISTENCY_IGNORE_KEYS",
-    "meta.,timestamp,updated_at,created_at,hash,checksum,rationale,ssot_note,primary_section,traceability.,referenced_internal_ids"
-).strip()
-CONS_IGNORE_KEYS = [k.strip().lower() for k in CONS_IGNORE_KEYS_RAW.split(",") if k.strip()]
+def __getattr__(name: str) -> Any:
+    # 従来の大文字の設定名（g4.YAML_DIR 等）は、呼び出し元コンテキストの設定値として読めるようにする
+    field_name = _CONFIG_FIELDS.get(name)
+    if field_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(_CONFIG.get(), field_name)
 
-DURATION_WARN_MS = int(os.environ.get("AIDD_DURATION_WARN_MS", "300000") or "300000")  # 5min default
+WARN_THRESHOLD = 0.70
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -262,6 +580,54 @@ def truncate(s: str, max_chars: int) -> str:
     return s[:max_chars] + "\n...(truncated)"
 
 
+# ──────────────────────────────────────────────────────────────────────────────
+# Approximate token counting / budget trimming (no tokenizer download)
+# ──────────────────────────────────────────────────────────────────────────────
+
+# 文の区切り（句点・感嘆/疑問符・改行、英文のピリオド+空白）
+_SENTENCE_END = re.compile(r"[。．！？!?\n]|\.(?=\s)")
+
+def estimate_tokens(s: str) -> int:
+    """
+    概算トークン数: 非ASCII（かな・漢字・全角）は1文字≒1トークン、ASCII は4文字≒1トークン。
+    BPE系トークナイザの実測よりやや多めに出る（=予算超過しにくい）側に倒している。
+    """
+    if not s:
+        return 0
+    n_ascii = len(s.encode("ascii", "ignore"))
+    return (len(s) - n_ascii) + (n_ascii + 3) // 4
+
+_TRUNCATED_MARK = "\n...(truncated)"
+
+def truncate_to_tokens(s: str, max_tokens: int) -> str:
+    """
+    概算 max_tokens に収まるよう、できるだけ文の区切りで切り詰める（区切りが前半にしか無ければその位置で切る）
+    - 予算が印（"...(truncated)"）以下しか無い場合は印を付けずに先頭だけを返す（印だけの文字列にはしない）
+    """
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(s) <= max_tokens:
+        return s
+    mark_tokens = estimate_tokens(_TRUNCATED_MARK)
+    with_mark = max_tokens > mark_tokens
+    budget = ((max_tokens - mark_tokens) if with_mark else max_tokens) * 4  # ASCII 1文字=1/4 で数える
+    used = 0
+    cut = len(s)
+    for i, ch in enumerate(s):
+        used += 1 if ord(ch) < 128 else 4
+        if used > budget:
+            cut = i
+            break
+    end = 0
+    for m in _SENTENCE_END.finditer(s, 0, cut):
+        end = m.end()
+    if not with_mark or cut == 0:
+        return s[:cut]
+    if end and end >= cut // 2:
+        cut = end
+    return s[:cut].rstrip() + _TRUNCATED_MARK
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Tokenization / similarity utils
 # ──────────────────────────────────────────────────────────────────────────────
@@ -269,19 +635,216 @@ def truncate(s: str, max_chars: int) -> str:
 _TOKEN_SPLIT = re.compile(r"[\s、。．，,;；:：\(\)\[\]\{\}<>「」『』【】/\\|]+")
 _PUNCT = re.compile(r"[^\wぁ-んァ-ン一-龥]+")
 
-def tokenize_ja_en(s: str) -> Set[str]:
+def _word_tokens(s: str) -> List[str]:
     s = s.lower()
     s = _PUNCT.sub(" ", s)
-    parts = [p for p in _TOKEN_SPLIT.split(s) if p]
-    return {p for p in parts if len(p) >= 2}
+    return [p for p in _TOKEN_SPLIT.split(s) if len(p) >= 2]
+
+def _ngram_hash(gram: str, dim: int) -> int:
+    # hash() はプロセスごとに乱数化されるため、キャッシュ/並列でも同じ値になる crc32 を使う
+    return zlib.crc32(gram.encode("utf-8")) % dim
 
-def jaccard(a: Set[str], b: Set[str]) -> float:
+def _ngram_tokens(s: str) -> List[int]:
+    """
+    NFKC 正規化 + 文字 n-gram（既定 2,3）を固定幅の整数空間へハッシュ。
+    区切り記号で分けた区間ごとに n-gram を取る（区間をまたぐ n-gram は作らない）。
+    n より短い区間（2文字以上）はそのまま1トークンにする。
+    """
+    s = unicodedata.normalize("NFKC", s).lower()
+    s = _PUNCT.sub(" ", s)
+    sizes, dim = CFG.ngram_sizes, CFG.ngram_hash_dim
+    out: List[int] = []
+    for seg in _TOKEN_SPLIT.split(s):
+        if len(seg) < 2:
+            continue
+        if len(seg) < sizes[0]:
+            out.append(_ngram_hash(seg, dim))
+            continue
+        for n in sizes:
+            for i in range(len(seg) - n + 1):
+                out.append(_ngram_hash(seg[i:i + n], dim))
+    return out
+
+def tokenize_ja_en_list(s: str) -> List[Any]:
+    """tokenize_ja_en の出現順リスト版（BM25 の tf 用。重複を残す）"""
+    if _CONFIG.get().g4_tokenizer == "ngram":
+        return _ngram_tokens(s)
+    return _word_tokens(s)
+
+def tokenize_ja_en(s: str) -> Set[Any]:
+    """類似度用トークン集合（AIDD_G4_TOKENIZER=word なら語、ngram ならハッシュ化した文字 n-gram）"""
+    return set(tokenize_ja_en_list(s))
+
+class TokenVocab:
+    """
+    トークン → 連番ID の共有語彙（プロセス内で1つ）。
+    類似度計算は文字列集合ではなくIDのビット集合で行うため、語彙は単調増加のみ。
+    """
+
+    def __init__(self):
+        self.ids: Dict[Any, int] = {}
+        self.lock = threading.Lock()
+
+    def intern(self, tok: Any) -> int:
+        i = self.ids.get(tok)
+        if i is None:
+            with self.lock:  # 並列評価（スレッド）からの同時追加に備える
+                i = self.ids.get(tok)
+                if i is None:
+                    i = len(self.ids)
+                    self.ids[tok] = i
+        return i
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+TOKEN_VOCAB = TokenVocab()
+
+# ビット集合の長さ（最大ID+1）が要素数のこの倍以内なら「密」とみなす。
+# 語彙は実行中に増え続けるので、少数の大きなIDを持つ集合のビット列は語彙サイズ/64 ワードになる。
+# 両方が密なときだけ bigint の AND + popcount、それ以外は小さい方からのハッシュ探索で積集合を数える
+TOKENIDS_DENSE_SPAN = 256
+
+class TokenIds:
+    """
+    トークン集合のコンパクト表現。
+    - ids : ソート済み array('I')（保存・列挙用）
+    - bits: 密な集合だけ、IDをビット位置にした int（積集合サイズを popcount で求める）。疎なら None
+    - idset: IDの frozenset（疎な集合の積集合用。初回参照時に作る）
+    """
+
+    __slots__ = ("ids", "size", "bits", "_idset")
+
+    def __init__(self, ids: "array"):
+        self.ids = ids
+        self.size = len(ids)
+        self.bits: Optional[int] = None
+        self._idset: Optional[frozenset] = None
+        if ids and ids[-1] < self.size * TOKENIDS_DENSE_SPAN:
+            buf = bytearray((ids[-1] >> 3) + 1)
+            for i in ids:
+                buf[i >> 3] |= 1 << (i & 7)
+            self.bits = int.from_bytes(buf, "little")
+
+    @classmethod
+    def from_tokens(cls, tokens: Any, vocab: TokenVocab = TOKEN_VOCAB) -> "TokenIds":
+        return cls(array("I", sorted({vocab.intern(t) for t in tokens})))
+
+    @property
+    def idset(self) -> frozenset:
+        if self._idset is None:
+            self._idset = frozenset(self.ids)
+        return self._idset
+
+    def intersection_size(self, other: "TokenIds") -> int:
+        if self.bits is not None and other.bits is not None:
+            return (self.bits & other.bits).bit_count()
+        small, large = (self, other) if self.size <= other.size else (other, self)
+        return len(large.idset.intersection(small.ids))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __bool__(self) -> bool:
+        return self.size > 0
+
+def token_ids(s: str) -> TokenIds:
+    """tokenize_ja_en の結果を共有語彙のID集合にしたもの（類似度計算用）"""
+    return TokenIds.from_tokens(tokenize_ja_en(s))
+
+def jaccard(a: Any, b: Any) -> float:
+    if type(a) is not type(b) and (type(a) is TokenIds or type(b) is TokenIds):
+        # TokenIds とトークン文字列の set の混在: set 側を同じ語彙でID化して揃える
+        a = a if type(a) is TokenIds else TokenIds.from_tokens(a)
+        b = b if type(b) is TokenIds else TokenIds.from_tokens(b)
+    if type(a) is TokenIds:
+        if not a.size or not b.size:
+            return 0.0
+        # |A∪B| = |A| + |B| - |A∩B| → 和集合を作らない
+        if a.bits is not None and b.bits is not None:
+            inter = (a.bits & b.bits).bit_count()
+        else:
+            inter = a.intersection_size(b)
+        return inter / (a.size + b.size - inter)
     if not a or not b:
         return 0.0
     inter = len(a & b)
     uni = len(a | b)
     return inter / uni if uni else 0.0
 
+def token_containment(a: TokenIds, b: TokenIds) -> float:
+    """|A∩B| / |A|（A のトークンが B にどれだけ含まれるか）"""
+    if not a.size or not b.size:
+        return 0.0
+    return a.intersection_size(b) / a.size
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Sparse similarity engine (numpy / scipy.sparse, optional)
+# ──────────────────────────────────────────────────────────────────────────────
+
+class IncidenceMatrix:
+    """TokenIds のリスト → 0/1 の CSR 行列（scipy.sparse。scipy が無ければ numpy の密行列）と各行のサイズ"""
+
+    def __init__(self, sets: List[TokenIds], n_cols: int, remap: Any = None):
+        self.sizes = np.fromiter((t.size for t in sets), dtype=np.int64, count=len(sets))
+        indptr = np.zeros(len(sets) + 1, dtype=np.int64)
+        np.cumsum(self.sizes, out=indptr[1:])
+        flat = array("I")
+        for t in sets:
+            flat.extend(t.ids)
+        indices = np.frombuffer(flat, dtype=np.uint32).astype(np.int64) if len(flat) else np.zeros(0, dtype=np.int64)
+        if remap is not None:
+            indices = remap[indices]
+        shape = (len(sets), n_cols)
+        if SCIPY_AVAILABLE:
+            self.m = sparse.csr_matrix((np.ones(len(indices), dtype=np.float64), indices, indptr), shape=shape)
+        else:
+            self.m = np.zeros(shape, dtype=np.float64)
+            self.m[np.repeat(np.arange(shape[0]), self.sizes), indices] = 1.0
+
+def _incidence_pair(rows: List[TokenIds], cols: List[TokenIds]) -> Tuple[IncidenceMatrix, IncidenceMatrix]:
+    if SCIPY_AVAILABLE:
+        # 疎行列なので列は語彙IDそのまま
+        return IncidenceMatrix(rows, len(TOKEN_VOCAB)), IncidenceMatrix(cols, len(TOKEN_VOCAB))
+    # 密行列は rows/cols に現れる語だけに列を詰める
+    flat = array("I")
+    for t in rows + cols:
+        flat.extend(t.ids)
+    used = np.unique(np.frombuffer(flat, dtype=np.uint32)) if len(flat) else np.zeros(0, dtype=np.uint32)
+    remap = np.zeros(len(TOKEN_VOCAB), dtype=np.int64)
+    remap[used] = np.arange(len(used))
+    return IncidenceMatrix(rows, len(used), remap), IncidenceMatrix(cols, len(used), remap)
+
+def _jaccard_dense(a: IncidenceMatrix, b: IncidenceMatrix) -> Any:
+    inter = a.m @ b.m.T
+    if SCIPY_AVAILABLE:
+        inter = inter.toarray()
+    ra = a.sizes.astype(np.float64)[:, None]
+    cb = b.sizes.astype(np.float64)[None, :]
+    out = np.zeros(inter.shape, dtype=np.float64)
+    # 整数の交差数/和集合数を float64 で割る → jaccard() と丸めまで一致
+    np.divide(inter, ra + cb - inter, out=out, where=(ra > 0) & (cb > 0))
+    return out
+
+def use_matrix_engine(n_pairs: int) -> bool:
+    return CFG.sim_backend == "numpy" and n_pairs >= CFG.sim_matrix_min_pairs
+
+def jaccard_matrix(rows: List[TokenIds], cols: List[TokenIds]) -> Any:
+    """
+    rows × cols の Jaccard 行列（ndarray）。値は jaccard() と同一。
+    numpy が使えない/比較回数が少ない場合は list[list[float]] を返す。
+    """
+    if not use_matrix_engine(len(rows) * len(cols)):
+        return [[jaccard(r, c) for c in cols] for r in rows]
+    a, b = _incidence_pair(rows, cols)
+    return _jaccard_dense(a, b)
+
+def jaccard_many(query: TokenIds, cols: List[TokenIds]) -> List[float]:
+    """1対多の Jaccard（jaccard_matrix の1行版）"""
+    m = jaccard_matrix([query], cols)
+    return m[0] if isinstance(m, list) else m[0].tolist()
+
 
 # ──────────────────────────────────────────────────────────────────────────────
 # FaithView normalization (do NOT affect actual YAML files)
@@ -308,7 +871,7 @@ def is_noisy_scalar_value(v: Any) -> bool:
             return True
         if "/" in s or "\\" in s:
             return True
-        if len(s) <= NOISY_ASCII_SCALAR_MAXLEN and _ASCII_SINGLE_TOKEN.match(s):
+        if len(s) <= CFG.noisy_ascii_scalar_maxlen and _ASCII_SINGLE_TOKEN.match(s):
             return True
     if isinstance(v, (list, dict)) and len(v) == 0:
         return True
@@ -322,19 +885,20 @@ def prune_for_faithfulness(obj: Any, depth: int = 0) -> Any:
     - null/空/ノイズ値を（可能なら）除外
     - 再帰深さ制限あり
     """
-    if depth > FAITH_PRUNE_MAX_DEPTH:
+    cfg = _CONFIG.get()
+    if depth > cfg.faith_prune_max_depth:
         return obj
 
     if isinstance(obj, dict):
         out: Dict[str, Any] = {}
         for k, v in obj.items():
-            if depth == 0 and k in FAITH_STRIP_TOP_KEYS:
+            if depth == 0 and k in cfg.faith_strip_top_keys:
                 continue
-            if k in FAITH_STRIP_ANYLEVEL_KEYS:
+            if k in cfg.faith_strip_anylevel_keys:
                 continue
 
             vv = prune_for_faithfulness(v, depth + 1)
-            if FAITH_PRUNE_NULLS:
+            if cfg.faith_prune_nulls:
                 if is_noisy_scalar_value(vv):
                     continue
                 if isinstance(vv, dict) and len(vv) == 0:
@@ -348,7 +912,7 @@ def prune_for_faithfulness(obj: Any, depth: int = 0) -> Any:
         out_list: List[Any] = []
         for it in obj:
             vv = prune_for_faithfulness(it, depth + 1)
-            if FAITH_PRUNE_NULLS and is_noisy_scalar_value(vv):
+            if cfg.faith_prune_nulls and is_noisy_scalar_value(vv):
                 continue
             out_list.append(vv)
         return out_list
@@ -386,7 +950,7 @@ def chunk_md(text: str, file_name: str, max_chars: int) -> List[dict]:
                 "ref": file_name,
                 "title": cur_title or file_name,
                 "text": body,
-                "tokens": tokenize_ja_en(body),
+                "tokens": token_ids(body),
             })
         buf = []
 
@@ -411,7 +975,7 @@ def chunk_md(text: str, file_name: str, max_chars: int) -> List[dict]:
             "ref": file_name,
             "title": file_name,
             "text": t,
-            "tokens": tokenize_ja_en(t),
+            "tokens": token_ids(t),
         }]
     return chunks
 
@@ -426,7 +990,7 @@ def chunk_yaml(data: Any, file_name: str, max_chars: int) -> List[dict]:
                 "ref": file_name,
                 "title": f"{file_name}:{k}",
                 "text": dumped,
-                "tokens": tokenize_ja_en(dumped),
+                "tokens": token_ids(dumped),
             })
     else:
         dumped = dump_yaml(data)
@@ -435,36 +999,269 @@ def chunk_yaml(data: Any, file_name: str, max_chars: int) -> List[dict]:
             "ref": file_name,
             "title": file_name,
             "text": dumped,
-            "tokens": tokenize_ja_en(dumped),
+            "tokens": token_ids(dumped),
         })
     return chunks
 
-def build_reference_chunks(ref_files: List[str], ref_mode: str, chunk_max_chars: int) -> Tuple[List[dict], Set[str]]:
+class RefChunkIndex:
+    """
+    参照チャンクの転置インデックス（BM25）。build_reference_chunks で1回だけ構築する。
+    検索コストはクエリ語の postings 長の合計に比例し、チャンク総数には依存しない。
+    """
+
+    def __init__(
+        self,
+        chunks: List[dict],
+        k1: Optional[float] = None,
+        b: Optional[float] = None,
+        tfs: Optional[List[Dict[Any, int]]] = None,
+    ):
+        """tfs: チャンクごとの tf（永続キャッシュから復元した場合など。省略時は本文をトークン化して数える）"""
+        self.k1 = k1 = CFG.bm25_k1 if k1 is None else k1
+        self.b = b = CFG.bm25_b if b is None else b
+        # chunk_id はこのリスト内の位置。select_topk_ref_chunks は同一リストかどうかを同一性で判定する
+        self.chunks = chunks
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_len: List[int] = []
+        for i, ch in enumerate(chunks):
+            ch["chunk_id"] = i
+            tf = tfs[i] if tfs is not None else term_freqs(ch.get("text") or "")
+            self.doc_len.append(sum(tf.values()))
+            for t, c in tf.items():
+                self.postings.setdefault(t, []).append((i, c))
+        n = len(chunks)
+        self.avgdl = (sum(self.doc_len) / n) if n else 0.0
+        self.idf = {
+            t: math.log(1.0 + (n - len(pl) + 0.5) / (len(pl) + 0.5))
+            for t, pl in self.postings.items()
+        }
+        # 文書長正規化項はチャンクごとに固定なので事前計算
+        avgdl = self.avgdl or 1.0
+        self.norm = [k1 * (1.0 - b + b * dl / avgdl) for dl in self.doc_len]
+
+    def scores(self, query_tokens: Set[str], allowed: Optional[Set[int]] = None) -> Dict[int, float]:
+        acc: Dict[int, float] = {}
+        norm = self.norm
+        k1p1 = self.k1 + 1.0
+        for t in query_tokens:
+            pl = self.postings.get(t)
+            if not pl:
+                continue
+            idf = self.idf[t]
+            for cid, tf in pl:
+                if allowed is not None and cid not in allowed:
+                    continue
+                acc[cid] = acc.get(cid, 0.0) + idf * tf * k1p1 / (tf + norm[cid])
+        return acc
+
+    def topk(self, query_tokens: Set[str], k: int, allowed: Optional[Set[int]] = None) -> List[Tuple[float, int]]:
+        """(score, chunk_id) の上位k件。同点はチャンク順（決定的）。"""
+        acc = self.scores(query_tokens, allowed)
+        return heapq.nsmallest(k, ((-sc, cid) for cid, sc in acc.items()))
+
+def term_freqs(s: str) -> Dict[Any, int]:
+    """出現順を保った tf（キー集合 = tokenize_ja_en(s)）"""
+    tf: Dict[Any, int] = {}
+    for t in tokenize_ja_en_list(s):
+        tf[t] = tf.get(t, 0) + 1
+    return tf
+
+def chunk_reference_file(fp: str, ref_mode: str, chunk_max_chars: int) -> List[dict]:
+    mode = infer_ref_mode_by_ext(fp, ref_mode)
+    name = Path(fp).name
+    if mode == "MD":
+        return chunk_md(load_text(fp), name, chunk_max_chars)
+    return chunk_yaml(load_yaml_file(fp), name, chunk_max_chars)
+
+
+# ── 参照チャンクの永続キャッシュ（ファイル単位 / JSON）──
+# 保存するのはチャンク本文と tf（語そのもの）。TokenIds の ID はプロセス内の語彙に依存するため、
+# 読み込み時に語彙へ再登録してビット集合を組み直す（正規表現トークン化より十分安い）。
+# BM25 の idf/正規化項は参照ファイルの組み合わせで変わるので、tf から毎回組み立てる。
+# tf は [トークン, 回数] の組の配列で持つ（word は str、ngram はハッシュ値の int。JSON でも型が保たれる）。
+# 保存先は共有されうるので、読み込みは形を検証し、どんな失敗でも作り直す（任意コード実行になる形式は使わない）。
+
+REF_CACHE_VERSION = 2
+
+def ref_cache_path(fp: str, ref_mode: str, chunk_max_chars: int) -> Path:
+    with open(fp, "rb") as f:
+        file_sha = hashlib.sha256(f.read()).hexdigest()
+    params = json.dumps(
+        [REF_CACHE_VERSION, file_sha, Path(fp).name, infer_ref_mode_by_ext(fp, ref_mode), chunk_max_chars,
+         CFG.g4_tokenizer, CFG.ngram_sizes, CFG.ngram_hash_dim],
+        ensure_ascii=False,
+    )
+    return Path(CFG.ref_cache_dir) / f"{sha256_text(params)}.json"
+
+def _read_ref_cache(path: Path) -> Optional[Tuple[List[dict], List[Dict[Any, int]]]]:
+    """キャッシュファイル → (チャンク, tf)。読めない・形が違う・版が違うなら None（呼び出し側で作り直す）"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or data.get("version") != REF_CACHE_VERSION:
+            return None
+        raw_chunks, raw_tfs = data["chunks"], data["tfs"]
+        if not isinstance(raw_chunks, list) or not isinstance(raw_tfs, list) or len(raw_chunks) != len(raw_tfs):
+            return None
+        chunks: List[dict] = []
+        tfs: List[Dict[Any, int]] = []
+        for ch, items in zip(raw_chunks, raw_tfs):
+            ref, title, text = ch["ref"], ch["title"], ch["text"]
+            if not (isinstance(ref, str) and isinstance(title, str) and isinstance(text, str)):
+                return None
+            tf: Dict[Any, int] = {}
+            for tok, n in items:
+                if type(tok) not in (str, int) or type(n) is not int:
+                    return None
+                tf[tok] = n
+            chunks.append({"ref": ref, "title": title, "text": text})
+            tfs.append(tf)
+    except Exception:
+        return None
+    return chunks, tfs
+
+def _write_ref_cache(path: Path, chunks: List[dict], tfs: List[Dict[Any, int]]) -> None:
+    data = {
+        "version": REF_CACHE_VERSION,
+        "chunks": [{"ref": ch["ref"], "title": ch["title"], "text": ch["text"]} for ch in chunks],
+        "tfs": [[[tok, n] for tok, n in tf.items()] for tf in tfs],
+    }
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)  # 読み手には完成したファイルだけが見える
+    except OSError as exc:
+        print(f"[G4] WARN: 参照チャンクキャッシュを書き込めません: {path} ({exc})", flush=True)
+
+def prune_ref_cache(keep: Set[Path]) -> int:
+    """
+    REF_CACHE_DIR の古いキャッシュを削除し、削除数を返す。keep（今回使ったファイル）は残す。
+    - 最終使用（mtime。読み込み時に更新）から REF_CACHE_MAX_AGE_DAYS を過ぎたもの
+    - REF_CACHE_MAX_FILES を超えた分（最終使用が古い順）
+    - 旧形式（*.pkl）と書き込み途中で残った一時ファイルのうち期限切れのもの
+    """
+    root = Path(CFG.ref_cache_dir)
+    if not root.is_dir():
+        return 0
+    now = time.time()
+    max_age = CFG.ref_cache_max_age_days * 86400
+    entries: List[Tuple[float, Path]] = []
+    stale: List[Path] = []
+    for p in root.iterdir():
+        if p in keep or not p.is_file():
+            continue
+        try:
+            mtime = p.stat().st_mtime
+        except OSError:
+            continue
+        if p.suffix == ".pkl":
+            stale.append(p)
+        elif p.suffix == ".json":
+            if max_age and now - mtime > max_age:
+                stale.append(p)
+            else:
+                entries.append((mtime, p))
+        elif p.suffix == ".tmp" and now - mtime > 3600:
+            stale.append(p)
+    if CFG.ref_cache_max_files:
+        room = max(0, CFG.ref_cache_max_files - len(keep))
+        entries.sort(reverse=True)
+        stale.extend(p for _, p in entries[room:])
+    removed = 0
+    for p in stale:
+        try:
+            p.unlink()
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+def load_reference_file_chunks(fp: str, ref_mode: str, chunk_max_chars: int) -> Tuple[List[dict], List[Dict[Any, int]], Optional[Path]]:
+    """
+    参照1ファイル分のチャンク・tf・キャッシュファイルのパス（無効時 None）。
+    キャッシュ有効時は参照の sha256 + パラメータが一致すれば読み込むだけ。
+    """
+    path = ref_cache_path(fp, ref_mode, chunk_max_chars) if CFG.ref_cache_enable else None
+    cached = _read_ref_cache(path) if path is not None and path.is_file() else None
+    if cached is not None:
+        chunks, tfs = cached
+        for ch, tf in zip(chunks, tfs):
+            ch["tokens"] = TokenIds.from_tokens(tf)
+        try:
+            os.utime(path)  # 最終使用時刻（prune_ref_cache の基準）
+        except OSError:
+            pass
+        return chunks, tfs, path
+
+    chunks = chunk_reference_file(fp, ref_mode, chunk_max_chars)
+    tfs = [term_freqs(ch["text"]) for ch in chunks]
+    if path is not None:
+        _write_ref_cache(path, chunks, tfs)
+    return chunks, tfs, path
+
+def build_reference_chunks(ref_files: List[str], ref_mode: str, chunk_max_chars: int) -> Tuple[List[dict], Set[str], RefChunkIndex]:
     all_chunks: List[dict] = []
+    all_tfs: List[Dict[Any, int]] = []
     names: Set[str] = set()
+    used: Set[Path] = set()
     for fp in ref_files:
-        mode = infer_ref_mode_by_ext(fp, ref_mode)
-        name = Path(fp).name
-        names.add(name)
-        if mode == "MD":
-            txt = load_text(fp)
-            all_chunks.extend(chunk_md(txt, name, chunk_max_chars))
-        else:
-            data = load_yaml_file(fp)
-            all_chunks.extend(chunk_yaml(data, name, chunk_max_chars))
-    return all_chunks, names
-
-def select_topk_ref_chunks(yaml_content: str, ref_chunks: List[dict], topk: int, total_ctx_max: int) -> List[str]:
+        names.add(Path(fp).name)
+        chunks, tfs, path = load_reference_file_chunks(fp, ref_mode, chunk_max_chars)
+        all_chunks.extend(chunks)
+        all_tfs.extend(tfs)
+        if path is not None:
+            used.add(path)
+    if used:
+        prune_ref_cache(used)
+    return all_chunks, names, RefChunkIndex(all_chunks, tfs=all_tfs)
+
+def select_topk_ref_chunks(
+    yaml_content: str,
+    ref_chunks: List[dict],
+    topk: int,
+    total_ctx_max: int,
+    index: Optional[RefChunkIndex] = None,
+    token_budget: int = 0,
+) -> List[str]:
+    """
+    関連度順に上位チャンクを選ぶ。
+    token_budget > 0 なら文字数上限の代わりに概算トークン予算で詰め、入りきらないチャンクは文の区切りで切り詰めて予算を使い切る。
+    """
     qtok = tokenize_ja_en(yaml_content[:4000])
     scored: List[Tuple[float, dict]] = []
-    for ch in ref_chunks:
-        s = jaccard(qtok, ch.get("tokens") or set())
-        scored.append((s, ch))
-    scored.sort(key=lambda x: x[0], reverse=True)
+    want = max(1, topk * 4)
+    if index is not None and CFG.faith_retrieval == "bm25":
+        # ref_chunks は derived_from で絞った部分集合の場合がある → その chunk_id だけを対象にする
+        if ref_chunks is index.chunks:
+            by_id: Any = ref_chunks
+            allowed = None
+        else:
+            by_id = {ch["chunk_id"]: ch for ch in ref_chunks}
+            allowed = set(by_id)
+        for neg, cid in index.topk(qtok, want, allowed=allowed):
+            scored.append((-neg, by_id[cid]))
+        if len(scored) < want:
+            # BM25 はスコア正のチャンクしか返さない → 残り枠は Jaccard の同点時と同じくチャンク順で埋める
+            seen = {id(ch) for _, ch in scored}
+            for ch in ref_chunks:
+                if len(scored) >= want:
+                    break
+                if id(ch) not in seen:
+                    scored.append((0.0, ch))
+    else:
+        qids = TokenIds.from_tokens(qtok)
+        sims = jaccard_many(qids, [ch["tokens"] for ch in ref_chunks])
+        scored = list(zip(sims, ref_chunks))
+        scored.sort(key=lambda x: x[0], reverse=True)
+
+    if token_budget > 0:
+        return pack_ref_chunks_by_tokens(scored[:want], topk, token_budget, ref_chunks)
 
     chosen: List[str] = []
     used = 0
-    for s, ch in scored[:max(1, topk * 4)]:
+    for s, ch in scored[:want]:
         txt = ch["text"]
         header = f"===== REF_CHUNK: {ch['ref']} :: {ch['title']} (sim={s:.3f}) =====\n"
         block = header + txt.strip() + "\n"
@@ -483,6 +1280,33 @@ def select_topk_ref_chunks(yaml_content: str, ref_chunks: List[dict], topk: int,
         chosen = [truncate(ref_chunks[0]["text"], total_ctx_max)] if ref_chunks else [""]
     return chosen
 
+# 予算の残りがこれ未満なら、切り詰めたチャンクを足しても根拠として役に立たないので打ち切る
+MIN_PARTIAL_CHUNK_TOKENS = 48
+# FaithView をこれ未満に切り詰めると評価対象がほぼ空になり、主張が無い＝誤って PASS しうる
+MIN_FAITH_VIEW_TOKENS = 128
+
+def pack_ref_chunks_by_tokens(scored: List[Tuple[float, dict]], topk: int, token_budget: int, ref_chunks: List[dict]) -> List[str]:
+    """関連度順のチャンクを概算トークン予算まで詰める（区切り "\n" 分も数える）"""
+    chosen: List[str] = []
+    used = 0
+    for s, ch in scored:
+        header = f"===== REF_CHUNK: {ch['ref']} :: {ch['title']} (sim={s:.3f}) =====\n"
+        block = header + ch["text"].strip() + "\n"
+        cost = estimate_tokens(block) + (1 if chosen else 0)
+        if used + cost > token_budget:
+            remaining = token_budget - used - (1 if chosen else 0)
+            if remaining >= MIN_PARTIAL_CHUNK_TOKENS or not chosen:
+                chosen.append(truncate_to_tokens(block, remaining))
+            break
+        chosen.append(block)
+        used += cost
+        if len(chosen) >= topk:
+            break
+
+    if not chosen:
+        chosen = [truncate_to_tokens(ref_chunks[0]["text"], token_budget)] if ref_chunks else [""]
+    return chosen
+
 
 # ──────────────────────────────────────────────────────────────────────────────
 # derived_from helpers
@@ -528,21 +1352,100 @@ def is_qa_supplement(yaml_data: dict, ref_names: Set[str]) -> bool:
             return True
     return False
 
-def filter_ref_chunks_by_derived_from(
-    yaml_data: dict,
-    ref_chunks: List[dict],
-    ref_names: Set[str],
-) -> Tuple[List[dict], Set[str]]:
-    df_candidates = _derived_from_name_candidates(yaml_data)
-    df_hits = {n for n in df_candidates if n in ref_names}
-    if not df_hits:
-        return ref_chunks, set()
+@dataclass
+class DerivedFromRoute:
+    """
+    YAML 1ファイル分の derived_from 解決結果（各フェーズはこれを引くだけ）。
+    Coverage / Completeness 用の連結テキストは初回参照時に作る（そのフェーズが無効なら作らない）。
+    """
 
-    filtered = [ch for ch in ref_chunks if ch.get("ref") in df_hits]
-    if not filtered:
-        return ref_chunks, set()
+    derived_from: List[str]
+    scope_skip: bool
+    scope_skip_reason: str
+    qa_supplement: bool
+    faith_chunks: List[dict]   # Faithfulness の検索対象（解決できなければ全チャンク）
+    faith_hits: Set[str]
+    resolved: List[str]        # Coverage / Completeness 用（ソート済み参照名）
+    router: Optional["DerivedFromRouter"] = field(default=None, repr=False, compare=False)
 
-    return filtered, df_hits
+    @property
+    def coverage_blob(self) -> str:
+        return self.router._rule_blob(self.resolved, headed=True) if self.resolved and self.router else ""
+
+    @property
+    def completeness_blob(self) -> str:
+        return self.router._rule_blob(self.resolved, headed=False) if self.resolved and self.router else ""
+
+class DerivedFromRouter:
+    """
+    derived_from → 参照（チャンク部分集合 / ルール用テキスト）の対応表。YAML 読み込み後に1回だけ作る。
+    同じ参照の組み合わせを指す YAML 同士でチャンクリストと連結テキストを共有する（組み合わせ数ぶんだけ作る）。
+    """
+
+    def __init__(self, ref_chunks: List[dict], ref_names: Set[str], ref_texts: Optional[Dict[str, str]] = None):
+        self.ref_chunks = ref_chunks
+        self.ref_names = ref_names
+        self.ref_texts = ref_texts or {}
+        self.routes: Dict[str, DerivedFromRoute] = {}
+        self._chunks_by_hits: Dict[frozenset, List[dict]] = {}
+        self._blobs: Dict[tuple, str] = {}
+
+    def _faith_chunks(self, hits: frozenset) -> List[dict]:
+        chunks = self._chunks_by_hits.get(hits)
+        if chunks is None:
+            chunks = self._chunks_by_hits[hits] = [ch for ch in self.ref_chunks if ch.get("ref") in hits]
+        return chunks
+
+    def _rule_blob(self, resolved: List[str], headed: bool) -> str:
+        """参照本文の連結（headed=True: Coverage 用の見出し付き / False: Completeness 用）。組み合わせごとに1回だけ作る"""
+        key = (headed, *resolved)
+        blob = self._blobs.get(key)
+        if blob is None:
+            texts = self.ref_texts
+            if headed:
+                blob = "\n\n".join(f"===== REF_FILE: {rn} =====\n{texts[rn]}" for rn in resolved)
+            else:
+                blob = "\n\n".join(texts[rn] for rn in resolved)
+            self._blobs[key] = blob
+        return blob
+
+    def route_for(self, yaml_data: dict) -> DerivedFromRoute:
+        candidates = _derived_from_name_candidates(yaml_data)
+        skip, skip_reason = should_skip_by_derived_from_scope(yaml_data, self.ref_names)
+
+        # derived_from が参照に当たらない、または当たった参照にチャンクが無いなら全チャンクを対象にする
+        hits = frozenset(n for n in candidates if n in self.ref_names)
+        faith_chunks = self._faith_chunks(hits) if hits else []
+        if not faith_chunks:
+            faith_chunks, hits = self.ref_chunks, frozenset()
+
+        return DerivedFromRoute(
+            derived_from=derived_from_list(yaml_data),
+            scope_skip=skip,
+            scope_skip_reason=skip_reason,
+            qa_supplement=is_qa_supplement(yaml_data, self.ref_names),
+            faith_chunks=faith_chunks,
+            faith_hits=set(hits),
+            resolved=sorted(n for n in candidates if n in self.ref_texts),
+            router=self,
+        )
+
+    def route(self, fp: str, yaml_data: dict) -> DerivedFromRoute:
+        r = self.routes.get(fp)
+        if r is None:
+            r = self.routes[fp] = self.route_for(yaml_data)
+        return r
+
+def build_derived_from_router(
+    yaml_files: Dict[str, Dict[str, Any]],
+    ref_chunks: List[dict],
+    ref_names: Set[str],
+    ref_texts: Optional[Dict[str, str]] = None,
+) -> DerivedFromRouter:
+    router = DerivedFromRouter(ref_chunks, ref_names, ref_texts)
+    for fp, info in yaml_files.items():
+        router.route(fp, info["data"])
+    return router
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -567,18 +1470,18 @@ def is_timeout_like(exc: Exception) -> bool:
     return False
 
 def warn_if_slow(name: str, duration_ms: int):
-    if duration_ms >= DURATION_WARN_MS:
+    if duration_ms >= CFG.duration_warn_ms:
         print(f"  [WARN] slow_eval: {name} duration_ms={duration_ms}", flush=True)
 
 
 # ──────────────────────────────────────────────────────────────────────────────
-# deepeval Faithfulness builder + reason extractor
+# deepeval Faithfulness builder + reason extractor (deepeval backend)
 # ──────────────────────────────────────────────────────────────────────────────
 
 def build_faith_metric(truths_limit: int, include_reason: bool):
     base_kwargs = {
         "threshold": WARN_THRESHOLD,
-        "model": EVAL_MODEL,
+        "model": CFG.eval_model,
         "include_reason": include_reason,
         "async_mode": False,
     }
@@ -648,18 +1551,23 @@ def line_priority(line: str) -> int:
         return 1
     return 0
 
-def build_local_reason(faith_yaml_text: str, ref_ctx_list: List[str]) -> str:
+def line_support(faith_yaml_text: str, ref_ctx_list: List[str]) -> Tuple[List[str], List[float], TokenIds]:
+    """FaithView の評価対象行と、各行の参照コンテキストとの類似度（+ 参照側トークン）"""
     ref_blob = "\n".join(ref_ctx_list).strip()
-    ref_tok = tokenize_ja_en(ref_blob)
+    ref_tok = token_ids(ref_blob)
     lines = split_yaml_lines(faith_yaml_text)
 
+    cand = [ln.strip() for ln in lines]
+    min_len = CFG.local_reason_min_len
+    cand = [c for c in cand if len(c) >= min_len]
+    sims = jaccard_many(ref_tok, [token_ids(c) for c in cand]) if ref_tok else [0.0] * len(cand)
+    return cand, sims, ref_tok
+
+def build_local_reason(faith_yaml_text: str, ref_ctx_list: List[str]) -> str:
+    cand, sims, _ref_tok = line_support(faith_yaml_text, ref_ctx_list)
+
     scored: List[Tuple[float, int, str]] = []
-    for ln in lines:
-        s = ln.strip()
-        if len(s) < LOCAL_REASON_MIN_LEN:
-            continue
-        lt = tokenize_ja_en(s)
-        sim = jaccard(lt, ref_tok) if ref_tok else 0.0
+    for s, sim in zip(cand, sims):
         pri = line_priority(s)
         scored.append((sim, -pri, s))
 
@@ -667,9 +1575,9 @@ def build_local_reason(faith_yaml_text: str, ref_ctx_list: List[str]) -> str:
 
     picked = []
     for sim, _npri, s in scored:
-        if sim <= LOCAL_REASON_SIM_TH:
+        if sim <= CFG.local_reason_sim_th:
             picked.append((sim, s))
-        if len(picked) >= LOCAL_REASON_TOPN:
+        if len(picked) >= CFG.local_reason_topn:
             break
 
     if not picked:
@@ -683,7 +1591,7 @@ def build_local_reason(faith_yaml_text: str, ref_ctx_list: List[str]) -> str:
 
     buf = []
     buf.append("[label] SSOT_GAP_OR_OVERASSERT\n")
-    buf.append(f"[signal] low_support_lines={len(picked)} (sim_th={LOCAL_REASON_SIM_TH})\n")
+    buf.append(f"[signal] low_support_lines={len(picked)} (sim_th={CFG.local_reason_sim_th})\n")
     buf.append("[top_missing_lines]\n")
     for sim, s in picked:
         buf.append(f"- (sim={sim:.3f}) {s}\n")
@@ -694,6 +1602,345 @@ def build_local_reason(faith_yaml_text: str, ref_ctx_list: List[str]) -> str:
     return "".join(buf)
 
 
+# ──────────────────────────────────────────────────────────────────────────────
+# Evaluator backends (deepeval / OpenAI互換HTTP / local)
+# ──────────────────────────────────────────────────────────────────────────────
+
+FAITH_BATCH_PROMPT_VERSION = "faith-batch-v1"
+
+def build_faith_batch_prompt(entries: List[dict]) -> str:
+    """entries: [{"id", "fname", "actual", "ctx"}] → 1回の評価リクエスト用プロンプト（JSONで回答させる）"""
+    buf = [
+        "以下の各YAMLは、それぞれに付随する参照の内容を構造化したものです。",
+        "構造化のためのキー名・章ラベル・分類名の追加は許容します。",
+        "YAMLごとに、参照本文に存在しない『意味のある主張（要件・判断・数値・制約・因果関係など）』を追加していないかを評価し、",
+        "YAML中の主張のうち参照で裏付けられるものの割合を 0.0〜1.0 の score として付けてください。",
+        "参照に無い主張がある場合のみ減点してください。他のYAMLの参照は使わないでください。",
+        "",
+        '回答は次のJSONのみ（説明文・コードフェンス不要）: {"results": [{"id": "<id>", "score": <0.0-1.0>}]}',
+        "",
+    ]
+    buf.extend(faith_batch_item_text(e) for e in entries)
+    return "\n".join(buf)
+
+def faith_batch_item_text(e: dict) -> str:
+    """バッチプロンプト中の1ファイル分（pack_faithfulness_batches の見積もりにも使う）"""
+    return "\n".join([
+        f"##### ITEM id={e['id']} file={e['fname']}",
+        "----- YAML -----",
+        e["actual"],
+        "----- REFERENCE -----",
+        e["ctx"],
+        "",
+    ])
+
+def extract_json_object(text: str) -> dict:
+    """応答文中の最初の { 〜 最後の } を JSON として読む（前後の説明文・コードフェンスを許容）"""
+    t = (text or "").strip()
+    i, j = t.find("{"), t.rfind("}")
+    if i < 0 or j <= i:
+        raise ValueError(f"response is not JSON: {t[:200]}")
+    return json.loads(t[i:j + 1])
+
+def parse_faith_batch_response(text: str) -> Dict[str, float]:
+    """{"results":[{"id","score"}]} を id→score に。壊れた要素は無視（呼び出し側で単発評価にフォールバック）"""
+    data = extract_json_object(text)
+    out: Dict[str, float] = {}
+    for r in data.get("results") or []:
+        try:
+            out[str(r["id"])] = min(1.0, max(0.0, float(r["score"])))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return out
+
+class FaithEvaluator(ABC):
+    """
+    Faithfulness 評価バックエンドの共通インターフェース。
+    - measure      : 1ファイル分（input/actual/context）→ (score, passed, reason)
+    - measure_batch: 複数ファイルを1リクエストで評価 → id→score（既定: プロンプト生成 → generate → JSON解析）
+    - cache_model  : LLMキャッシュのキーに使うモデル名（バックエンドが違えば別エントリ）
+    """
+
+    name = ""
+
+    @property
+    def cache_model(self) -> str:
+        return f"{self.name}:{CFG.eval_model}"
+
+    def unavailable_reason(self) -> str:
+        return ""
+
+    @abstractmethod
+    def measure(self, input_text: str, actual_text: str, ctx_text: str, truths_limit: int, include_reason: bool) -> Tuple[float, bool, str]:
+        ...
+
+    def generate(self, prompt: str) -> str:
+        # 既定の measure_batch が使う。measure_batch を上書きするバックエンド（local）は実装不要
+        raise NotImplementedError(f"{type(self).__name__} does not support free-form generation")
+
+    def measure_batch(self, entries: List[dict]) -> Dict[str, float]:
+        return parse_faith_batch_response(self.generate(build_faith_batch_prompt(entries)))
+
+class DeepEvalEvaluator(FaithEvaluator):
+    name = "deepeval"
+
+    def __init__(self):
+        self._model: Any = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache_model(self) -> str:
+        # 既存キャッシュと互換（モデル名のみ）
+        return CFG.eval_model
+
+    def unavailable_reason(self) -> str:
+        if not DEEPEVAL_AVAILABLE:
+            return "deepeval is not available in this runtime (cannot import deepeval)."
+        return ""
+
+    def measure(self, input_text: str, actual_text: str, ctx_text: str, truths_limit: int, include_reason: bool) -> Tuple[float, bool, str]:
+        metric = build_faith_metric(truths_limit, include_reason=include_reason)
+        tc = LLMTestCase(
+            input=input_text,
+            actual_output=actual_text,
+            retrieval_context=[ctx_text],
+        )
+        metric.measure(tc)
+        score = float(metric.score)
+        passed = bool(metric.is_successful())
+        reason = extract_metric_reason(metric) if include_reason else ""
+        return score, passed, reason
+
+    def generate(self, prompt: str) -> str:
+        # 素のプロンプト送信は deepeval のモデルラッパー経由（バージョン差: str または (str, cost)）
+        with self._lock:
+            if self._model is None:
+                from deepeval.models import GPTModel
+                self._model = GPTModel(model=CFG.eval_model)
+        out = self._model.generate(prompt)
+        if isinstance(out, tuple):
+            out = out[0]
+        return str(out)
+
+class OpenAICompatEvaluator(FaithEvaluator):
+    """/chat/completions 互換エンドポイント（OpenAI / Azure互換ゲートウェイ / vLLM 等）に直接 POST する"""
+
+    name = "openai"
+
+    def __init__(self, base_url: str, api_key: str, timeout_sec: float):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout_sec = timeout_sec
+
+    def unavailable_reason(self) -> str:
+        if not self.base_url:
+            return "AIDD_G4_OPENAI_BASE_URL is empty (openai evaluator backend)."
+        return ""
+
+    def chat(self, messages: List[dict]) -> str:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        body = json.dumps({"model": CFG.eval_model, "messages": messages}).encode("utf-8")
+        req = urllib.request.Request(f"{self.base_url}/chat/completions", data=body, headers=headers, method="POST")
+        with urllib.request.urlopen(req, timeout=self.timeout_sec) as resp:
+            data = json.loads(resp.read().decode("utf-8"))
+        return data["choices"][0]["message"].get("content") or ""
+
+    def measure(self, input_text: str, actual_text: str, ctx_text: str, truths_limit: int, include_reason: bool) -> Tuple[float, bool, str]:
+        answer = '{"score": <0.0-1.0>, "reason": "<減点理由（日本語・簡潔に）>"}' if include_reason else '{"score": <0.0-1.0>}'
+        system = (
+            input_text
+            + "YAML中の主張のうち参照で裏付けられるものの割合を score としてください。"
+            + f"回答は次のJSONのみ（説明文・コードフェンス不要）: {answer}"
+        )
+        user = f"----- YAML -----\n{actual_text}\n----- REFERENCE -----\n{ctx_text}"
+        data = extract_json_object(self.chat([
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ]))
+        score = min(1.0, max(0.0, float(data["score"])))
+        reason = str(data.get("reason") or "").strip() if include_reason else ""
+        return score, score >= WARN_THRESHOLD, reason
+
+    def generate(self, prompt: str) -> str:
+        return self.chat([{"role": "user", "content": prompt}])
+
+class LocalEvaluator(FaithEvaluator):
+    """
+    モデル不要の決定的スタブ（CI / オフラインでのスケジューリング・並列度・キャッシュ計測用）。
+    score = FaithView 各行のトークンが参照コンテキストに含まれる割合の平均（local reason と同じ行分割・トークン化）。
+    latency_ms の待ち時間と、入力ハッシュ由来の決定的な失敗（fail_rate）を注入できる。
+    """
+
+    name = "local"
+
+    def __init__(self, latency_ms: int, fail_rate: float, fail_kind: str, seed: str):
+        self.latency_ms = latency_ms
+        self.fail_rate = fail_rate
+        self.fail_kind = fail_kind
+        self.seed = seed
+
+    def _roll(self, *parts: str) -> float:
+        h = hashlib.sha256("\x00".join((self.seed,) + parts).encode("utf-8")).digest()
+        return int.from_bytes(h[:8], "big") / float(1 << 64)
+
+    def _simulate(self, *parts: str) -> None:
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+        if self.fail_rate > 0 and self._roll(*parts) < self.fail_rate:
+            if self.fail_kind == "timeout":
+                raise TimeoutError("local evaluator: simulated timeout")
+            raise RuntimeError("local evaluator: simulated failure")
+
+    def score(self, actual_text: str, ctx_text: str) -> float:
+        cand, _sims, ref_tok = line_support(actual_text, [ctx_text])
+        if not cand:
+            return 1.0
+        return sum(token_containment(token_ids(c), ref_tok) for c in cand) / len(cand)
+
+    def measure(self, input_text: str, actual_text: str, ctx_text: str, truths_limit: int, include_reason: bool) -> Tuple[float, bool, str]:
+        self._simulate(input_text, actual_text, ctx_text)
+        score = self.score(actual_text, ctx_text)
+        reason = build_local_reason(actual_text, [ctx_text]) if include_reason else ""
+        return score, score >= WARN_THRESHOLD, reason
+
+    def measure_batch(self, entries: List[dict]) -> Dict[str, float]:
+        # 1リクエスト分として待ち時間/失敗は1回だけ
+        self._simulate(FAITH_BATCH_PROMPT_VERSION, *(e["actual"] for e in entries))
+        return {e["id"]: self.score(e["actual"], e["ctx"]) for e in entries}
+
+# 設定（バックエンド/モデル/接続先/注入パラメータ）ごとに1つ。run_g4 の実行中はそのコンテキストだけ G4Caches.evaluators
+_EVALUATORS: Dict[tuple, FaithEvaluator] = {}
+_EVALUATORS_CTX: ContextVar[Dict[tuple, FaithEvaluator]] = ContextVar("g4_evaluators", default=_EVALUATORS)
+_EVALUATOR_LOCK = threading.Lock()
+
+def get_evaluator() -> FaithEvaluator:
+    if CFG.eval_backend == "openai":
+        key: tuple = (CFG.eval_backend, CFG.eval_model, CFG.openai_base_url, CFG.openai_api_key, CFG.openai_timeout_sec)
+    elif CFG.eval_backend == "local":
+        key = (CFG.eval_backend, CFG.eval_model, CFG.local_eval_latency_ms, CFG.local_eval_fail_rate, CFG.local_eval_fail_kind, CFG.local_eval_seed)
+    else:
+        key = (CFG.eval_backend, CFG.eval_model)
+    evaluators = _EVALUATORS_CTX.get()
+    with _EVALUATOR_LOCK:
+        ev = evaluators.get(key)
+        if ev is None:
+            if CFG.eval_backend == "openai":
+                ev = OpenAICompatEvaluator(CFG.openai_base_url, CFG.openai_api_key, CFG.openai_timeout_sec)
+            elif CFG.eval_backend == "local":
+                ev = LocalEvaluator(CFG.local_eval_latency_ms, CFG.local_eval_fail_rate, CFG.local_eval_fail_kind, CFG.local_eval_seed)
+            else:
+                ev = DeepEvalEvaluator()
+            evaluators[key] = ev
+    return ev
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# LLM evaluation cache (SQLite / LRU + TTL)
+# ──────────────────────────────────────────────────────────────────────────────
+
+LLM_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS faith_cache (
+    key         TEXT PRIMARY KEY,
+    model       TEXT NOT NULL,
+    score       REAL NOT NULL,
+    passed      INTEGER NOT NULL,
+    reason      TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    last_used   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_faith_cache_last_used ON faith_cache(last_used);
+"""
+
+def sha256_text(s: str) -> str:
+    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+
+def faith_cache_key(model: str, truths_limit: int, include_reason: bool, input_text: str, actual_text: str, ctx_text: str) -> str:
+    parts = [
+        model,
+        str(truths_limit),
+        "1" if include_reason else "0",
+        sha256_text(input_text),
+        sha256_text(actual_text),
+        sha256_text(ctx_text),
+    ]
+    return sha256_text("\x1f".join(parts))
+
+class FaithCache:
+    """
+    Faithfulness 結果の永続キャッシュ。
+    - get: TTL 切れは削除して miss。hit 時は last_used を更新（LRU）
+    - put: 追加後、max_entries 超過分を last_used の古い順に削除
+    - 並列評価（スレッド）から呼ばれるため接続はロックで直列化する
+    """
+
+    def __init__(self, db_path: str, max_entries: int, ttl_sec: int):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(LLM_CACHE_SCHEMA)
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[float, bool, str]]:
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT score, passed, reason, created_at FROM faith_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl_sec > 0 and now - row[3] > self.ttl_sec:
+                self.conn.execute("DELETE FROM faith_cache WHERE key = ?", (key,))
+                self.conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE faith_cache SET last_used = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+            return float(row[0]), bool(row[1]), row[2]
+
+    def put(self, key: str, model: str, score: float, passed: bool, reason: str) -> None:
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO faith_cache(key, model, score, passed, reason, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, float(score), 1 if passed else 0, reason or "", now, now),
+            )
+            if self.max_entries > 0:
+                self.conn.execute(
+                    "DELETE FROM faith_cache WHERE key IN ("
+                    " SELECT key FROM faith_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self.conn.commit()
+
+    def stats(self) -> dict:
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM faith_cache").fetchone()[0]
+        return {"path": self.db_path, "hits": self.hits, "misses": self.misses, "entries": entries}
+
+# SQLiteパスごとに1つ。run_g4 の実行中はそのコンテキストだけ G4Caches.llm
+_LLM_CACHES: Dict[str, FaithCache] = {}
+_LLM_CACHES_CTX: ContextVar[Dict[str, FaithCache]] = ContextVar("g4_llm_caches", default=_LLM_CACHES)
+_LLM_CACHE_LOCK = threading.Lock()
+
+def get_llm_cache() -> Optional[FaithCache]:
+    if not CFG.llm_cache_enable:
+        return None
+    caches = _LLM_CACHES_CTX.get()
+    with _LLM_CACHE_LOCK:
+        cache = caches.get(CFG.llm_cache_path)
+        if cache is None:
+            cache = caches[CFG.llm_cache_path] = FaithCache(CFG.llm_cache_path, CFG.llm_cache_max_entries, CFG.llm_cache_ttl_sec)
+    return cache
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Faithfulness evaluation
 # ──────────────────────────────────────────────────────────────────────────────
@@ -711,6 +1958,18 @@ def auto_pass_result(fname: str, fp: str, reason: str, category: str = "faithful
         "retried": False,
     }
 
+def faith_input_text(fname: str) -> str:
+    return (
+        f"このYAML（{fname}）は参照の内容を構造化したものです。"
+        "構造化のためのキー名・章ラベル・分類名の追加は許容します。"
+        "ただし、参照本文に存在しない『意味のある主張（要件・判断・数値・制約・因果関係など）』を追加していないかを評価してください。"
+        "参照に無い主張がある場合のみ減点してください。"
+    )
+
+def min_faith_token_budget(fname: str) -> int:
+    """1リクエストの予算の下限 = 入力文 + FaithView の最小量 + 参照チャンクの最小量"""
+    return estimate_tokens(faith_input_text(fname)) + MIN_FAITH_VIEW_TOKENS + MIN_PARTIAL_CHUNK_TOKENS
+
 def eval_one_faithfulness(
     fname: str,
     yaml_content: str,
@@ -720,247 +1979,480 @@ def eval_one_faithfulness(
     truths_limit: int,
     include_reason: bool,
 ) -> Tuple[float, bool, str]:
-    metric = build_faith_metric(truths_limit, include_reason=include_reason)
-
     joined = "\n".join(ref_context_list)
     joined = truncate(joined, ctx_max)
 
-    tc = LLMTestCase(
-        input=(
-            f"このYAML（{fname}）は参照の内容を構造化したものです。"
-            "構造化のためのキー名・章ラベル・分類名の追加は許容します。"
-            "ただし、参照本文に存在しない『意味のある主張（要件・判断・数値・制約・因果関係など）』を追加していないかを評価してください。"
-            "参照に無い主張がある場合のみ減点してください。"
-        ),
-        actual_output=truncate(yaml_content, actual_max),
-        retrieval_context=[joined],
-    )
-    metric.measure(tc)
-    score = float(metric.score)
-    passed = bool(metric.is_successful())
-
-    reason = ""
-    if include_reason:
-        reason = extract_metric_reason(metric)
+    input_text = faith_input_text(fname)
+    actual_text = truncate(yaml_content, actual_max)
+
+    # 同一入力（モデル/パラメータ/FaithView/参照コンテキスト）ならLLMを呼ばずに前回結果を返す
+    evaluator = get_evaluator()
+    cache = get_llm_cache()
+    cache_key = ""
+    if cache is not None:
+        cache_key = faith_cache_key(evaluator.cache_model, truths_limit, include_reason, input_text, actual_text, joined)
+        hit = cache.get(cache_key)
+        if hit is not None:
+            return hit
+
+    score, passed, reason = evaluator.measure(input_text, actual_text, joined, truths_limit, include_reason)
+    if cache is not None:
+        cache.put(cache_key, evaluator.cache_model, score, passed, reason)
     return score, passed, reason
 
-def eval_faithfulness(
+def prepare_faithfulness_file(
+    fp: str,
+    info: Dict[str, Any],
     ref_chunks: List[dict],
     ref_names: Set[str],
-    yaml_files: Dict[str, Dict[str, Any]],
-) -> List[dict]:
-    results: List[dict] = []
+    ref_index: Optional[RefChunkIndex] = None,
+    route: Optional[DerivedFromRoute] = None,
+) -> dict:
+    """
+    LLM呼び出し前の準備（skip/auto-pass 判定、FaithView、参照チャンク選択）。
+    skip/auto-pass なら {"result": ...}、評価対象なら job（FaithView と ref_ctx 等）を返す。
+    route（DerivedFromRouter の解決結果）が無ければその場で解決する。
+    """
+    fname = Path(fp).name
+    yaml_data = info["data"]
+    start = time.time()
+    if route is None:
+        route = DerivedFromRouter(ref_chunks, ref_names).route_for(yaml_data)
+
+    if CFG.faithfulness_skip_all:
+        r = auto_pass_result(fname, fp, "[SKIP] AIDD_FAITHFULNESS_SKIP=* により全スキップ")
+        r["duration_ms"] = int((time.time() - start) * 1000)
+        r["reason_mode"] = "none"
+        return {"result": r}
+
+    if fname in CFG.faithfulness_skip_files:
+        r = auto_pass_result(fname, fp, f"[SKIP] AIDD_FAITHFULNESS_SKIP に明示指定（{fname}）")
+        r["duration_ms"] = int((time.time() - start) * 1000)
+        r["reason_mode"] = "none"
+        return {"result": r}
+
+    if CFG.skip_derived_scope:
+        if route.scope_skip:
+            r = auto_pass_result(fname, fp, route.scope_skip_reason)
+            r["duration_ms"] = int((time.time() - start) * 1000)
+            r["reason_mode"] = "none"
+            return {"result": r}
+
+    if route.qa_supplement:
+        r = auto_pass_result(fname, fp, "[AUTO-PASS] 補足資料由来のファイルとしてFaithfulness自動PASS")
+        r["duration_ms"] = int((time.time() - start) * 1000)
+        r["reason_mode"] = "none"
+        return {"result": r}
+
+    faith_view_obj = prune_for_faithfulness(yaml_data, depth=0)
+    faith_yaml_text = dump_yaml(faith_view_obj).strip()
+    if not faith_yaml_text:
+        faith_yaml_text = info["content"]
+
+    used_ref_chunks = ref_chunks
+    df_hits: Set[str] = set()
+    if CFG.use_derived_from_context:
+        used_ref_chunks, df_hits = route.faith_chunks, route.faith_hits
+
+    if CFG.faith_token_budget > 0:
+        # 予算 = 入力文 + FaithView + 参照。FaithView は上限比率まで、残りをすべて参照に回す
+        # 下限未満の予算は引き上げる（実行開始時に WARN 済み）。FaithView も最小量を下回らせない
+        total = max(CFG.faith_token_budget, min_faith_token_budget(fname))
+        budget = total - estimate_tokens(faith_input_text(fname))
+        actual_text = truncate_to_tokens(faith_yaml_text, max(MIN_FAITH_VIEW_TOKENS, int(budget * CFG.faith_token_actual_ratio)))
+        actual_tokens = estimate_tokens(actual_text)
+        ref_ctx = select_topk_ref_chunks(
+            yaml_content=faith_yaml_text,
+            ref_chunks=used_ref_chunks,
+            topk=CFG.topk_ref_chunks,
+            total_ctx_max=0,
+            index=ref_index,
+            token_budget=max(MIN_PARTIAL_CHUNK_TOKENS, budget - actual_tokens),
+        )
+        actual_max = ctx_max = 0
+    else:
+        actual_text = faith_yaml_text
+        ref_ctx = select_topk_ref_chunks(
+            yaml_content=faith_yaml_text,
+            ref_chunks=used_ref_chunks,
+            topk=CFG.topk_ref_chunks,
+            total_ctx_max=CFG.faith_ctx_max,
+            index=ref_index,
+        )
+        actual_max, ctx_max = CFG.faith_actual_max, CFG.faith_ctx_max
 
-    if not DEEPEVAL_AVAILABLE:
-        for fp in yaml_files.keys():
-            fname = Path(fp).name
-            results.append({
-                "test_name": f"Faithfulness :: {fname}",
-                "category": "faithfulness",
-                "file": fp,
-                "score": 0.0,
-                "passed": False,
-                "status": "error",
-                "reason": "deepeval is not available in this runtime (cannot import deepeval).",
-                "duration_ms": 0,
-                "retried": False,
-                "reason_mode": "none",
-            })
-        return results
+    return {
+        "fp": fp,
+        "fname": fname,
+        "start": start,
+        "faith_yaml_text": faith_yaml_text,
+        "actual_text": actual_text,
+        "actual_max": actual_max,
+        "ctx_max": ctx_max,
+        "used_ref_chunks": used_ref_chunks,
+        "df_hits": df_hits,
+        "ref_ctx": ref_ctx,
+    }
 
-    for fp, info in yaml_files.items():
-        fname = Path(fp).name
-        yaml_data = info["data"]
-        start = time.time()
+def eval_faithfulness_one_file(
+    fp: str,
+    info: Dict[str, Any],
+    ref_chunks: List[dict],
+    ref_names: Set[str],
+    log: List[str],
+    ref_index: Optional[RefChunkIndex] = None,
+    route: Optional[DerivedFromRoute] = None,
+) -> dict:
+    """
+    YAML 1ファイル分の Faithfulness 評価（skip/auto-pass/timeout retry を含む）。
+    並列実行時に出力が混ざらないよう、進捗は log に積み、呼び出し側がまとめて1回で出力する。
+    """
+    job = prepare_faithfulness_file(fp, info, ref_chunks, ref_names, ref_index, route)
+    if "result" in job:
+        return job["result"]
+    return eval_prepared_faithfulness(job, log, ref_index)
+
+def faithfulness_reason(job: dict, status: str, ref_ctx: List[str]) -> Tuple[str, str]:
+    """warn/fail 時の reason と reason_mode（local / llm / local_fallback）"""
+    if status not in ("fail", "warn"):
+        return "", "none"
+    faith_yaml_text = job["faith_yaml_text"]
+    local_reason = build_local_reason(faith_yaml_text, ref_ctx)
+    if CFG.faith_reason_mode == "local":
+        return local_reason, "local"
+    try:
+        _s2, _p2, llm_reason = eval_one_faithfulness(
+            fname=job["fname"],
+            yaml_content=truncate(faith_yaml_text, min(CFG.faith_actual_max, 900)),
+            ref_context_list=ref_ctx[:1],
+            actual_max=min(CFG.faith_actual_max, 900),
+            ctx_max=min(CFG.faith_ctx_max, 900),
+            truths_limit=min(CFG.faith_truths_lim, 6),
+            include_reason=True,
+        )
+        llm_reason = (llm_reason or "").strip()
+        if llm_reason:
+            return llm_reason, "llm"
+        return local_reason, "local_fallback"
+    except Exception as exc_reason:
+        return local_reason + f"\n[llm_reason_error] {exc_reason}", "local_fallback"
+
+def eval_prepared_faithfulness(job: dict, log: List[str], ref_index: Optional[RefChunkIndex] = None) -> dict:
+    fp = job["fp"]
+    fname = job["fname"]
+    start = job["start"]
+    faith_yaml_text = job["faith_yaml_text"]
+    used_ref_chunks = job["used_ref_chunks"]
+    df_hits = job["df_hits"]
+    ref_ctx = job["ref_ctx"]
+
+    extra_note = f" derived_from_ctx={sorted(df_hits)}" if df_hits else ""
+    log.append(f"  [EVAL] Faithfulness: {fname} ...{extra_note}")
 
-        if FAITHFULNESS_SKIP_ALL:
-            r = auto_pass_result(fname, fp, "[SKIP] AIDD_FAITHFULNESS_SKIP=* により全スキップ")
-            r["duration_ms"] = int((time.time() - start) * 1000)
-            r["reason_mode"] = "none"
-            results.append(r)
-            continue
+    try:
+        score, passed, _ = eval_one_faithfulness(
+            fname=fname,
+            yaml_content=job["actual_text"],
+            ref_context_list=ref_ctx,
+            actual_max=job["actual_max"],
+            ctx_max=job["ctx_max"],
+            truths_limit=CFG.faith_truths_lim,
+            include_reason=False,
+        )
+        status = "pass" if passed else ("warn" if score >= 0.5 else "fail")
+        _log_tail(log, f" score={score:.3f} → {status.upper()}")
+
+        reason, reason_mode = faithfulness_reason(job, status, ref_ctx)
+
+        duration_ms = int((time.time() - start) * 1000)
+        warn_if_slow(fname, duration_ms)
+
+        return {
+            "test_name": f"Faithfulness :: {fname}",
+            "category": "faithfulness",
+            "file": fp,
+            "score": round(score, 4),
+            "passed": bool(passed),
+            "status": status,
+            "reason": reason,
+            "reason_mode": reason_mode,
+            "duration_ms": duration_ms,
+            "retried": False,
+            "derived_from_context": sorted(df_hits) if df_hits else [],
+        }
 
-        if fname in FAITHFULNESS_SKIP_FILES:
-            r = auto_pass_result(fname, fp, f"[SKIP] AIDD_FAITHFULNESS_SKIP に明示指定（{fname}）")
-            r["duration_ms"] = int((time.time() - start) * 1000)
-            r["reason_mode"] = "none"
-            results.append(r)
-            continue
+    except Exception as exc:
+        if CFG.retry_on_timeout and is_timeout_like(exc):
+            _log_tail(log, " TIMEOUT → RETRY")
+            try:
+                ref_ctx_retry = select_topk_ref_chunks(
+                    yaml_content=faith_yaml_text,
+                    ref_chunks=used_ref_chunks,
+                    topk=max(1, CFG.topk_ref_chunks // 2),
+                    total_ctx_max=CFG.retry_ctx_max,
+                    index=ref_index,
+                )
+                score, passed, _ = eval_one_faithfulness(
+                    fname=fname,
+                    yaml_content=faith_yaml_text,
+                    ref_context_list=ref_ctx_retry,
+                    actual_max=CFG.retry_actual_max,
+                    ctx_max=CFG.retry_ctx_max,
+                    truths_limit=CFG.retry_truths_lim,
+                    include_reason=False,
+                )
+                status = "pass" if passed else ("warn" if score >= 0.5 else "fail")
+                log.append(f"  [RETRY OK] score={score:.3f} → {status.upper()}")
 
-        if SKIP_DERIVED_SCOPE:
-            skip_df, msg_df = should_skip_by_derived_from_scope(yaml_data, ref_names)
-            if skip_df:
-                r = auto_pass_result(fname, fp, msg_df)
-                r["duration_ms"] = int((time.time() - start) * 1000)
-                r["reason_mode"] = "none"
-                results.append(r)
+                reason = ""
+                reason_mode = "none"
+                if status in ("fail", "warn"):
+                    local_reason = build_local_reason(faith_yaml_text, ref_ctx_retry)
+                    reason = local_reason
+                    reason_mode = "local"
+
+                duration_ms = int((time.time() - start) * 1000)
+                warn_if_slow(fname, duration_ms)
+
+                return {
+                    "test_name": f"Faithfulness :: {fname}",
+                    "category": "faithfulness",
+                    "file": fp,
+                    "score": round(score, 4),
+                    "passed": bool(passed),
+                    "status": status,
+                    "reason": reason,
+                    "reason_mode": reason_mode,
+                    "duration_ms": duration_ms,
+                    "retried": True,
+                    "retry_params": {
+                        "topk_ref_chunks": max(1, CFG.topk_ref_chunks // 2),
+                        "actual_max_chars": CFG.retry_actual_max,
+                        "context_max_chars": CFG.retry_ctx_max,
+                        "truths_limit": CFG.retry_truths_lim,
+                    },
+                    "first_error": str(exc),
+                    "derived_from_context": sorted(df_hits) if df_hits else [],
+                }
+            except Exception as exc2:
+                log.append(f"  [RETRY FAIL] {exc2}")
+                duration_ms = int((time.time() - start) * 1000)
+                warn_if_slow(fname, duration_ms)
+                return {
+                    "test_name": f"Faithfulness :: {fname}",
+                    "category": "faithfulness",
+                    "file": fp,
+                    "score": 0.0,
+                    "passed": False,
+                    "status": "error",
+                    "reason": f"Timeout-like error then retry failed. first={exc} / retry={exc2}",
+                    "reason_mode": "none",
+                    "duration_ms": duration_ms,
+                    "retried": True,
+                    "first_error": str(exc),
+                    "retry_error": str(exc2),
+                    "derived_from_context": sorted(df_hits) if df_hits else [],
+                }
+
+        _log_tail(log, f" ERROR: {exc}")
+        duration_ms = int((time.time() - start) * 1000)
+        warn_if_slow(fname, duration_ms)
+        return {
+            "test_name": f"Faithfulness :: {fname}",
+            "category": "faithfulness",
+            "file": fp,
+            "score": 0.0,
+            "passed": False,
+            "status": "error",
+            "reason": str(exc),
+            "reason_mode": "none",
+            "duration_ms": duration_ms,
+            "retried": False,
+            "derived_from_context": sorted(df_hits) if df_hits else [],
+        }
+
+
+# ── Batched Faithfulness（小さな FaithView を1リクエストにまとめる）──
+
+def eval_faithfulness_batch(jobs: List[dict]) -> Dict[int, float]:
+    """
+    jobs をまとめて1リクエストで評価し、jobs の添字 → score を返す。
+    キャッシュ済みの job は送らない。応答に含まれなかった job は戻り値に入らない。
+    """
+    evaluator = get_evaluator()
+    cache = get_llm_cache()
+    scores: Dict[int, float] = {}
+    entries: List[dict] = []
+    keys: Dict[str, Tuple[int, str]] = {}
+    for k, job in enumerate(jobs):
+        entry = faith_batch_entry(job, f"F{k + 1}")
+        key = ""
+        if cache is not None:
+            key = faith_cache_key(evaluator.cache_model, 0, False, FAITH_BATCH_PROMPT_VERSION, entry["actual"], entry["ctx"])
+            hit = cache.get(key)
+            if hit is not None:
+                scores[k] = hit[0]
                 continue
+        keys[entry["id"]] = (k, key)
+        entries.append(entry)
 
-        if is_qa_supplement(yaml_data, ref_names):
-            r = auto_pass_result(fname, fp, "[AUTO-PASS] 補足資料由来のファイルとしてFaithfulness自動PASS")
-            r["duration_ms"] = int((time.time() - start) * 1000)
-            r["reason_mode"] = "none"
-            results.append(r)
+    if entries:
+        parsed = evaluator.measure_batch(entries)
+        for eid, score in parsed.items():
+            if eid not in keys:
+                continue
+            k, key = keys[eid]
+            scores[k] = score
+            if cache is not None:
+                cache.put(key, evaluator.cache_model, score, score >= WARN_THRESHOLD, "")
+    return scores
+
+def faith_batch_entry(job: dict, eid: str) -> dict:
+    return {
+        "id": eid,
+        "fname": job["fname"],
+        "actual": truncate(job["actual_text"], job["actual_max"]),
+        "ctx": truncate("\n".join(job["ref_ctx"]), job["ctx_max"]),
+    }
+
+def pack_faithfulness_batches(jobs: List[dict], batch_size: int, max_tokens: int) -> List[List[int]]:
+    """
+    ファイル順に貪欲に詰める（件数 batch_size、指示文込みの概算トークン max_tokens まで）。
+    トークンは estimate_tokens で数える（文字数だと CJK と ASCII で 4 倍近く違うため）。
+    指示文だけで予算を使い切る、または1件で収まらないものは単独（=通常の単発評価）。
+    """
+    budget = max_tokens - estimate_tokens(build_faith_batch_prompt([]))
+    units: List[List[int]] = []
+    cur: List[int] = []
+    cur_tokens = 0
+    for i, job in enumerate(jobs):
+        size = estimate_tokens(faith_batch_item_text(faith_batch_entry(job, f"F{batch_size}")))
+        if size > budget:
+            units.append([i])
             continue
+        if cur and (len(cur) >= batch_size or cur_tokens + size > budget):
+            units.append(cur)
+            cur, cur_tokens = [], 0
+        cur.append(i)
+        cur_tokens += size
+    if cur:
+        units.append(cur)
+    return units
+
+def batched_faithfulness_result(job: dict, score: float, batch_size: int) -> Tuple[dict, str]:
+    passed = score >= WARN_THRESHOLD
+    status = "pass" if passed else ("warn" if score >= 0.5 else "fail")
+    reason, reason_mode = faithfulness_reason(job, status, job["ref_ctx"])
+    duration_ms = int((time.time() - job["start"]) * 1000)
+    warn_if_slow(job["fname"], duration_ms)
+    df_hits = job["df_hits"]
+    extra_note = f" derived_from_ctx={sorted(df_hits)}" if df_hits else ""
+    line = f"  [EVAL] Faithfulness: {job['fname']} ...{extra_note} score={score:.3f} → {status.upper()} (batch={batch_size})"
+    return {
+        "test_name": f"Faithfulness :: {job['fname']}",
+        "category": "faithfulness",
+        "file": job["fp"],
+        "score": round(score, 4),
+        "passed": bool(passed),
+        "status": status,
+        "reason": reason,
+        "reason_mode": reason_mode,
+        "duration_ms": duration_ms,
+        "retried": False,
+        "batched": True,
+        "batch_size": batch_size,
+        "derived_from_context": sorted(df_hits) if df_hits else [],
+    }, line
 
-        faith_view_obj = prune_for_faithfulness(yaml_data, depth=0)
-        faith_yaml_text = dump_yaml(faith_view_obj).strip()
-        if not faith_yaml_text:
-            faith_yaml_text = info["content"]
+def is_serial(n_tasks: int) -> bool:
+    return CFG.faith_concurrency <= 1 or n_tasks <= 1
 
-        used_ref_chunks = ref_chunks
-        df_hits: Set[str] = set()
-        if USE_DERIVED_FROM_CONTEXT:
-            used_ref_chunks, df_hits = filter_ref_chunks_by_derived_from(yaml_data, ref_chunks, ref_names)
 
-        ref_ctx = select_topk_ref_chunks(
-            yaml_content=faith_yaml_text,
-            ref_chunks=used_ref_chunks,
-            topk=TOPK_REF_CHUNKS,
-            total_ctx_max=FAITH_CTX_MAX,
-        )
+class _EchoLog(list):
+    """
+    逐次実行用のログ: append した行をその場で出力する（ファイルの評価完了を待たずに進捗が見える）
+    - 行は改行せずに出し、_log_tail で足した結果（score / TIMEOUT / ERROR）を同じ行に続けて出す
+    - 改行は次の append か close で出す
+    """
 
-        extra_note = f" derived_from_ctx={sorted(df_hits)}" if df_hits else ""
-        print(f"  [EVAL] Faithfulness: {fname} ...{extra_note}", end=" ", flush=True)
+    _open = False
 
-        try:
-            score, passed, _ = eval_one_faithfulness(
-                fname=fname,
-                yaml_content=faith_yaml_text,
-                ref_context_list=ref_ctx,
-                actual_max=FAITH_ACTUAL_MAX,
-                ctx_max=FAITH_CTX_MAX,
-                truths_limit=FAITH_TRUTHS_LIM,
-                include_reason=False,
-            )
-            status = "pass" if passed else ("warn" if score >= 0.5 else "fail")
-            print(f"score={score:.3f} → {status.upper()}")
+    def append(self, line: str) -> None:
+        super().append(line)
+        if self._open:
+            print(flush=True)
+        print(line, end="", flush=True)
+        self._open = True
 
-            reason = ""
-            reason_mode = "none"
+    def tail(self, text: str) -> None:
+        self[-1] += text
+        print(text, end="", flush=True)
 
-            if status in ("fail", "warn"):
-                local_reason = build_local_reason(faith_yaml_text, ref_ctx)
+    def close(self) -> None:
+        if self._open:
+            print(flush=True)
+            self._open = False
 
-                if FAITH_REASON_MODE == "local":
-                    reason = local_reason
-                    reason_mode = "local"
-                else:
-                    try:
-                        _s2, _p2, llm_reason = eval_one_faithfulness(
-                            fname=fname,
-                            yaml_content=truncate(faith_yaml_text, min(FAITH_ACTUAL_MAX, 900)),
-                            ref_context_list=ref_ctx[:1],
-                            actual_max=min(FAITH_ACTUAL_MAX, 900),
-                            ctx_max=min(FAITH_CTX_MAX, 900),
-                            truths_limit=min(FAITH_TRUTHS_LIM, 6),
-                            include_reason=True,
-                        )
-                        llm_reason = (llm_reason or "").strip()
-                        if llm_reason:
-                            reason = llm_reason
-                            reason_mode = "llm"
-                        else:
-                            reason = local_reason
-                            reason_mode = "local_fallback"
-                    except Exception as exc_reason:
-                        reason = local_reason + f"\n[llm_reason_error] {exc_reason}"
-                        reason_mode = "local_fallback"
-
-            duration_ms = int((time.time() - start) * 1000)
-            warn_if_slow(fname, duration_ms)
 
-            results.append({
-                "test_name": f"Faithfulness :: {fname}",
-                "category": "faithfulness",
-                "file": fp,
-                "score": round(score, 4),
-                "passed": bool(passed),
-                "status": status,
-                "reason": reason,
-                "reason_mode": reason_mode,
-                "duration_ms": duration_ms,
-                "retried": False,
-                "derived_from_context": sorted(df_hits) if df_hits else [],
-            })
+def _log_tail(log: List[str], text: str) -> None:
+    """最後の行に評価結果を足す（逐次実行ならその場で出力する）"""
+    if isinstance(log, _EchoLog):
+        log.tail(text)
+    else:
+        log[-1] += text
 
-        except Exception as exc:
-            if RETRY_ON_TIMEOUT and is_timeout_like(exc):
-                print("TIMEOUT → RETRY", flush=True)
-                try:
-                    ref_ctx_retry = select_topk_ref_chunks(
-                        yaml_content=faith_yaml_text,
-                        ref_chunks=used_ref_chunks,
-                        topk=max(1, TOPK_REF_CHUNKS // 2),
-                        total_ctx_max=RETRY_CTX_MAX,
-                    )
-                    score, passed, _ = eval_one_faithfulness(
-                        fname=fname,
-                        yaml_content=faith_yaml_text,
-                        ref_context_list=ref_ctx_retry,
-                        actual_max=RETRY_ACTUAL_MAX,
-                        ctx_max=RETRY_CTX_MAX,
-                        truths_limit=RETRY_TRUTHS_LIM,
-                        include_reason=False,
-                    )
-                    status = "pass" if passed else ("warn" if score >= 0.5 else "fail")
-                    print(f"  [RETRY OK] score={score:.3f} → {status.upper()}")
-
-                    reason = ""
-                    reason_mode = "none"
-                    if status in ("fail", "warn"):
-                        local_reason = build_local_reason(faith_yaml_text, ref_ctx_retry)
-                        reason = local_reason
-                        reason_mode = "local"
-
-                    duration_ms = int((time.time() - start) * 1000)
-                    warn_if_slow(fname, duration_ms)
-
-                    results.append({
-                        "test_name": f"Faithfulness :: {fname}",
-                        "category": "faithfulness",
-                        "file": fp,
-                        "score": round(score, 4),
-                        "passed": bool(passed),
-                        "status": status,
-                        "reason": reason,
-                        "reason_mode": reason_mode,
-                        "duration_ms": duration_ms,
-                        "retried": True,
-                        "retry_params": {
-                            "topk_ref_chunks": max(1, TOPK_REF_CHUNKS // 2),
-                            "actual_max_chars": RETRY_ACTUAL_MAX,
-                            "context_max_chars": RETRY_CTX_MAX,
-                            "truths_limit": RETRY_TRUTHS_LIM,
-                        },
-                        "first_error": str(exc),
-                        "derived_from_context": sorted(df_hits) if df_hits else [],
-                    })
-                    continue
-                except Exception as exc2:
-                    print(f"  [RETRY FAIL] {exc2}", flush=True)
-                    duration_ms = int((time.time() - start) * 1000)
-                    warn_if_slow(fname, duration_ms)
-                    results.append({
-                        "test_name": f"Faithfulness :: {fname}",
-                        "category": "faithfulness",
-                        "file": fp,
-                        "score": 0.0,
-                        "passed": False,
-                        "status": "error",
-                        "reason": f"Timeout-like error then retry failed. first={exc} / retry={exc2}",
-                        "reason_mode": "none",
-                        "duration_ms": duration_ms,
-                        "retried": True,
-                        "first_error": str(exc),
-                        "retry_error": str(exc2),
-                        "derived_from_context": sorted(df_hits) if df_hits else [],
-                    })
-                    continue
 
-            print(f"ERROR: {exc}", flush=True)
-            duration_ms = int((time.time() - start) * 1000)
-            warn_if_slow(fname, duration_ms)
+def _flush_log(log: List[str]) -> None:
+    """1ファイル分のログを出力し終える（並列時はここでまとめて出す）"""
+    if isinstance(log, _EchoLog):
+        log.close()
+    elif log:
+        print("\n".join(log), flush=True)
+
+
+def run_bounded(tasks: List[Any]) -> List[Any]:
+    """
+    引数なし関数のリストを FAITH_CONCURRENCY 並列で実行し、入力順で結果を返す
+    - 既にイベントループが動いている（Jupyter / async アプリから呼ばれた）場合は asyncio.run が使えないので、
+      同じ並列上限のスレッドプールで実行する
+    """
+    if is_serial(len(tasks)):
+        return [t() for t in tasks]
+
+    async def run_all() -> List[Any]:
+        sem = asyncio.Semaphore(CFG.faith_concurrency)
+
+        async def bounded(t: Any) -> Any:
+            async with sem:
+                # 評価バックエンドは同期API（FaithfulnessMetric は async_mode=False）なのでスレッドへ逃がす
+                return await asyncio.to_thread(t)
+
+        # gather は入力順で結果を返す → 結果の順序は逐次実行と同一
+        return list(await asyncio.gather(*(bounded(t) for t in tasks)))
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(run_all())
+    with ThreadPoolExecutor(max_workers=CFG.faith_concurrency) as ex:
+        # プールのスレッドは呼び出し元のコンテキスト（設定）を引き継がないので、タスクごとに写しを渡す
+        # （asyncio.to_thread は自動で写す）。結果は入力順
+        futures = [ex.submit(copy_context().run, t) for t in tasks]
+        return [f.result() for f in futures]
+
+def eval_faithfulness(
+    ref_chunks: List[dict],
+    ref_names: Set[str],
+    yaml_files: Dict[str, Dict[str, Any]],
+    ref_index: Optional[RefChunkIndex] = None,
+    router: Optional[DerivedFromRouter] = None,
+) -> List[dict]:
+    results: List[dict] = []
+
+    unavailable = get_evaluator().unavailable_reason()
+    if unavailable:
+        for fp in yaml_files.keys():
+            fname = Path(fp).name
             results.append({
                 "test_name": f"Faithfulness :: {fname}",
                 "category": "faithfulness",
@@ -968,14 +2460,71 @@ def eval_faithfulness(
                 "score": 0.0,
                 "passed": False,
                 "status": "error",
-                "reason": str(exc),
-                "reason_mode": "none",
-                "duration_ms": duration_ms,
+                "reason": unavailable,
+                "duration_ms": 0,
                 "retried": False,
-                "derived_from_context": sorted(df_hits) if df_hits else [],
+                "reason_mode": "none",
             })
+        return results
 
-    return results
+    if router is None:
+        router = build_derived_from_router(yaml_files, ref_chunks, ref_names)
+
+    items = list(yaml_files.items())
+
+    def run_one(fp: str, info: Dict[str, Any]) -> dict:
+        # 逐次なら [EVAL] 行をその場で出す。並列時は1ファイル分を1回で出力（行が混ざらない）
+        log: List[str] = _EchoLog() if is_serial(len(items)) else []
+        try:
+            return eval_faithfulness_one_file(fp, info, ref_chunks, ref_names, log, ref_index, router.route(fp, info["data"]))
+        finally:
+            _flush_log(log)
+
+    if CFG.faith_batch_size <= 1:
+        return run_bounded([lambda fp=fp, info=info: run_one(fp, info) for fp, info in items])
+
+    # バッチモード: 準備（skip判定・FaithView・参照選択）を先に済ませ、小さいものを1リクエストにまとめる
+    prepared = [
+        prepare_faithfulness_file(fp, info, ref_chunks, ref_names, ref_index, router.route(fp, info["data"]))
+        for fp, info in items
+    ]
+    results: List[Optional[dict]] = [p.get("result") for p in prepared]
+    pending = [i for i, p in enumerate(prepared) if "result" not in p]
+    units = pack_faithfulness_batches([prepared[i] for i in pending], CFG.faith_batch_size, CFG.faith_batch_max_tokens)
+
+    serial = is_serial(len(units))
+
+    def run_single(i: int) -> None:
+        log: List[str] = _EchoLog() if serial else []
+        try:
+            results[i] = eval_prepared_faithfulness(prepared[i], log, ref_index)
+        finally:
+            _flush_log(log)
+
+    def run_unit(unit: List[int]) -> None:
+        idxs = [pending[k] for k in unit]
+        if len(idxs) == 1:
+            run_single(idxs[0])
+            return
+        jobs = [prepared[i] for i in idxs]
+        try:
+            scores = eval_faithfulness_batch(jobs)
+        except Exception as exc:
+            print(f"  [BATCH] {len(jobs)} files → ERROR ({exc}); 単発評価にフォールバック", flush=True)
+            scores = {}
+        lines: List[str] = []
+        for k, i in enumerate(idxs):
+            if k in scores:
+                results[i], line = batched_faithfulness_result(prepared[i], scores[k], len(idxs))
+                lines.append(line)
+        if lines:
+            print("\n".join(lines), flush=True)
+        for k, i in enumerate(idxs):
+            if k not in scores:
+                run_single(i)
+
+    run_bounded([lambda u=u: run_unit(u) for u in units])
+    return [r for r in results if r is not None]
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -1034,25 +2583,41 @@ def compute_global_coverage(ref_items: List[str], yaml_files: Dict[str, Dict[str
                 continue
             corpus_lines.append(ln)
 
-    line_tokens: List[Set[str]] = [tokenize_ja_en(l) for l in corpus_lines]
+    line_tokens: List[TokenIds] = [token_ids(l) for l in corpus_lines]
 
     details: List[dict] = []
     covered = 0
 
-    for item in ref_items:
-        it_tok = tokenize_ja_en(item)
+    item_tokens = [token_ids(item) for item in ref_items]
+    best_by_item: List[Tuple[float, str]] = []
+
+    # 転置インデックス: token_id → その語を含む行番号（昇順）
+    # 共有語が0の行は jaccard=0 で best を更新しないため、候補から外しても結果は同一。
+    # 項目×全行の行列エンジンは候補の絞り込みを捨てることになるので使わない（候補数は通常ごく少数）
+    postings: Dict[int, List[int]] = {}
+    for li, tok in enumerate(line_tokens):
+        for tid in tok.ids:
+            postings.setdefault(tid, []).append(li)
+
+    for it_tok in item_tokens:
         best = 0.0
         best_line = ""
-        for ln, tok in zip(corpus_lines, line_tokens):
-            if not tok:
-                continue
-            s = jaccard(it_tok, tok)
+        cand: Set[int] = set()
+        for tid in it_tok.ids:
+            pl = postings.get(tid)
+            if pl:
+                cand.update(pl)
+        # 元の全行走査と同じ順序（行順）で評価 → 同点時の best_line と 0.85 打ち切りを維持
+        for li in sorted(cand):
+            s = jaccard(it_tok, line_tokens[li])
             if s > best:
                 best = s
-                best_line = ln
+                best_line = corpus_lines[li]
             if best >= 0.85:
                 break
+        best_by_item.append((best, best_line))
 
+    for item, (best, best_line) in zip(ref_items, best_by_item):
         is_cov = best >= sim_th
         if is_cov:
             covered += 1
@@ -1097,38 +2662,36 @@ def collect_null_paths(data: Any, prefix: str = "", out: Optional[List[Tuple[str
             out.append((prefix, data))
     return out
 
-def path_tokens(path: str) -> Set[str]:
+def path_tokens(path: str) -> TokenIds:
     s = re.sub(r"[\[\]\d]+", " ", path)
     s = s.replace(".", " ")
-    return tokenize_ja_en(s)
+    return token_ids(s)
 
 def completeness_check_one(yaml_data: dict, ref_text: str) -> Tuple[str, int, int, List[dict]]:
     nulls = collect_null_paths(yaml_data)
     null_total = len(nulls)
 
-    ref_tok = tokenize_ja_en(ref_text or "")
+    ref_tok = token_ids(ref_text or "")
     suspicious_items: List[Tuple[float, str]] = []
 
-    for p, _v in nulls:
-        if not p:
-            continue
-        pt = path_tokens(p)
-        sim = jaccard(pt, ref_tok) if (pt and ref_tok) else 0.0
-        if sim >= COMP_EVIDENCE_TH:
+    paths = [p for p, _v in nulls if p]
+    sims = jaccard_many(ref_tok, [path_tokens(p) for p in paths])
+    for p, sim in zip(paths, sims):
+        if sim >= CFG.comp_evidence_th:
             suspicious_items.append((sim, p))
 
     suspicious_items.sort(key=lambda x: x[0], reverse=True)
     suspicious = len(suspicious_items)
 
-    if suspicious >= COMP_FAIL_COUNT:
+    if suspicious >= CFG.comp_fail_count:
         status = "fail"
-    elif suspicious >= COMP_WARN_COUNT:
+    elif suspicious >= CFG.comp_warn_count:
         status = "warn"
     else:
         status = "pass"
 
     details = []
-    for sim, p in suspicious_items[:COMP_TOPN]:
+    for sim, p in suspicious_items[:CFG.comp_topn]:
         details.append({
             "path": p,
             "evidence_sim": round(sim, 4),
@@ -1144,7 +2707,7 @@ def completeness_check_one(yaml_data: dict, ref_text: str) -> Tuple[str, int, in
 
 def should_ignore_key(path_key: str) -> bool:
     lk = path_key.lower()
-    for ig in CONS_IGNORE_KEYS:
+    for ig in CFG.cons_ignore_keys:
         if ig and ig in lk:
             return True
     return False
@@ -1224,7 +2787,7 @@ def compute_global_consistency(
     path_map: Dict[str, Dict[str, List[str]]] = {}
 
     for fp, info in yaml_files.items():
-        facts = collect_scalar_facts(info["data"], limit=CONS_MAX_FACTS_PER_FILE)
+        facts = collect_scalar_facts(info["data"], limit=CFG.cons_max_facts_per_file)
         for path, val in facts:
             if not path:
                 continue
@@ -1291,7 +2854,7 @@ def summary(results: List[dict]) -> dict:
     }
 
 def make_out_paths(out_root: str) -> Tuple[Path, Path]:
-    yaml_subdir = YAML_DIR.replace("\\", "_").replace("/", "_").strip("_")
+    yaml_subdir = CFG.yaml_dir.replace("\\", "_").replace("/", "_").strip("_")
     ts_fname = datetime.now().strftime("%m%d_%H%M") + ".json"
     base_dir = Path(out_root) / yaml_subdir
     return base_dir / ts_fname, base_dir / "allure-results"
@@ -1310,8 +2873,8 @@ def write_results(all_results: List[dict], out_root: str, meta: dict) -> dict:
 
     output = {
         "gate_id": "G4",
-        "stage": STAGE,
-        "model": EVAL_MODEL,
+        "stage": CFG.stage,
+        "model": CFG.eval_model,
         "timestamp": datetime.now().isoformat(),
         "inputs": meta.get("inputs", {}),
         "summary": {
@@ -1346,14 +2909,14 @@ def write_results(all_results: List[dict], out_root: str, meta: dict) -> dict:
             "start": ts_ms,
             "stop": ts_ms + int(r.get("duration_ms", 0)),
             "labels": [
-                {"name": "suite", "value": f"G4 {STAGE} Transform"},
+                {"name": "suite", "value": f"G4 {CFG.stage} Transform"},
                 {"name": "feature", "value": r["category"].capitalize()},
                 {"name": "severity", "value": r.get("severity", "normal")},
                 {"name": "tag", "value": "G4"},
             ],
             "parameters": [
                 {"name": "score", "value": str(r.get("score", ""))},
-                {"name": "model", "value": EVAL_MODEL},
+                {"name": "model", "value": CFG.eval_model},
                 {"name": "status", "value": r.get("status", "")},
             ],
             "description": r.get("reason", ""),
@@ -1371,47 +2934,125 @@ def write_results(all_results: List[dict], out_root: str, meta: dict) -> dict:
 # Main
 # ──────────────────────────────────────────────────────────────────────────────
 
-def main():
-    ref_files = expand_ref_inputs(REF_INPUTS)
+class G4InputError(RuntimeError):
+    """実行に必要な入力（参照ファイル等）が無い（CLI では exit 2）"""
 
-    if not ref_files and not FAITHFULNESS_SKIP_ALL and (COVERAGE_ENABLE or CONSISTENCY_ENABLE or COMPLETENESS_ENABLE):
-        print("[G4] ERROR: 参照ファイルが見つかりません。AIDD_REF_PATHS または AIDD_FILE_PATH を設定してください。")
-        sys.exit(2)
+@dataclass
+class G4Caches:
+    """
+    run_g4 を同一プロセスで繰り返し呼ぶときに使い回す状態。
+    - references: 参照ファイル群（パス+mtime+サイズ）とチャンク/トークン化/BM25 パラメータ → チャンク・索引・ルール用テキスト
+    - llm       : SQLiteパス → FaithCache
+    - evaluators: 評価バックエンド設定 → FaithEvaluator
+    トークン語彙（TokenIds の ID 空間）はここには持たない。プロセス共有の TOKEN_VOCAB を全 G4Caches が共有し、
+    references にキャッシュした TokenIds もその ID 空間を前提にする（語彙は単調増加のみなので使い回しても ID は変わらない）。
+    """
+
+    references: Dict[tuple, tuple] = field(default_factory=dict)
+    llm: Dict[str, FaithCache] = field(default_factory=dict)
+    evaluators: Dict[tuple, FaithEvaluator] = field(default_factory=dict)
+
+def load_references(ref_files: List[str], caches: G4Caches) -> Tuple[List[dict], Set[str], Optional[RefChunkIndex], Dict[str, str]]:
+    """参照のチャンク・名前集合・BM25索引・ルール用テキスト（ファイル名→本文）。同じ参照/パラメータなら caches から返す"""
+    stamp = []
+    for fp in ref_files:
+        st = os.stat(fp)
+        stamp.append((fp, st.st_mtime_ns, st.st_size))
+    key = (
+        tuple(stamp), CFG.ref_mode, CFG.ref_chunk_max_chars,
+        CFG.g4_tokenizer, tuple(CFG.ngram_sizes), CFG.ngram_hash_dim, CFG.bm25_k1, CFG.bm25_b,
+    )
+    hit = caches.references.get(key)
+    if hit is not None:
+        return hit
 
     ref_chunks: List[dict] = []
     ref_names: Set[str] = set()
+    ref_index: Optional[RefChunkIndex] = None
     ref_text_map_for_rule: Dict[str, str] = {}
 
     if ref_files:
-        ref_chunks, ref_names = build_reference_chunks(ref_files, REF_MODE, REF_CHUNK_MAX_CHARS)
+        ref_chunks, ref_names, ref_index = build_reference_chunks(ref_files, CFG.ref_mode, CFG.ref_chunk_max_chars)
         for fp in ref_files:
             name = Path(fp).name
-            mode = infer_ref_mode_by_ext(fp, REF_MODE)
+            mode = infer_ref_mode_by_ext(fp, CFG.ref_mode)
             if mode == "MD":
                 ref_text_map_for_rule[name] = load_text(fp)
             else:
                 data = load_yaml_file(fp)
                 ref_text_map_for_rule[name] = dump_yaml(data)
 
-    yaml_files = load_yaml_dir(YAML_DIR)
+    loaded = (ref_chunks, ref_names, ref_index, ref_text_map_for_rule)
+    caches.references[key] = loaded
+    return loaded
+
+def run_g4(config: Optional[G4Config] = None, caches: Optional[G4Caches] = None) -> dict:
+    """
+    G4 を1回実行し、出力 dict（write_results の戻り値）を返す（sys.exit しない）。
+    config 省略時は環境変数から。caches を渡すと参照索引・LLMキャッシュ・評価バックエンドを呼び出し間で使い回す。
+    設定とキャッシュはこの呼び出しのコンテキスト（contextvars）にだけ設定し、モジュールのグローバル変数は書き換えない。
+    別スレッドの run_g4 は互いの設定に影響せず同時に実行できる
+    （同じ caches を同時に渡すと LLMキャッシュのヒット/ミス集計が混ざる）。
+    """
+    config = config if config is not None else G4Config.from_env()
+    caches = caches if caches is not None else G4Caches()
+    tokens = (_LLM_CACHES_CTX.set(caches.llm), _EVALUATORS_CTX.set(caches.evaluators))
+    try:
+        with use_config(config):
+            return _run_g4(caches)
+    finally:
+        _LLM_CACHES_CTX.reset(tokens[0])
+        _EVALUATORS_CTX.reset(tokens[1])
+
+def _run_g4(caches: G4Caches) -> dict:
+    ref_files = expand_ref_inputs(CFG.ref_inputs)
+
+    if not ref_files and not CFG.faithfulness_skip_all and (CFG.coverage_enable or CFG.consistency_enable or CFG.completeness_enable):
+        raise G4InputError("参照ファイルが見つかりません。AIDD_REF_PATHS または AIDD_FILE_PATH を設定してください。")
+
+    ref_chunks, ref_names, ref_index, ref_text_map_for_rule = load_references(ref_files, caches)
+
+    # LLMキャッシュは初回の評価時に開く（ここでは作らない）。使い回している場合はこの時点のカウンタを控える
+    prev_cache = caches.llm.get(CFG.llm_cache_path)
+    llm_cache_base = (prev_cache.hits, prev_cache.misses) if prev_cache is not None else (0, 0)
+
+    yaml_files = load_yaml_dir(CFG.yaml_dir)
+    # derived_from → 参照（チャンク部分集合 / ルール用テキスト）を全フェーズ共通で1回だけ解決
+    router = build_derived_from_router(yaml_files, ref_chunks, ref_names, ref_text_map_for_rule)
 
     print(f"\n{'=' * 72}")
     print(f"[G4] Transform Quality Check")
-    print(f"[G4] Stage : {STAGE}")
-    print(f"[G4] Model : {EVAL_MODEL}")
-    print(f"[G4] YAMLs : {YAML_DIR}  ({len(yaml_files)} files)")
+    print(f"[G4] Stage : {CFG.stage}")
+    print(f"[G4] Model : {CFG.eval_model}")
+    print(f"[G4] YAMLs : {CFG.yaml_dir}  ({len(yaml_files)} files)")
     print(f"[G4] REF  : {', '.join(ref_files) if ref_files else '(none)'}")
-    print(f"[G4] deepeval available: {DEEPEVAL_AVAILABLE}")
-    print(f"[G4] Faithfulness topK ref chunks: {TOPK_REF_CHUNKS} (chunk_max_chars={REF_CHUNK_MAX_CHARS}, ctx_max={FAITH_CTX_MAX})")
-    print(f"[G4] Faithfulness derived_from context filter: {'ON' if USE_DERIVED_FROM_CONTEXT else 'OFF'}")
-    print(f"[G4] Faithfulness reason mode: {FAITH_REASON_MODE}")
-    print(f"[G4] Faithfulness strip top keys: {FAITH_STRIP_TOP_KEYS}")
-    print(f"[G4] Faithfulness strip any-level keys: {sorted(list(FAITH_STRIP_ANYLEVEL_KEYS))}")
-    print(f"[G4] Faithfulness prune_nulls={'ON' if FAITH_PRUNE_NULLS else 'OFF'} prune_max_depth={FAITH_PRUNE_MAX_DEPTH}")
-    print(f"[G4] Faithfulness noisy ASCII scalar maxlen: {NOISY_ASCII_SCALAR_MAXLEN}")
-    print(f"[G4] Coverage    : {'ON' if COVERAGE_ENABLE else 'OFF'} (derived_from per-file)")
-    print(f"[G4] Completeness: {'ON' if COMPLETENESS_ENABLE else 'OFF'} (derived_from per-file)")
-    print(f"[G4] Consistency : {'ON' if CONSISTENCY_ENABLE else 'OFF'}")
+    print(f"[G4] Eval backend: {CFG.eval_backend} (deepeval available: {DEEPEVAL_AVAILABLE})")
+    print(f"[G4] Tokenizer   : {CFG.g4_tokenizer}" + (f" (n={CFG.ngram_sizes}, hash_dim={CFG.ngram_hash_dim})" if CFG.g4_tokenizer == "ngram" else ""))
+    print(f"[G4] Similarity backend: {CFG.sim_backend} (numpy={NUMPY_AVAILABLE}, scipy={SCIPY_AVAILABLE}, min_pairs={CFG.sim_matrix_min_pairs})")
+    print(f"[G4] Faithfulness topK ref chunks: {CFG.topk_ref_chunks} (chunk_max_chars={CFG.ref_chunk_max_chars}, ctx_max={CFG.faith_ctx_max})")
+    print(f"[G4] Faithfulness retrieval: {CFG.faith_retrieval}")
+    print(f"[G4] Ref chunk cache: {'ON ' + CFG.ref_cache_dir if CFG.ref_cache_enable else 'OFF'}")
+    print(f"[G4] Faithfulness token budget: {'OFF (char limits)' if CFG.faith_token_budget <= 0 else f'{CFG.faith_token_budget} (actual_ratio={CFG.faith_token_actual_ratio})'}")
+    if CFG.faith_token_budget > 0 and yaml_files:
+        floor = max(min_faith_token_budget(Path(fp).name) for fp in yaml_files)
+        if CFG.faith_token_budget < floor:
+            print(
+                f"[G4] WARN: AIDD_FAITHFULNESS_TOKEN_BUDGET={CFG.faith_token_budget} は入力文+FaithView最小({MIN_FAITH_VIEW_TOKENS})"
+                f"+参照最小({MIN_PARTIAL_CHUNK_TOKENS}) を下回るため、ファイルごとに最大 {floor} まで引き上げて評価します",
+                flush=True,
+            )
+    print(f"[G4] Faithfulness derived_from context filter: {'ON' if CFG.use_derived_from_context else 'OFF'}")
+    print(f"[G4] Faithfulness reason mode: {CFG.faith_reason_mode}")
+    print(f"[G4] Faithfulness concurrency: {CFG.faith_concurrency}")
+    print(f"[G4] Faithfulness batch: {'OFF' if CFG.faith_batch_size <= 1 else f'size={CFG.faith_batch_size} max_tokens={CFG.faith_batch_max_tokens}'}")
+    print(f"[G4] LLM cache   : {'ON ' + CFG.llm_cache_path if CFG.llm_cache_enable else 'OFF'} (max_entries={CFG.llm_cache_max_entries}, ttl_sec={CFG.llm_cache_ttl_sec})")
+    print(f"[G4] Faithfulness strip top keys: {CFG.faith_strip_top_keys}")
+    print(f"[G4] Faithfulness strip any-level keys: {sorted(list(CFG.faith_strip_anylevel_keys))}")
+    print(f"[G4] Faithfulness prune_nulls={'ON' if CFG.faith_prune_nulls else 'OFF'} prune_max_depth={CFG.faith_prune_max_depth}")
+    print(f"[G4] Faithfulness noisy ASCII scalar maxlen: {CFG.noisy_ascii_scalar_maxlen}")
+    print(f"[G4] Coverage    : {'ON' if CFG.coverage_enable else 'OFF'} (derived_from per-file)")
+    print(f"[G4] Completeness: {'ON' if CFG.completeness_enable else 'OFF'} (derived_from per-file)")
+    print(f"[G4] Consistency : {'ON' if CFG.consistency_enable else 'OFF'}")
     print(f"{'=' * 72}\n")
 
     all_results: List[dict] = []
@@ -1419,11 +3060,11 @@ def main():
 
     # 1) Faithfulness
     print("[G4] ── Faithfulness（ファイル単位）──")
-    faith_results = eval_faithfulness(ref_chunks, ref_names, yaml_files)
+    faith_results = eval_faithfulness(ref_chunks, ref_names, yaml_files, ref_index, router)
     all_results.extend(faith_results)
 
     # 2) Coverage (derived_from 1:1 / per-file)
-    if COVERAGE_ENABLE:
+    if CFG.coverage_enable:
         print("\n[G4] ── Coverage（derived_from 単位）──")
         start = time.time()
 
@@ -1431,7 +3072,7 @@ def main():
             all_results.append({
                 "test_name": "Coverage :: GLOBAL",
                 "category": "coverage",
-                "file": YAML_DIR,
+                "file": CFG.yaml_dir,
                 "score": 0.0,
                 "passed": False,
                 "status": "error",
@@ -1441,14 +3082,16 @@ def main():
         else:
             per_file_scores: List[float] = []
             per_file_details: List[dict] = []
+            # 同じ参照の組み合わせなら論点抽出結果も同じ
+            ref_items_by_refs: Dict[Tuple[str, ...], List[str]] = {}
 
             for yfp, info in yaml_files.items():
                 yname = Path(yfp).name
                 ydata = info["data"]
                 ycontent = info["content"]
 
-                df_candidates = _derived_from_name_candidates(ydata)
-                df_hits = [n for n in sorted(df_candidates) if n in ref_text_map_for_rule]
+                route = router.route(yfp, ydata)
+                df_hits = route.resolved
 
                 if not df_hits:
                     all_results.append({
@@ -1458,12 +3101,12 @@ def main():
                         "score": 0.0,
                         "passed": False,
                         "status": "error",
-                        "reason": f"derived_from が無い/参照に解決できません (derived_from={derived_from_list(ydata)})",
+                        "reason": f"derived_from が無い/参照に解決できません (derived_from={route.derived_from})",
                         "duration_ms": 0,
                     })
                     per_file_details.append({
                         "file": yname,
-                        "derived_from": derived_from_list(ydata),
+                        "derived_from": route.derived_from,
                         "resolved_refs": [],
                         "score": 0.0,
                         "status": "error",
@@ -1471,17 +3114,17 @@ def main():
                     })
                     continue
 
-                ref_blob = "\n\n".join(f"===== REF_FILE: {rn} =====\n{ref_text_map_for_rule[rn]}" for rn in df_hits)
-
-                ref_items = extract_reference_items_for_coverage(
-                    [ref_blob],
-                    COV_MAX_ITEMS,
-                    COV_MIN_ITEM_LEN,
-                    skip_headings=COV_SKIP_HEADINGS,
-                )
+                ref_items = ref_items_by_refs.get(tuple(df_hits))
+                if ref_items is None:
+                    ref_items = ref_items_by_refs[tuple(df_hits)] = extract_reference_items_for_coverage(
+                        [route.coverage_blob],
+                        CFG.cov_max_items,
+                        CFG.cov_min_item_len,
+                        skip_headings=CFG.cov_skip_headings,
+                    )
 
                 tmp_yaml_files = {yfp: {"content": ycontent, "data": ydata}}
-                cov_score, cov_details = compute_global_coverage(ref_items, tmp_yaml_files, COV_SIM_THRESHOLD)
+                cov_score, cov_details = compute_global_coverage(ref_items, tmp_yaml_files, CFG.cov_sim_threshold)
 
                 per_file_scores.append(float(cov_score))
                 passed = cov_score >= WARN_THRESHOLD
@@ -1494,14 +3137,14 @@ def main():
                     "score": round(float(cov_score), 4),
                     "passed": bool(passed),
                     "status": status,
-                    "reason": f"derived_from={df_hits} covered_items={sum(1 for d in cov_details if d['covered'])}/{len(cov_details)} (sim_th={COV_SIM_THRESHOLD})",
+                    "reason": f"derived_from={df_hits} covered_items={sum(1 for d in cov_details if d['covered'])}/{len(cov_details)} (sim_th={CFG.cov_sim_threshold})",
                     "duration_ms": 0,
                     "derived_from_context": df_hits,
                 })
 
                 per_file_details.append({
                     "file": yname,
-                    "derived_from": derived_from_list(ydata),
+                    "derived_from": route.derived_from,
                     "resolved_refs": df_hits,
                     "score": round(float(cov_score), 4),
                     "status": status,
@@ -1517,27 +3160,27 @@ def main():
             all_results.append({
                 "test_name": "Coverage :: GLOBAL",
                 "category": "coverage",
-                "file": YAML_DIR,
+                "file": CFG.yaml_dir,
                 "score": round(float(global_score), 4),
                 "passed": bool(global_passed),
                 "status": global_status,
-                "reason": f"avg_of_files={len(per_file_scores)} (sim_th={COV_SIM_THRESHOLD})",
+                "reason": f"avg_of_files={len(per_file_scores)} (sim_th={CFG.cov_sim_threshold})",
                 "duration_ms": int((time.time() - start) * 1000),
             })
 
             details_meta["coverage"] = {
                 "mode": "derived_from_per_file",
-                "sim_threshold": COV_SIM_THRESHOLD,
-                "skip_headings": COV_SKIP_HEADINGS,
-                "max_items_per_file": COV_MAX_ITEMS,
-                "min_item_len": COV_MIN_ITEM_LEN,
+                "sim_threshold": CFG.cov_sim_threshold,
+                "skip_headings": CFG.cov_skip_headings,
+                "max_items_per_file": CFG.cov_max_items,
+                "min_item_len": CFG.cov_min_item_len,
                 "files": per_file_details[:min(len(per_file_details), 200)],
             }
 
             print(f"  [COVERAGE] global(avg) score={global_score:.3f}  files={len(per_file_scores)}/{len(yaml_files)}  status={global_status.upper()}")
 
     # 3) Completeness (derived_from 1:1 / per-file)
-    if COMPLETENESS_ENABLE:
+    if CFG.completeness_enable:
         print("\n[G4] ── Completeness（derived_from 単位）──")
         start = time.time()
 
@@ -1545,7 +3188,7 @@ def main():
             all_results.append({
                 "test_name": "Completeness :: GLOBAL",
                 "category": "completeness",
-                "file": YAML_DIR,
+                "file": CFG.yaml_dir,
                 "score": 0.0,
                 "passed": False,
                 "status": "error",
@@ -1560,8 +3203,8 @@ def main():
                 yname = Path(yfp).name
                 ydata = info["data"]
 
-                df_candidates = _derived_from_name_candidates(ydata)
-                df_hits = [n for n in sorted(df_candidates) if n in ref_text_map_for_rule]
+                route = router.route(yfp, ydata)
+                df_hits = route.resolved
 
                 if not df_hits:
                     all_results.append({
@@ -1571,12 +3214,12 @@ def main():
                         "score": 0.0,
                         "passed": False,
                         "status": "error",
-                        "reason": f"derived_from が無い/参照に解決できません (derived_from={derived_from_list(ydata)})",
+                        "reason": f"derived_from が無い/参照に解決できません (derived_from={route.derived_from})",
                         "duration_ms": 0,
                     })
                     per_file_details.append({
                         "file": yname,
-                        "derived_from": derived_from_list(ydata),
+                        "derived_from": route.derived_from,
                         "resolved_refs": [],
                         "status": "error",
                         "null_total": 0,
@@ -1585,8 +3228,7 @@ def main():
                     })
                     continue
 
-                ref_blob = "\n\n".join(ref_text_map_for_rule[rn] for rn in df_hits)
-                status, null_total, suspicious, details = completeness_check_one(ydata, ref_blob)
+                status, null_total, suspicious, details = completeness_check_one(ydata, route.completeness_blob)
 
                 if status == "pass":
                     score = 1.0
@@ -1605,7 +3247,7 @@ def main():
                     "score": round(float(score), 4),
                     "passed": bool(passed),
                     "status": status,
-                    "reason": f"null_total={null_total} suspicious_nulls={suspicious} (evidence_th={COMP_EVIDENCE_TH})",
+                    "reason": f"null_total={null_total} suspicious_nulls={suspicious} (evidence_th={CFG.comp_evidence_th})",
                     "duration_ms": 0,
                     "derived_from_context": df_hits,
                 })
@@ -1613,7 +3255,7 @@ def main():
                 per_file_scores.append(float(score))
                 per_file_details.append({
                     "file": yname,
-                    "derived_from": derived_from_list(ydata),
+                    "derived_from": route.derived_from,
                     "resolved_refs": df_hits,
                     "status": status,
                     "null_total": null_total,
@@ -1628,7 +3270,7 @@ def main():
             all_results.append({
                 "test_name": "Completeness :: GLOBAL",
                 "category": "completeness",
-                "file": YAML_DIR,
+                "file": CFG.yaml_dir,
                 "score": round(float(global_score), 4),
                 "passed": bool(global_passed),
                 "status": global_status,
@@ -1638,23 +3280,23 @@ def main():
 
             details_meta["completeness"] = {
                 "mode": "derived_from_per_file",
-                "evidence_threshold": COMP_EVIDENCE_TH,
-                "warn_count": COMP_WARN_COUNT,
-                "fail_count": COMP_FAIL_COUNT,
+                "evidence_threshold": CFG.comp_evidence_th,
+                "warn_count": CFG.comp_warn_count,
+                "fail_count": CFG.comp_fail_count,
                 "files": per_file_details[:min(len(per_file_details), 200)],
             }
 
             print(f"  [COMPLETENESS] global(avg) score={global_score:.3f}  files={len(per_file_scores)}/{len(yaml_files)}  status={global_status.upper()}")
 
     # 4) Global Consistency
-    if CONSISTENCY_ENABLE:
+    if CFG.consistency_enable:
         print("\n[G4] ── Global Consistency（横断）──")
         start = time.time()
         if not yaml_files:
             all_results.append({
                 "test_name": "Consistency :: GLOBAL",
                 "category": "consistency",
-                "file": YAML_DIR,
+                "file": CFG.yaml_dir,
                 "score": 1.0,
                 "passed": True,
                 "status": "pass",
@@ -1669,7 +3311,7 @@ def main():
             all_results.append({
                 "test_name": "Consistency :: GLOBAL",
                 "category": "consistency",
-                "file": YAML_DIR,
+                "file": CFG.yaml_dir,
                 "score": round(float(cons_score), 4),
                 "passed": bool(passed),
                 "status": status,
@@ -1679,43 +3321,67 @@ def main():
 
             details_meta["consistency"] = {
                 "contradictions_count": len(cons_details),
-                "ignore_keys": CONS_IGNORE_KEYS,
+                "ignore_keys": CFG.cons_ignore_keys,
                 "contradictions": cons_details[:min(len(cons_details), 200)],
             }
             print(f"  [CONSISTENCY] score={cons_score:.3f}  contradictions={len(cons_details)}  status={status.upper()}")
 
     meta = {
         "inputs": {
-            "yaml_dir": YAML_DIR,
-            "ref_inputs": REF_INPUTS,
+            "yaml_dir": CFG.yaml_dir,
+            "ref_inputs": CFG.ref_inputs,
             "ref_files": ref_files,
-            "ref_mode": REF_MODE,
-            "faithfulness_skip_all": FAITHFULNESS_SKIP_ALL,
-            "faithfulness_skip_files": sorted(list(FAITHFULNESS_SKIP_FILES)),
-            "skip_derived_from_scope": SKIP_DERIVED_SCOPE,
-            "faithfulness_use_derived_from_context": USE_DERIVED_FROM_CONTEXT,
-            "faithfulness_topk_ref_chunks": TOPK_REF_CHUNKS,
-            "faithfulness_ref_chunk_max_chars": REF_CHUNK_MAX_CHARS,
-            "faithfulness_actual_max_chars": FAITH_ACTUAL_MAX,
-            "faithfulness_context_max_chars": FAITH_CTX_MAX,
-            "faithfulness_truths_limit": FAITH_TRUTHS_LIM,
-            "faithfulness_reason_mode": FAITH_REASON_MODE,
-            "faithfulness_strip_top_keys": FAITH_STRIP_TOP_KEYS,
-            "faithfulness_strip_anylevel_keys": sorted(list(FAITH_STRIP_ANYLEVEL_KEYS)),
-            "faithfulness_prune_nulls": FAITH_PRUNE_NULLS,
-            "faithfulness_prune_max_depth": FAITH_PRUNE_MAX_DEPTH,
-            "faithfulness_noisy_ascii_scalar_maxlen": NOISY_ASCII_SCALAR_MAXLEN,
-            "local_reason_topn": LOCAL_REASON_TOPN,
-            "local_reason_sim_th": LOCAL_REASON_SIM_TH,
-            "local_reason_min_len": LOCAL_REASON_MIN_LEN,
-            "coverage_enable": COVERAGE_ENABLE,
-            "completeness_enable": COMPLETENESS_ENABLE,
-            "consistency_enable": CONSISTENCY_ENABLE,
+            "ref_mode": CFG.ref_mode,
+            "faithfulness_skip_all": CFG.faithfulness_skip_all,
+            "faithfulness_skip_files": sorted(list(CFG.faithfulness_skip_files)),
+            "skip_derived_from_scope": CFG.skip_derived_scope,
+            "faithfulness_use_derived_from_context": CFG.use_derived_from_context,
+            "faithfulness_topk_ref_chunks": CFG.topk_ref_chunks,
+            "faithfulness_ref_chunk_max_chars": CFG.ref_chunk_max_chars,
+            "ref_cache_enable": CFG.ref_cache_enable,
+            "ref_cache_max_files": CFG.ref_cache_max_files,
+            "ref_cache_max_age_days": CFG.ref_cache_max_age_days,
+            "faithfulness_actual_max_chars": CFG.faith_actual_max,
+            "faithfulness_context_max_chars": CFG.faith_ctx_max,
+            "faithfulness_token_budget": CFG.faith_token_budget,
+            "faithfulness_truths_limit": CFG.faith_truths_lim,
+            "eval_backend": CFG.eval_backend,
+            "faithfulness_retrieval": CFG.faith_retrieval,
+            "faithfulness_concurrency": CFG.faith_concurrency,
+            "faithfulness_batch_size": CFG.faith_batch_size,
+            "faithfulness_batch_max_tokens": CFG.faith_batch_max_tokens,
+            "sim_backend": CFG.sim_backend,
+            "tokenizer": CFG.g4_tokenizer,
+            "ngram_sizes": CFG.ngram_sizes,
+            "ngram_hash_dim": CFG.ngram_hash_dim,
+            "faithfulness_reason_mode": CFG.faith_reason_mode,
+            "faithfulness_strip_top_keys": CFG.faith_strip_top_keys,
+            "faithfulness_strip_anylevel_keys": sorted(list(CFG.faith_strip_anylevel_keys)),
+            "faithfulness_prune_nulls": CFG.faith_prune_nulls,
+            "faithfulness_prune_max_depth": CFG.faith_prune_max_depth,
+            "faithfulness_noisy_ascii_scalar_maxlen": CFG.noisy_ascii_scalar_maxlen,
+            "local_reason_topn": CFG.local_reason_topn,
+            "local_reason_sim_th": CFG.local_reason_sim_th,
+            "local_reason_min_len": CFG.local_reason_min_len,
+            "coverage_enable": CFG.coverage_enable,
+            "completeness_enable": CFG.completeness_enable,
+            "consistency_enable": CFG.consistency_enable,
+            "llm_cache_enable": CFG.llm_cache_enable,
+            "llm_cache_max_entries": CFG.llm_cache_max_entries,
+            "llm_cache_ttl_sec": CFG.llm_cache_ttl_sec,
         },
         "details": details_meta,
     }
 
-    output = write_results(all_results, OUT_ROOT, meta)
+    llm_cache = _LLM_CACHES_CTX.get().get(CFG.llm_cache_path) if CFG.llm_cache_enable else None
+    if llm_cache is not None:
+        # ヒット/ミスはこの実行分（FaithCache のカウンタは呼び出し間で累積する）
+        lc = llm_cache.stats()
+        lc["hits"] -= llm_cache_base[0]
+        lc["misses"] -= llm_cache_base[1]
+        details_meta["llm_cache"] = lc
+
+    output = write_results(all_results, CFG.out_root, meta)
 
     s = output["summary"]
     print(f"\n{'=' * 72}")
@@ -1729,11 +3395,21 @@ def main():
     print(f"     Completeness : avg={cps['avg_score']:.3f}  passed={cps['passed']}/{cps['total']}{' ⚠ WARNING' if cps['warning'] else ''}")
     ks = s["consistency"]
     print(f"     Consistency  : avg={ks['avg_score']:.3f}  passed={ks['passed']}/{ks['total']}{' ⚠ WARNING' if ks['warning'] else ''}")
+    if llm_cache is not None:
+        lc = details_meta["llm_cache"]
+        print(f"     LLM cache    : hits={lc['hits']}  misses={lc['misses']}  entries={lc['entries']}")
     print(f"\n[G4] Output : {output['_meta']['json_path']}")
     print(f"[G4] Allure : {output['_meta']['allure_dir']}")
     print(f"{'=' * 72}\n")
+    return output
 
-    sys.exit(0 if s["overall_status"] == "pass" else 1)
+def main():
+    try:
+        output = run_g4(G4Config.from_env())
+    except G4InputError as exc:
+        print(f"[G4] ERROR: {exc}")
+        sys.exit(2)
+    sys.exit(0 if output["summary"]["overall_status"] == "pass" else 1)
 
 
 if __name__ == "__main__":
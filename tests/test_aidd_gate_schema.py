@@ -0,0 +1,160 @@
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _load(name, rel):
+    spec = importlib.util.spec_from_file_location(name, REPO_ROOT / rel)
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+gate = _load("aidd_gate", "runner/aidd-gate.py")
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+# ─── schema_registry ──────────────────────────────────────────────────────────
+
+def _registry(tmp_path, entries):
+    lines = ["schema_registry:"]
+    for match, schema in entries:
+        lines.append(f"  - match: {json.dumps(match)}")
+        lines.append(f"    schema: {json.dumps(str(schema))}")
+    return _write(tmp_path / "schema_registry.yaml", "\n".join(lines) + "\n")
+
+
+@pytest.fixture
+def registry_root(tmp_path):
+    schema = _write(tmp_path / "doc.schema.json", json.dumps({"type": "object", "required": ["id"]}))
+    root = tmp_path / "root"
+    _write(root / "docs" / "A-001.yaml", "id: A-001\n")
+    _write(root / "docs" / "B-001.yaml", "id: B-001\n")
+    return schema, root
+
+
+def test_registry_without_any_match_fails(tmp_path, registry_root):
+    schema, root = registry_root
+    reg = _registry(tmp_path, [(r"stale/dir/A-\d{3}\.yaml$", schema)])
+    res = gate.gate_schema_registry("r", reg, root, jobs=1)
+    assert res.status == "FAIL"
+    assert res.details["files_validated"] == 0
+    assert res.details["files_unmatched"] == 2
+
+
+def test_registry_with_unused_entry_warns(tmp_path, registry_root):
+    schema, root = registry_root
+    reg = _registry(tmp_path, [(r"docs/A-\d{3}\.yaml$", schema), (r"stale/B-\d{3}\.yaml$", schema)])
+    res = gate.gate_schema_registry("r", reg, root, jobs=1)
+    assert res.status == "WARN"
+    assert res.details["files_validated"] == 1
+    assert res.details["entries_unmatched"] == [r"stale/B-\d{3}\.yaml$"]
+
+
+@pytest.mark.parametrize("pattern", [r"(A)-\1\.yaml$", r"(?i)a-001\.yaml$", r"(A)?(?(1)-001|x)"])
+def test_registry_rejects_patterns_that_break_the_router(tmp_path, registry_root, pattern):
+    schema, root = registry_root
+    reg = _registry(tmp_path, [(pattern, schema)])
+    with pytest.raises(ValueError):
+        gate.load_schema_registry(reg)
+    res = gate.gate_schema_registry("r", reg, root, jobs=1)
+    assert res.status == "FAIL"
+    assert "error" in res.details
+
+
+def test_registry_router_keeps_first_match_order():
+    entries = [(r"(?P<k>A)-(?P=k)?\d", "s0"), (r"\\1", "s1"), (r"(?i:b)-\d", "s2")]
+    route = gate.compile_registry_router(entries)
+    assert route("x/A-001.yaml") == 0
+    assert route("x/b-001.yaml") == 2
+    assert route("x/\\1.yaml") == 1
+    assert route("x/C-001.yaml") is None
+
+
+# ─── relative $ref ────────────────────────────────────────────────────────────
+
+def _relative_ref_schemas(schema_dir, target_name="b.schema.json"):
+    # no $id: the base URI must come from the schema file itself
+    _write(schema_dir / "b.schema.json", json.dumps({
+        "type": "object",
+        "required": ["name"],
+        "properties": {"name": {"type": "string"}},
+    }))
+    return _write(schema_dir / "a.schema.json", json.dumps({
+        "type": "object",
+        "properties": {"items": {"type": "array", "items": {"$ref": target_name}}},
+    }))
+
+
+@pytest.mark.parametrize("split_items", [False, True])
+def test_schema_with_relative_ref_resolves(tmp_path, split_items):
+    schema = _relative_ref_schemas(tmp_path / "schemas")
+    ok = _write(tmp_path / "ok.yaml", "items:\n  - name: a\n  - name: b\n")
+    bad = _write(tmp_path / "bad.yaml", "items:\n  - name: a\n  - title: b\n")
+
+    assert gate.gate_schema("s", ok, schema, split_items=split_items, jobs=1).status == "PASS"
+    res = gate.gate_schema("s", bad, schema, split_items=split_items, jobs=1)
+    assert res.status == "FAIL"
+    assert [e["path"] for e in res.details["errors"]] == [["items", 1]]
+
+
+@pytest.mark.parametrize("split_items", [False, True])
+def test_schema_with_unresolvable_ref_fails_instead_of_crashing(tmp_path, split_items):
+    schema = _relative_ref_schemas(tmp_path / "schemas", target_name="missing.schema.json")
+    doc = _write(tmp_path / "doc.yaml", "items:\n  - name: a\n")
+
+    res = gate.gate_schema("s", doc, schema, split_items=split_items, jobs=1)
+    assert res.status == "FAIL"
+    assert "$ref" in json.dumps(res.details)
+
+
+# ─── split vs whole ───────────────────────────────────────────────────────────
+
+SPLIT_DOCS = [
+    "items: []\n",
+    "items:\n  - name: a\n  - name: b\n",
+    "items:\n  - title: a\n  - name: 1\n  - name: c\n  - {}\n",
+    "items:\n" + "".join("  - name: ok\n" if i % 7 else "  - name: [x]\n" for i in range(40)),
+]
+
+
+@pytest.mark.parametrize("doc", SPLIT_DOCS)
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_split_items_matches_whole_document(tmp_path, doc, jobs):
+    schema = _relative_ref_schemas(tmp_path / "schemas")
+    path = _write(tmp_path / "doc.yaml", doc)
+
+    whole = gate.gate_schema("s", path, schema, max_errors=1000)
+    split = gate.gate_schema("s", path, schema, max_errors=1000, split_items=True, jobs=jobs)
+    assert split.status == whole.status
+    assert split.details.get("errors") == whole.details.get("errors")
+
+
+# ─── count_errors ─────────────────────────────────────────────────────────────
+
+def test_count_errors_whole_and_split(tmp_path):
+    schema = _relative_ref_schemas(tmp_path / "schemas")
+    rows = "".join("  - name: ok\n" if i % 5 else "  - title: ng\n" for i in range(50))
+    doc = _write(tmp_path / "doc.yaml", "items:\n" + rows)
+
+    whole = gate.gate_schema("s", doc, schema, max_errors=2, count_errors=True)
+    assert whole.details["error_count"] == 10
+    assert whole.details["truncated"] is True
+    assert len(whole.details["errors"]) == 2
+
+    split = gate.gate_schema("s", doc, schema, max_errors=2, count_errors=True, split_items=True, jobs=1)
+    assert split.details["invalid_items"] == 10
+    assert split.details["truncated"] is True
+    assert split.details["errors"] == whole.details["errors"]
@@ -0,0 +1,96 @@
+import gzip
+import importlib.util
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _load(name, rel):
+    spec = importlib.util.spec_from_file_location(name, REPO_ROOT / rel)
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+g1 = _load("g1_ambiguity", "runner/gates/g1_ambiguity.py")
+
+
+def _run(conn, target, files, findings):
+    report = {
+        "timestamp": "2026-01-01T00:00:00",
+        "target": target,
+        "exit_code": 0,
+        "config": {},
+        "summary": g1.summarize(findings, total_files=len(files)),
+    }
+    return g1.record_run(conn, report, findings, files)
+
+
+def _finding(file, line, category="PROC_REQ"):
+    return {"file": file, "line": line, "severity": "HIGH", "term": "適切に", "category": category, "excluded": False}
+
+
+def test_history_counts_runs_that_scanned_the_file(tmp_path):
+    conn = g1.open_history(tmp_path / "h.sqlite3")
+    r1 = _run(conn, "docs", ["a.md", "b.md"], [_finding("a.md", 3)])
+    r2 = _run(conn, "other", ["b.md"], [_finding("b.md", 1)])
+    r3 = _run(conn, "docs", ["a.md"], [])  # clean run
+    conn.commit()
+
+    runs = g1.query_file_runs(conn, "a.md")
+    assert [(r["run_id"], r["hits"]) for r in runs] == [(r3, 0), (r1, 1)]
+    assert [r["run_id"] for r in g1.query_history(conn, "a.md")] == [r1]
+    # the last run of a.md is clean: nothing in the window of 1
+    assert g1.query_history(conn, "a.md", last_runs=1) == []
+
+    assert [r["run_id"] for r in g1.query_file_runs(conn, "b.md", target="docs")] == [r1]
+    assert [r["run_id"] for r in g1.query_file_runs(conn, "b.md", target="other")] == [r2]
+    assert g1.query_file_runs(conn, "never.md") == []
+
+
+def test_history_window_larger_than_sqlite_variable_limit(tmp_path):
+    conn = g1.open_history(tmp_path / "h.sqlite3")
+    conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)  # the historical default
+    n = 5000
+    conn.executemany(
+        "INSERT INTO runs (run_id, timestamp, target, exit_code, files, hits, high, med, low,"
+        " quote_hits, desc_hits, proc_req_hits, proc_req_fail, config_json)"
+        " VALUES (?, 't', 'docs', 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, '{}')",
+        [(i,) for i in range(1, n + 1)],
+    )
+    conn.executemany(
+        "INSERT INTO scanned_files (run_id, file, hits, proc_req_fail) VALUES (?, 'a.md', ?, ?)",
+        [(i, 1 if i % 1000 == 0 else 0, 1 if i % 1000 == 0 else 0) for i in range(1, n + 1)],
+    )
+    conn.executemany(
+        "INSERT INTO findings (run_id, file, line, severity, term, category, excluded) VALUES (?, 'a.md', 1, 'HIGH', 't', 'PROC_REQ', 0)",
+        [(i,) for i in range(1000, n + 1, 1000)],
+    )
+    conn.commit()
+
+    assert len(g1.query_file_runs(conn, "a.md", last_runs=n)) == n
+    assert len(g1.query_history(conn, "a.md", last_runs=n)) == n // 1000
+    assert len(g1.query_history(conn, "a.md", target="docs", last_runs=1500)) == 2  # runs 4000 and 5000
+
+
+def test_default_report_is_gz_keyed_by_run_id(tmp_path, monkeypatch):
+    target = tmp_path / "docs"
+    target.mkdir()
+    (target / "plan.md").write_text("基本的に週次で報告する\n", encoding="utf-8")
+    out_root = tmp_path / "out"
+    argv = ["g1", "--target", str(target), "--out_root", str(out_root),
+            "--history_db", str(out_root / "h.sqlite3")]
+    monkeypatch.setattr(sys, "argv", argv)
+    assert g1.main() == 0
+
+    reports = list((out_root / "reports").iterdir())
+    assert [p.name for p in reports] == ["00000001.json.gz"]
+    with gzip.open(reports[0], "rt", encoding="utf-8") as f:
+        assert json.load(f)["summary"]["hits"] == 1
@@ -0,0 +1,103 @@
+import importlib.util
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _load(name, rel):
+    spec = importlib.util.spec_from_file_location(name, REPO_ROOT / rel)
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+g1 = _load("g1_ambiguity", "runner/gates/g1_ambiguity.py")
+
+DOC = Path("docs/plan.md")
+
+LINES = [
+    "# 企画",
+    "- 適切に対応すること",
+    "- 基本的に週次で報告する",
+    "```",
+    "code: 柔軟に",
+    "```",
+    "「なるべく」は引用",
+    "必要に応じて見直しを行う",
+    "可能な限り自動化する",
+    "",
+    "十分に検証すること",
+    "```python",
+    "x = '適宜'",
+]
+
+
+@pytest.fixture(scope="module")
+def engine():
+    rules = g1.build_default_rules()
+    return rules, g1.build_matcher(rules)
+
+
+def _full_scan(session, engine):
+    rules, matcher = engine
+    return g1.scan_text(DOC, session.text, rules, {}, matcher=matcher)
+
+
+def test_session_matches_full_scan_after_random_edits(engine):
+    rules, matcher = engine
+    rnd = random.Random(28)
+    session = g1.G1Session(DOC, "\n".join(LINES), rules=rules, matcher=matcher)
+    assert session.findings() == _full_scan(session, engine)
+
+    for step in range(300):
+        n = len(session.lines)
+        start = rnd.randint(0, n)
+        end = rnd.randint(start, min(n, start + 3))
+        new_lines = rnd.sample(LINES, rnd.randint(0, 3))
+        session.apply_edit(start, end, "\n".join(new_lines))
+        assert session.findings() == _full_scan(session, engine), step
+
+
+def test_session_fence_toggle_propagates_and_stops(engine):
+    rules, matcher = engine
+    text = "\n".join(["適切に", "```", "適切に", "```", "適切に", "適切に"])
+    session = g1.G1Session(DOC, text, rules=rules, matcher=matcher)
+
+    # removing the opening fence turns the closing fence into an opening one
+    first, last = session.apply_edit(1, 2, "")
+    assert (first, last) == (1, len(session.lines))
+    assert session.findings() == _full_scan(session, engine)
+
+    # restoring it flips every following line back
+    assert session.apply_edit(1, 1, "```") == (1, len(session.lines))
+    assert session.findings() == _full_scan(session, engine)
+
+    # swapping a fence for another fence leaves the state unchanged: stop right after the edit
+    assert session.apply_edit(1, 2, "```python") == (1, 2)
+    assert session.findings() == _full_scan(session, engine)
+
+    # a plain text edit rescans just that line
+    assert session.apply_edit(4, 5, "なるべく") == (4, 5)
+    assert session.findings() == _full_scan(session, engine)
+
+
+def test_session_rejects_out_of_range_edit(engine):
+    rules, matcher = engine
+    session = g1.G1Session(DOC, "a\nb", rules=rules, matcher=matcher)
+    with pytest.raises(ValueError):
+        session.apply_edit(1, 3, "x")
+
+
+def test_matcher_is_memoized_per_dictionary():
+    rules = g1.build_default_rules()
+    assert g1.get_matcher(rules) is g1.get_matcher(g1.build_default_rules())
+    merged = g1.merge_rules(rules, [("要検討", "MED", "")])
+    assert g1.get_matcher(merged) is not g1.get_matcher(rules)
+    # severity/note overrides keep the literals, so the automaton is shared
+    assert g1.get_matcher(g1.merge_rules(rules, [("適宜", "HIGH", "x")])) is g1.get_matcher(rules)
@@ -0,0 +1,113 @@
+import importlib.util
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _load(name, rel):
+    spec = importlib.util.spec_from_file_location(name, REPO_ROOT / rel)
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+g2 = _load("g2_checklist_completion", "runner/gates/g2_checklist_completion.py")
+
+
+DOC = {
+    "meta": {"version": 12.5, "count": -3, "tags": ["a", "b"], "ok": True, "none": None},
+    "items": [
+        {"id": 1, "status": "done", "score": 1.25, "w": 12e3, "evidence_refs": []},
+        {"id": 22, "status": "abort", "reason": "対象外", "score": -0.5e-2},
+        {"id": 333, "status": "todo", "nested": {"x": [1, 2.5, -3e1], "y": {"z": 1e10}}},
+        {"id": 4444, "status": "abort", "reason": "", "score": 0},
+        {"id": 55555, "status": "done", "score": 123456.789},
+    ],
+    "trailer": 99.75,
+}
+
+
+def _iter_from_text(text, chunk_size, tmp_path):
+    p = tmp_path / "checklist.json"
+    p.write_text(text, encoding="utf-8")
+    return list(g2.iter_checklist_items(p, chunk_size=chunk_size))
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_stream_matches_json_load_at_every_chunk_size(tmp_path, indent):
+    text = json.dumps(DOC, ensure_ascii=False, indent=indent)
+    expected = json.loads(text)["items"]
+    for chunk_size in range(1, 64):
+        assert _iter_from_text(text, chunk_size, tmp_path) == expected, chunk_size
+
+
+def test_stream_number_cut_at_chunk_boundary():
+    # "12.5" split as "12." / "5" and "12e3" split as "12e" / "3"
+    for text in ('[12.5, 7]', '[12e3, 7]', '[-0.25e-1, 7]'):
+        expected = json.loads(text)
+        for chunk_size in range(1, len(text) + 1):
+            js = g2._JsonStream(io.StringIO(text), chunk_size)
+            js.take("[")
+            first = js.value()
+            js.take(",")
+            assert [first, js.value()] == expected, (text, chunk_size)
+
+
+def test_stream_summary_matches_whole_file(tmp_path):
+    text = json.dumps(DOC)
+    whole = g2.summarize_items(json.loads(text)["items"])
+    for chunk_size in (1, 3, 7, 16, 1 << 16):
+        assert g2.summarize_items(_iter_from_text(text, chunk_size, tmp_path)) == whole
+
+
+def test_stream_routes_checkflow_export(tmp_path, monkeypatch):
+    export = {
+        "phaseId": "PLN",
+        "actor": {"displayName": "qa"},
+        "nodes": {
+            "n1": {"status": "Done", "checkedItems": {"a": True}},
+            "n2": {"status": "Pending", "pendingReason": ""},
+            "n3": {"status": "InProgress"},
+        },
+    }
+    p = tmp_path / "coach-ui-export-1.json"
+    p.write_text(json.dumps(export), encoding="utf-8")
+
+    with pytest.raises(g2.CheckFlowExportError):
+        list(g2.iter_checklist_items(p))
+
+    expected = g2.summarize_items(g2.checkflow_items(export))
+    assert expected["total"] == 3
+    for stream in ([], ["--stream"]):
+        argv = ["g2", "--checklist", str(p), "--fail-if-abort-without-reason", "--out", str(tmp_path / "r.json")]
+        monkeypatch.setattr(sys, "argv", argv + stream)
+        with pytest.raises(SystemExit) as exc:
+            g2.main()
+        assert exc.value.code == 2
+        assert json.loads((tmp_path / "r.json").read_text(encoding="utf-8"))["summary"] == expected
+
+
+def test_checkflow_nodes_without_actor_are_unassigned(tmp_path):
+    export = {
+        "phaseId": "PLN",
+        "actor": {"displayName": "exporter"},
+        "nodes": {
+            "n1": {"status": "Done", "actorName": "alice"},
+            "n2": {"status": "ToDo", "actorName": None},
+            "n3": {"status": "Pending", "pendingReason": "later"},
+        },
+    }
+    assert [it["actor"] for it in g2.checkflow_items(export)] == ["alice", "(unassigned)", "(unassigned)"]
+
+    p = tmp_path / "coach-ui-export-1.json"
+    p.write_text(json.dumps(export), encoding="utf-8")
+    actors = g2.reduce_checkflow_export(str(p))["actor"]
+    assert set(actors) == {"alice", g2.UNASSIGNED_ACTOR}
+    assert actors[g2.UNASSIGNED_ACTOR]["total"] == 2
@@ -0,0 +1,330 @@
+import importlib.util
+import re
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _load(name, rel):
+    spec = importlib.util.spec_from_file_location(name, REPO_ROOT / rel)
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+g3 = _load("g3_schema", "runner/gates/g3_schema.py")
+
+
+# ─── per-rule engine vs single pass ───────────────────────────────────────────
+
+# check_rule before the single-pass engine: one loop over the YAMLs per rule.
+_META_REQUIRED_KEYS = {"artifact_id", "file", "author", "source_type", "timestamp", "content_hash"}
+_TODO_PATTERN = re.compile(r"\b(TODO|TBD|PENDING)\b", re.IGNORECASE)
+
+
+def _non_meta_yaml_str(yaml_data):
+    without_meta = {k: v for k, v in yaml_data.items() if k != "meta"}
+    try:
+        return yaml.dump(without_meta, allow_unicode=True, default_flow_style=False)
+    except Exception:
+        return ""
+
+
+def _legacy_check_rule(rule_id, yaml_files):
+    try:
+        if rule_id == "PLN-CONS-011":
+            failures = []
+            for fp, info in yaml_files.items():
+                meta = info["data"].get("meta") or {}
+                if not meta:
+                    failures.append(f"{Path(fp).name}: metaセクションなし")
+                    continue
+                missing = _META_REQUIRED_KEYS - set(meta.keys())
+                if missing:
+                    failures.append(f"{Path(fp).name}: 欠如キー={sorted(missing)}")
+            if failures:
+                return {"passed": False, "detail": " / ".join(failures)}
+            return {"passed": True, "detail": f"全{len(yaml_files)}件でmeta必須キー確認済み"}
+
+        if rule_id == "PLN-CONS-020":
+            failures = []
+            for fp, info in yaml_files.items():
+                actual = Path(fp).name
+                declared = info["data"].get("meta", {}).get("file", "")
+                if declared != actual:
+                    failures.append(f"{actual}: meta.file='{declared}'")
+            if failures:
+                return {"passed": False, "detail": "不一致: " + " / ".join(failures)}
+            return {"passed": True, "detail": "全YAMLでmeta.fileと実ファイル名が一致"}
+
+        if rule_id == "PLN-CONS-030":
+            bad = []
+            for fp, info in yaml_files.items():
+                h = str(info["data"].get("meta", {}).get("content_hash", "") or "")
+                if h.upper() in ("PENDING", "TODO", ""):
+                    bad.append(f"{Path(fp).name}: content_hash='{h}'")
+            if bad:
+                return {"passed": False, "detail": "未設定: " + " / ".join(bad)}
+            return {"passed": True, "detail": "全YAMLのcontent_hashが設定済み"}
+
+        if rule_id == "PLN-CONS-040":
+            failures = []
+            for fp, info in yaml_files.items():
+                stem = Path(fp).stem
+                artifact_id = info["data"].get("meta", {}).get("artifact_id", "") or ""
+                if artifact_id and artifact_id not in stem:
+                    failures.append(f"{Path(fp).name}: artifact_id='{artifact_id}'がステムに含まれない")
+            if failures:
+                return {"passed": False, "detail": "不一致: " + " / ".join(failures)}
+            return {"passed": True, "detail": "全YAMLのファイル名にartifact_idが含まれる"}
+
+        if rule_id == "PLN-CONS-060":
+            violations = []
+            for fp, info in yaml_files.items():
+                found = set(_TODO_PATTERN.findall(_non_meta_yaml_str(info["data"])))
+                if found:
+                    violations.append(f"{Path(fp).name}: {found}")
+            if violations:
+                return {"passed": False, "detail": "TODO/TBD/PENDING残存: " + " / ".join(violations)}
+            return {"passed": True, "detail": "meta以外にTODO/TBD/PENDINGなし"}
+
+        raise AssertionError(rule_id)
+    except Exception as exc:
+        return {"passed": False, "detail": f"チェック実行エラー: {exc}"}
+
+
+DROP = object()  # _meta(...): leave the key out
+
+RULE_IDS = ["PLN-CONS-011", "PLN-CONS-020", "PLN-CONS-030", "PLN-CONS-040", "PLN-CONS-060"]
+
+
+def _meta(artifact_id, file, **overrides):
+    meta = {
+        "artifact_id": artifact_id,
+        "file": file,
+        "author": "@a",
+        "source_type": "human",
+        "timestamp": "2026-01-01T00:00:00+09:00",
+        "content_hash": "abc123",
+    }
+    meta.update(overrides)
+    return {k: v for k, v in meta.items() if v is not DROP}
+
+
+TREES = {
+    "clean": {
+        "PLN-PLN-GOAL-001.yaml": {"meta": _meta("PLN-PLN-GOAL-001", "PLN-PLN-GOAL-001.yaml"),
+                                  "goal": {"primary_goal": "品質ゲートを整備する"}},
+        "PLN-PLN-SCOPE-001.yaml": {"meta": _meta("PLN-PLN-SCOPE-001", "PLN-PLN-SCOPE-001.yaml", content_hash="TODO-free"),
+                                   "scope": {"scope_in": ["YAML"], "note": "TODO は meta にだけ書く"}},
+    },
+    "broken": {
+        "PLN-PLN-A-001.yaml": {"goal": "meta なし TBD"},
+        "PLN-PLN-B-001.yaml": {"meta": _meta("PLN-PLN-X-999", "wrong.yaml", author=DROP, content_hash="pending"),
+                               "items": [{"todo": "PENDING"}, "todo: later"]},
+        "PLN-PLN-C-001.yaml": {"meta": _meta("PLN-PLN-C-001", "PLN-PLN-C-001.yaml", content_hash=None, timestamp=DROP),
+                               "body": {"TBD": 1, "x": "text"}},
+        "PLN-PLN-D-001.yaml": {"meta": {"file": "PLN-PLN-D-001.yaml", "content_hash": "Todo"},
+                               "body": "Todo list mentions todos only"},
+    },
+    "meta_not_a_mapping": {
+        "PLN-PLN-E-001.yaml": {"meta": _meta("PLN-PLN-E-001", "PLN-PLN-E-001.yaml")},
+        "PLN-PLN-F-001.yaml": {"meta": ["artifact_id", "file"], "body": "ok"},
+    },
+}
+
+
+def _write_tree(root, tree):
+    root.mkdir()
+    for name, data in tree.items():
+        (root / name).write_text(yaml.safe_dump(data, allow_unicode=True, sort_keys=False), encoding="utf-8")
+    return g3.load_yaml_dir(str(root))
+
+
+@pytest.mark.parametrize("tree", sorted(TREES))
+def test_single_pass_engine_matches_per_rule_check(tmp_path, tree):
+    yaml_files = _write_tree(tmp_path / tree, TREES[tree])
+    rules = [{"rule_id": r} for r in RULE_IDS]
+    results = g3.run_checklist_rules(rules, yaml_files, str(tmp_path / "*.md"))
+    assert [set(r) for r in results] == [{"passed", "detail", "duration_ms"}] * len(RULE_IDS)
+
+    for rule_id, res in zip(RULE_IDS, results):
+        legacy = _legacy_check_rule(rule_id, yaml_files)
+        assert res["passed"] == legacy["passed"], (rule_id, res, legacy)
+        assert g3.check_rule(rule_id, yaml_files, "")["passed"] == legacy["passed"]
+        if rule_id != "PLN-CONS-060":  # 060 now reports key paths instead of the set of words
+            assert res["detail"] == legacy["detail"], rule_id
+            assert g3.check_rule(rule_id, yaml_files, "") == legacy
+
+
+def test_single_pass_engine_reports_todo_key_paths(tmp_path):
+    yaml_files = _write_tree(tmp_path / "broken", TREES["broken"])
+    res = g3.run_checklist_rules([{"rule_id": "PLN-CONS-060"}], yaml_files, "")[0]
+    assert res["detail"] == (
+        "TODO/TBD/PENDING残存: "
+        "PLN-PLN-A-001.yaml: goal=TBD / "
+        "PLN-PLN-B-001.yaml: items[0].todo=todo, items[0].todo=PENDING, items[1]=todo / "
+        "PLN-PLN-C-001.yaml: body.TBD=TBD / "
+        "PLN-PLN-D-001.yaml: body=Todo"
+    )
+
+
+def test_failing_rule_does_not_stop_the_others(tmp_path):
+    yaml_files = _write_tree(tmp_path / "tree", TREES["meta_not_a_mapping"])
+    rules = [{"rule_id": r} for r in RULE_IDS] + [{"rule_id": "PLN-CONS-999"}]
+    results = g3.run_checklist_rules(rules, yaml_files, "")
+    by_id = dict(zip(RULE_IDS + ["PLN-CONS-999"], results))
+    assert by_id["PLN-CONS-020"]["detail"].startswith("チェック実行エラー: ")
+    assert by_id["PLN-CONS-060"]["passed"] is True
+    assert by_id["PLN-CONS-999"]["passed"] is True  # unknown rules are skipped, as before
+
+
+# ─── declarative check: ───────────────────────────────────────────────────────
+
+GOAL = {
+    "meta": {"artifact_id": "REQ-GOAL-001", "file": "REQ-GOAL-001.yaml", "note": "TODO"},
+    "goal": {"primary_goal": "整備する", "criteria": [], "owners": ["a", {"name": "TBD"}], "empty": "  "},
+}
+OTHER = {"meta": {"artifact_id": "REQ-OTHER-001", "file": "renamed.yaml"}, "body": {"tbd_key": "x"}}
+
+
+def _files(tmp_path):
+    return _write_tree(tmp_path / "req", {"REQ-GOAL-001.yaml": GOAL, "REQ-OTHER-001.yaml": OTHER, "BAS-GOAL-001.yaml": {}})
+
+
+def _declare(tmp_path, spec):
+    return g3.run_checklist_rules([{"rule_id": "REQ-CONS-100", "check": spec}], _files(tmp_path), "")[0]
+
+
+@pytest.mark.parametrize("spec, passed, detail", [
+    # file selection
+    ({"files": "goal"}, True, "宣言的チェックOK: 対象2件"),
+    ({"files": "goal", "file_regex": r"^REQ-"}, True, "宣言的チェックOK: 対象1件"),
+    ({"file_regex": r"^XYZ-"}, False, "対象YAMLが見つかりません"),
+    ({"file_regex": r"^XYZ-", "require_files": False}, True, "宣言的チェックOK: 対象0件"),
+    ({"in_stem": "meta.artifact_id"}, True, "宣言的チェックOK: 対象3件"),  # no filter: every YAML
+    # required: the key exists (even when empty)
+    ({"file_regex": r"^REQ-GOAL", "required": ["goal.criteria", "goal.owners.1.name"]}, True, "宣言的チェックOK: 対象1件"),
+    ({"file_regex": r"^REQ-", "required": ["goal.primary_goal", "goal.owners.5"]}, False,
+     "REQ-GOAL-001.yaml: goal.owners.5 が欠如 / REQ-OTHER-001.yaml: goal.primary_goal が欠如 / REQ-OTHER-001.yaml: goal.owners.5 が欠如"),
+    # non_empty: None, blank strings, empty lists/dicts fail
+    ({"files": "REQ-GOAL", "non_empty": ["goal.primary_goal", "goal.owners.0"]}, True, "宣言的チェックOK: 対象1件"),
+    ({"files": "REQ-GOAL", "non_empty": ["goal.criteria", "goal.empty", "goal.missing"]}, False,
+     "REQ-GOAL-001.yaml: goal.criteria が欠如または空 / REQ-GOAL-001.yaml: goal.empty が欠如または空"
+     " / REQ-GOAL-001.yaml: goal.missing が欠如または空"),
+    # forbid_regex: meta excluded by default, keys and values scanned
+    ({"files": "REQ-", "forbid_regex": r"\bTODO\b"}, True, "宣言的チェックOK: 対象2件"),
+    ({"files": "REQ-", "forbid_regex": [{"pattern": "tbd", "ignore_case": True}]}, False,
+     "REQ-GOAL-001.yaml: /tbd/ が ['goal.owners[1].name'] に残存 / REQ-OTHER-001.yaml: /tbd/ が ['body.tbd_key'] に残存"),
+    ({"files": "REQ-GOAL", "forbid_regex": [{"pattern": "TODO", "exclude_top_keys": []}]}, False,
+     "REQ-GOAL-001.yaml: /TODO/ が ['meta.note'] に残存"),
+    # equals_filename / in_stem
+    ({"files": "REQ-", "equals_filename": "meta.file"}, False,
+     "REQ-OTHER-001.yaml: meta.file='renamed.yaml' がファイル名と不一致"),
+    ({"files": "REQ-", "in_stem": ["meta.artifact_id", "meta.missing"]}, True, "宣言的チェックOK: 対象2件"),
+    ({"files": "REQ-OTHER", "in_stem": "body.tbd_key"}, False, "REQ-OTHER-001.yaml: body.tbd_key='x' がステムに含まれない"),
+])
+def test_declarative_check_predicates(tmp_path, spec, passed, detail):
+    res = _declare(tmp_path, spec)
+    assert (res["passed"], res["detail"]) == (passed, detail)
+
+
+@pytest.mark.parametrize("spec, message", [
+    ("files: GOAL", "check は mapping で指定してください"),
+    ({"files": "GOAL", "typo": 1}, "未知のキー: ['typo']"),
+    ({"file_regex": 123}, "file_regex は文字列で指定してください: 123"),
+    ({"file_regex": "("}, "missing ), unterminated subpattern"),
+    ({"forbid_regex": [5]}, "forbid_regex の要素の型が不正です: 5"),
+    ({"forbid_regex": [["TODO"]]}, "forbid_regex の要素の型が不正です: ['TODO']"),
+    ({"forbid_regex": [{"ignore_case": True}]}, "forbid_regex.pattern がありません"),
+    ({"forbid_regex": [{"pattern": ["TODO"]}]}, "forbid_regex.pattern は文字列で指定してください: ['TODO']"),
+    ({"forbid_regex": [{"pattern": "x", "exclude_top_keys": [1]}]}, "exclude_top_keys の要素の型が不正です: 1"),
+    ({"required": [{"meta": "file"}]}, "required の要素の型が不正です: {'meta': 'file'}"),
+    ({"non_empty": True}, "non_empty の要素の型が不正です: True"),
+    ({"in_stem": "meta..artifact_id"}, "不正なキーパス: 'meta..artifact_id'"),
+])
+def test_malformed_check_is_a_definition_error(tmp_path, spec, message):
+    check = g3.make_rule_check({"rule_id": "REQ-CONS-900", "check": spec}, "")
+    assert isinstance(check, g3._InvalidCheck)
+    # reported as the rule's result, the other rules still run
+    rules = [{"rule_id": "REQ-CONS-900", "check": spec}, {"rule_id": "REQ-CONS-901", "check": {"required": "meta"}}]
+    bad, good = g3.run_checklist_rules(rules, _files(tmp_path), "")
+    assert bad["passed"] is False
+    assert bad["detail"].startswith("チェック定義エラー: ") and message in bad["detail"]
+    assert good["passed"] is False and "BAS-GOAL-001.yaml: meta が欠如" in good["detail"]
+
+
+# ─── string scalar scan (PLN-CONS-060) ────────────────────────────────────────
+
+def test_iter_string_scalars_yields_keys_and_values_with_paths():
+    data = {
+        "meta": {"note": "skipped"},
+        "goal": {"items": ["a", {"TBD": None, "n": 3}], 7: "int key"},
+        "flag": True,
+    }
+    assert list(g3._iter_string_scalars(data, skip_top_keys=frozenset({"meta"}))) == [
+        ("goal", "goal"),
+        ("goal.items", "items"),
+        ("goal.items[0]", "a"),
+        ("goal.items[1].TBD", "TBD"),
+        ("goal.items[1].n", "n"),
+        ("goal.7", "int key"),
+        ("flag", "flag"),
+    ]
+    # meta is only skipped at the top level
+    assert ("x.meta.note", "skipped") in list(g3._iter_string_scalars({"x": data}, skip_top_keys=frozenset({"meta"})))
+
+
+def test_iter_todo_hits_reports_each_word_in_order():
+    data = {"meta": {"content_hash": "PENDING"}, "a": "todo then TBD", "TODO": ["TODOS", "xTBD", "pending."]}
+    assert list(g3._iter_todo_hits(data)) == [("a", "todo"), ("a", "TBD"), ("TODO", "TODO"), ("TODO[2]", "pending")]
+
+
+def test_todo_rule_stops_scanning_after_max_hits(monkeypatch):
+    pulled = []
+
+    def counting(data, prefix="", **kwargs):
+        for item in real(data, prefix, **kwargs):
+            if not prefix:  # the recursion goes through the patched name too: count the outer walk only
+                pulled.append(item)
+            yield item
+
+    real = g3._iter_string_scalars
+    monkeypatch.setattr(g3, "_iter_string_scalars", counting)
+    data = {"items": [f"TODO {i}" for i in range(100)]}
+    check = g3.make_rule_check({"rule_id": "PLN-CONS-060"}, "")
+    check.visit("x/PLN-PLN-A-001.yaml", "PLN-PLN-A-001.yaml", data)
+
+    assert len(pulled) == 1 + g3._TODO_MAX_HITS + 1  # the key, then max + 1 values
+    shown = ", ".join(f"items[{i}]=TODO" for i in range(g3._TODO_MAX_HITS))
+    assert check.failures == [f"PLN-PLN-A-001.yaml: {shown} ..."]
+
+
+def _random_doc(rnd, depth=0):
+    words = ["計画", "todo", "TODO", "TBD", "tbd:", "pending", "Pending.", "TODOS", "xTBD", "PEND", "済", "to do", "meta"]
+    kind = rnd.random()
+    if depth >= 3 or kind < 0.4:
+        return rnd.choice([
+            " ".join(rnd.choice(words) for _ in range(rnd.randint(1, 4))),
+            rnd.randint(0, 9), None, True, 1.5,
+        ])
+    if kind < 0.7:
+        return [_random_doc(rnd, depth + 1) for _ in range(rnd.randint(0, 3))]
+    return {rnd.choice(words + ["k1", "k2", 3]): _random_doc(rnd, depth + 1) for _ in range(rnd.randint(0, 3))}
+
+
+def test_todo_scan_matches_yaml_dump_scan():
+    import random
+
+    rnd = random.Random(33)
+    for _ in range(500):
+        data = {f"k{i}": _random_doc(rnd) for i in range(rnd.randint(0, 3))}
+        data["meta"] = _random_doc(rnd)
+        legacy = bool(_TODO_PATTERN.findall(_non_meta_yaml_str(data)))
+        assert any(True for _ in g3._iter_todo_hits(data)) == legacy, data
@@ -0,0 +1,362 @@
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import ExitStack
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _load(name, rel):
+    spec = importlib.util.spec_from_file_location(name, REPO_ROOT / rel)
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+g4 = _load("g4_deepeval", "runner/gates/g4_deepeval.py")
+
+
+@pytest.fixture
+def cfg():
+    """Override G4 config fields until the end of the test: cfg(faith_retrieval="bm25")."""
+    with ExitStack() as stack:
+        yield lambda **kw: stack.enter_context(g4.use_config(replace(g4.current_config(), **kw)))
+
+
+def _chunks(texts):
+    chunks = [
+        {"ref": "ref.md", "title": f"c{i}", "text": t, "tokens": g4.token_ids(t)}
+        for i, t in enumerate(texts)
+    ]
+    return chunks, g4.RefChunkIndex(chunks)
+
+
+# ─── token sets ───────────────────────────────────────────────────────────────
+
+def _set_jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def test_jaccard_token_ids_matches_sets_sparse_and_dense():
+    vocab = g4.TokenVocab()
+    for i in range(5000):
+        vocab.intern(f"w{i}")
+    cases = [
+        ({"w1", "w2", "w3"}, {"w2", "w3", "w4"}),  # dense (small ids)
+        ({"w1", "w4999"}, {"w4999", "w7"}),  # sparse (large id, few tokens)
+        ({"w1", "w2", "w3"}, {"w3", "w4998"}),  # dense x sparse
+        (set(), {"w1"}),
+    ]
+    for a, b in cases:
+        ta = g4.TokenIds.from_tokens(a, vocab)
+        tb = g4.TokenIds.from_tokens(b, vocab)
+        assert g4.jaccard(ta, tb) == pytest.approx(_set_jaccard(a, b))
+        if a:
+            assert g4.token_containment(ta, tb) == pytest.approx(len(a & b) / len(a))
+
+
+def test_jaccard_accepts_mixed_token_ids_and_sets():
+    a = {"alpha", "beta", "gamma"}
+    b = {"beta", "gamma", "delta"}
+    expected = _set_jaccard(a, b)
+    assert g4.jaccard(g4.TokenIds.from_tokens(a), b) == pytest.approx(expected)
+    assert g4.jaccard(a, g4.TokenIds.from_tokens(b)) == pytest.approx(expected)
+
+
+# ─── token budget ─────────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("max_tokens", [1, 2, 3, 4, 5, 6, 10, 50])
+def test_truncate_to_tokens_fits_tiny_budgets(max_tokens):
+    text = "これは長い文章です。" * 20 + "abc def. " * 30
+    out = g4.truncate_to_tokens(text, max_tokens)
+    assert out
+    assert g4.estimate_tokens(out) <= max_tokens
+    # never only the marker: some of the original text survives
+    assert out.replace("\n...(truncated)", "")
+
+
+def test_small_faith_token_budget_keeps_a_faith_view(cfg):
+    cfg(faith_token_budget=10)
+    data = {"goal": {f"k{i}": "品質ゲートで成果物の曖昧さを自動検出する" for i in range(40)}}
+    info = {"data": data, "content": ""}
+    chunks, index = _chunks(["品質ゲートで成果物の曖昧さを自動検出する"])
+    job = g4.prepare_faithfulness_file("x/PLN-PLN-GOAL-001.yaml", info, chunks, {"ref.md"}, index)
+    assert g4.estimate_tokens(job["actual_text"]) >= g4.MIN_FAITH_VIEW_TOKENS // 2
+    assert "品質ゲート" in job["actual_text"]
+    assert job["ref_ctx"]
+
+
+# ─── batching ─────────────────────────────────────────────────────────────────
+
+def _batch_job(i, text):
+    return {"fname": f"f{i}.yaml", "actual_text": text, "actual_max": 0, "ref_ctx": [text], "ctx_max": 0}
+
+
+def test_pack_faithfulness_batches_uses_a_token_budget():
+    overhead = g4.estimate_tokens(g4.build_faith_batch_prompt([]))
+    ascii_jobs = [_batch_job(i, "a" * 400) for i in range(8)]
+    cjk_jobs = [_batch_job(i, "あ" * 400) for i in range(8)]
+    item = g4.estimate_tokens(g4.faith_batch_item_text(g4.faith_batch_entry(cjk_jobs[0], "F8")))
+    max_tokens = overhead + 2 * item
+
+    # the same character count: CJK (1 char ~ 1 token) packs 2 per request, ASCII (4 chars ~ 1 token) about 4x as many
+    assert g4.pack_faithfulness_batches(cjk_jobs, 8, max_tokens) == [[0, 1], [2, 3], [4, 5], [6, 7]]
+    assert len(g4.pack_faithfulness_batches(ascii_jobs, 8, max_tokens)[0]) >= 6
+
+    # every packed request stays within the budget, prompt included
+    for unit in g4.pack_faithfulness_batches(cjk_jobs + ascii_jobs, 8, max_tokens):
+        if len(unit) > 1:
+            entries = [g4.faith_batch_entry((cjk_jobs + ascii_jobs)[i], f"F{k + 1}") for k, i in enumerate(unit)]
+            assert g4.estimate_tokens(g4.build_faith_batch_prompt(entries)) <= max_tokens
+
+    # a budget below the prompt overhead leaves every file on its own
+    assert g4.pack_faithfulness_batches(ascii_jobs[:3], 8, overhead) == [[0], [1], [2]]
+
+
+# ─── retrieval ────────────────────────────────────────────────────────────────
+
+@pytest.fixture
+def bm25(cfg):
+    cfg(faith_retrieval="bm25")
+
+
+def test_bm25_pads_topk_with_chunk_order(bm25):
+    chunks, index = _chunks(["alpha beta", "gamma delta", "epsilon zeta", "alpha gamma", "eta theta"])
+    ctx = g4.select_topk_ref_chunks("alpha", chunks, 3, 100000, index)
+    titles = [c.split(" :: ")[1].split(" ")[0] for c in ctx]
+    # the two BM25 hits first, then the remaining slots in chunk order
+    assert sorted(titles[:2]) == ["c0", "c3"]
+    assert titles[2] == "c1"
+
+
+def test_bm25_same_length_subset_is_not_taken_for_the_full_list(bm25):
+    chunks, index = _chunks(["alpha one", "beta two", "gamma three"])
+    # same length as the index but a different list (reordered copy): must go through chunk_id
+    reordered = [chunks[2], chunks[0], chunks[1]]
+    ctx = g4.select_topk_ref_chunks("beta", reordered, 1, 100000, index)
+    assert "beta two" in ctx[0]
+
+
+# ─── derived_from routing ─────────────────────────────────────────────────────
+
+def test_derived_from_router_builds_rule_blobs_on_demand():
+    chunks = [{"ref": "a.md", "title": "a", "text": "A"}, {"ref": "b.md", "title": "b", "text": "B"}]
+    router = g4.DerivedFromRouter(chunks, {"a.md", "b.md"}, {"a.md": "AAA", "b.md": "BBB"})
+    route = router.route("x.yaml", {"derived_from": ["a.md", "missing.md"]})
+    assert route.faith_chunks == chunks[:1]
+    assert route.resolved == ["a.md"]
+    assert router._blobs == {}  # nothing built while coverage/completeness have not asked
+
+    assert route.completeness_blob == "AAA"
+    assert route.coverage_blob == "===== REF_FILE: a.md =====\nAAA"
+    assert len(router._blobs) == 2
+
+    # unresolved derived_from: all chunks for faithfulness, no rule text
+    other = router.route("y.yaml", {"derived_from": ["missing.md"]})
+    assert other.faith_chunks is chunks and other.faith_hits == set()
+    assert other.coverage_blob == other.completeness_blob == ""
+
+
+# ─── reference cache ──────────────────────────────────────────────────────────
+
+@pytest.fixture
+def ref_cache(tmp_path, cfg):
+    cfg(ref_cache_enable=True, ref_cache_dir=str(tmp_path / "ref_index"))
+    ref = tmp_path / "ref.md"
+    ref.write_text("# 企画書\n\n## 目的\n- 品質ゲートで曖昧さを検出する\n\n## スコープ\n- YAML を対象とする\n", encoding="utf-8")
+    return ref
+
+
+@pytest.mark.parametrize("tokenizer", ["word", "ngram"])
+def test_ref_cache_is_json_and_keeps_token_types(ref_cache, cfg, tokenizer):
+    cfg(g4_tokenizer=tokenizer)
+    chunks, tfs, path = g4.load_reference_file_chunks(str(ref_cache), "AUTO", 900)
+    assert path.suffix == ".json"
+    json.loads(path.read_text(encoding="utf-8"))  # plain JSON, no pickle
+
+    cached_chunks, cached_tfs, _ = g4.load_reference_file_chunks(str(ref_cache), "AUTO", 900)
+    assert cached_tfs == tfs
+    assert [(c["title"], c["text"], list(c["tokens"].ids)) for c in cached_chunks] == \
+        [(c["title"], c["text"], list(c["tokens"].ids)) for c in chunks]
+
+
+@pytest.mark.parametrize("tokenizer", ["word", "ngram"])
+def test_build_reference_chunks_cached_matches_uncached(ref_cache, tmp_path, cfg, tokenizer):
+    cfg(g4_tokenizer=tokenizer)
+    other = tmp_path / "ref.yaml"
+    other.write_text("scope:\n  in: 企画フェーズの YAML\n  out: 実装フェーズ\n", encoding="utf-8")
+    refs = [str(ref_cache), str(other)]
+    query = g4.tokenize_ja_en("品質ゲート YAML 企画フェーズ")
+
+    def snapshot():
+        chunks, names, index = g4.build_reference_chunks(refs, "AUTO", 40)
+        return (
+            [(c["ref"], c["title"], c["text"], list(c["tokens"].ids)) for c in chunks],
+            names,
+            index.topk(query, len(chunks)),
+        )
+
+    with g4.use_config(replace(g4.current_config(), ref_cache_enable=False)):
+        uncached = snapshot()
+    written = snapshot()
+    read_back = snapshot()
+    assert len(list(Path(g4.REF_CACHE_DIR).glob("*.json"))) == 2
+    assert uncached == written == read_back
+
+
+@pytest.mark.parametrize("garbage", ["", "not json", "[]", '{"version": 2, "chunks": [{}], "tfs": [[]]}',
+                                     '{"version": 2, "chunks": [{"ref": "r", "title": "t", "text": "x"}], "tfs": [[["a", "1"]]]}'])
+def test_ref_cache_rebuilds_on_bad_file(ref_cache, garbage):
+    chunks, tfs, path = g4.load_reference_file_chunks(str(ref_cache), "AUTO", 900)
+    path.write_text(garbage, encoding="utf-8")
+    again, again_tfs, _ = g4.load_reference_file_chunks(str(ref_cache), "AUTO", 900)
+    assert again_tfs == tfs
+    assert [c["text"] for c in again] == [c["text"] for c in chunks]
+    assert json.loads(path.read_text(encoding="utf-8"))["version"] == g4.REF_CACHE_VERSION
+
+
+def test_ref_cache_prunes_old_and_excess_files(ref_cache, cfg):
+    cfg(ref_cache_max_files=3, ref_cache_max_age_days=30)
+    root = Path(g4.REF_CACHE_DIR)
+    root.mkdir()
+    now = time.time()
+    for i in range(5):
+        p = root / f"{i}.json"
+        p.write_text("{}", encoding="utf-8")
+        os.utime(p, (now - i * 60, now - i * 60))
+    old = root / "old.json"
+    old.write_text("{}", encoding="utf-8")
+    os.utime(old, (now - 31 * 86400, now - 31 * 86400))
+    (root / "legacy.pkl").write_bytes(b"x")
+
+    _, _, index = g4.build_reference_chunks([str(ref_cache)], "AUTO", 900)
+    # the file just used + the two most recently used others
+    assert sorted(p.name for p in root.iterdir() if len(p.stem) == 1) == ["0.json", "1.json"]
+    assert not old.exists() and not (root / "legacy.pkl").exists()
+    assert len(list(root.iterdir())) == 3
+
+
+# ─── run_g4 (local backend) ───────────────────────────────────────────────────
+
+REF_MD = """# 企画書
+
+## 目的
+- 品質ゲートで成果物の曖昧さを自動検出する
+- 変換品質を Faithfulness で評価する
+
+## スコープ
+- 企画フェーズの YAML を対象とする
+"""
+
+GOAL_YAML = """meta:
+  artifact_id: PLN-PLN-GOAL-001
+derived_from:
+  - ref.md
+goal:
+  summary: 品質ゲートで成果物の曖昧さを自動検出する
+  metric: 変換品質を Faithfulness で評価する
+"""
+
+SCOPE_YAML = """meta:
+  artifact_id: PLN-PLN-SCOPE-001
+derived_from: ref.md
+scope:
+  in: 企画フェーズの YAML を対象とする
+  out: null
+"""
+
+
+@pytest.fixture
+def g4_env(tmp_path):
+    (tmp_path / "refs").mkdir()
+    (tmp_path / "refs" / "ref.md").write_text(REF_MD, encoding="utf-8")
+    (tmp_path / "yaml").mkdir()
+    (tmp_path / "yaml" / "PLN-PLN-GOAL-001.yaml").write_text(GOAL_YAML, encoding="utf-8")
+    (tmp_path / "yaml" / "PLN-PLN-SCOPE-001.yaml").write_text(SCOPE_YAML, encoding="utf-8")
+    return {
+        "AIDD_G4_EVAL_BACKEND": "local",
+        "AIDD_YAML_DIR": str(tmp_path / "yaml"),
+        "AIDD_REF_PATHS": str(tmp_path / "refs" / "ref.md"),
+        "AIDD_OUT_ROOT": str(tmp_path / "out"),
+        "AIDD_G4_CACHE_PATH": str(tmp_path / "llm_cache.sqlite3"),
+        "AIDD_G4_REF_CACHE_DIR": str(tmp_path / "ref_index"),
+    }
+
+
+def test_run_g4_local_backend_summary_and_cache(g4_env, capsys):
+    before = g4.current_config()
+    cfg = g4.G4Config.from_env(g4_env)
+    caches = g4.G4Caches()
+
+    first = g4.run_g4(cfg, caches)
+    faith = first["summary"]["faithfulness"]
+    assert faith["total"] == 2
+    assert first["summary"]["coverage"]["total"] == 3  # 2 files + GLOBAL
+    assert first["details"]["llm_cache"]["misses"] == 2
+    assert first["details"]["llm_cache"]["hits"] == 0
+
+    second = g4.run_g4(cfg, caches)
+    assert second["details"]["llm_cache"]["hits"] == 2
+    assert second["details"]["llm_cache"]["misses"] == 0
+    assert [r["score"] for r in second["results"]] == [r["score"] for r in first["results"]]
+    assert second["summary"] == first["summary"]
+
+    # a fresh process-level cache object still hits through the SQLite file
+    third = g4.run_g4(cfg, g4.G4Caches())
+    assert third["details"]["llm_cache"]["hits"] == 2
+
+    # the run config never leaks into the caller's context
+    assert g4.current_config() is before
+    assert g4.EVAL_BACKEND == before.eval_backend
+    assert "[EVAL] Faithfulness" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("concurrency", ["1", "4"])
+def test_run_g4_prints_faithfulness_scores(g4_env, capsys, concurrency):
+    env = dict(g4_env, AIDD_FAITHFULNESS_CONCURRENCY=concurrency)
+    g4.run_g4(g4.G4Config.from_env(env), g4.G4Caches())
+    lines = [l for l in capsys.readouterr().out.splitlines() if "[EVAL] Faithfulness:" in l]
+    assert len(lines) == 2
+    for line in lines:
+        assert " score=" in line and "→" in line, line
+
+
+def test_concurrent_run_g4_keep_their_own_config(g4_env, tmp_path):
+    (tmp_path / "yaml_one").mkdir()
+    (tmp_path / "yaml_one" / "PLN-PLN-GOAL-001.yaml").write_text(GOAL_YAML, encoding="utf-8")
+    configs = {
+        "two": g4.G4Config.from_env(dict(g4_env, AIDD_FAITHFULNESS_CONCURRENCY="4")),
+        "one": g4.G4Config.from_env(dict(g4_env, AIDD_YAML_DIR=str(tmp_path / "yaml_one"),
+                                         AIDD_OUT_ROOT=str(tmp_path / "out_one"),
+                                         AIDD_G4_CACHE_PATH=str(tmp_path / "llm_one.sqlite3"))),
+    }
+    before = g4.current_config()
+    barrier = threading.Barrier(len(configs))
+    results = {}
+
+    def run(name):
+        barrier.wait()
+        for _ in range(3):
+            results.setdefault(name, []).append(g4.run_g4(configs[name], g4.G4Caches()))
+
+    threads = [threading.Thread(target=run, args=(name,)) for name in configs]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for name, expected in (("two", 2), ("one", 1)):
+        assert len(results[name]) == 3
+        for out in results[name]:
+            assert out["summary"]["faithfulness"]["total"] == expected
+            assert out["inputs"]["yaml_dir"] == configs[name].yaml_dir
+    assert g4.current_config() is before